@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+# Async views run their queries in a new thread per request, and a
+# persistent connection would stay open with each of those threads
+os.environ.setdefault("DB_CONN_MAX_AGE", "0")
 
 application = get_asgi_application()
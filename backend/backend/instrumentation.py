@@ -0,0 +1,327 @@
+"""
+Per-request performance instrumentation.
+
+InstrumentationMiddleware times every request and counts its queries and
+their database time. Views with InstrumentedViewMixin also report how long
+serializing and rendering the response took. The figures are sent back in
+a Server-Timing header (shown by browser dev tools), aggregated per
+endpoint (the URL name, e.g. movie-list, movie-detail, user-login) and
+exposed as Prometheus text by metrics_view at /metrics. Streaming
+responses are aggregated once their body is sent, so the queries run
+while streaming count too; their Server-Timing header only covers the
+time until the headers.
+
+Requests running more than INSTRUMENTATION_QUERY_THRESHOLD queries are
+logged as likely N+1 patterns, with their most repeated statement. Only
+the repeat counts of the first MAX_TRACKED_STATEMENTS distinct statements
+are kept, so a request running many queries stays small.
+
+Metrics are kept per process: with several gunicorn workers, each scrape
+sees one worker's counters.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Distinct SQL statements counted per request for the N+1 log
+MAX_TRACKED_STATEMENTS = 50
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """
+    Timings of one request: queries and database time, plus the phases
+    reported by views.
+    """
+
+    __slots__ = ("started", "queries", "db", "phases", "statements")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.phases = {}
+        self.statements = Counter()
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def add_query(self, sql, seconds):
+        self.db += seconds
+        self.queries += 1
+        if sql in self.statements or len(self.statements) < MAX_TRACKED_STATEMENTS:
+            self.statements[sql] += 1
+
+    def server_timing(self, total):
+        """
+        Value of the Server-Timing header, durations in milliseconds.
+        """
+        phases = "".join(f"{phase};dur={seconds * 1000:.2f}, " for phase, seconds in self.phases.items())
+        return f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries", {phases}total;dur={total * 1000:.2f}'
+
+
+def current_timings():
+    """
+    Returns the RequestTimings of the request being handled, or None.
+    """
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper adding each query to the current request's
+    timings. The timings live in a context variable, which follows the
+    request into the sync_to_async threads running queries for async views.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, time.perf_counter() - start)
+
+
+def install_query_recorder(connection):
+    # First in the list: execute_wrapper() blocks push and pop at the end
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@receiver(connection_created)
+def connection_created_handler(sender, connection, **kwargs):
+    # Connections are per thread, so each one gets the wrapper
+    install_query_recorder(connection)
+
+
+class EndpointStats:
+    """
+    Counters of one endpoint, with a latency histogram over LATENCY_BUCKETS.
+    """
+
+    __slots__ = ("requests", "buckets", "count", "seconds", "queries", "db", "phases", "n_plus_one")
+
+    def __init__(self):
+        self.requests = {}  # (method, status) -> count
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # last one is +Inf
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.db = 0.0
+        self.phases = {}
+        self.n_plus_one = 0
+
+
+class MetricsRegistry:
+    """
+    Per-endpoint request metrics of this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+
+    def clear(self):
+        with self._lock:
+            self.endpoints = {}
+
+    def record(self, endpoint, method, status, total, timings, n_plus_one=False):
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            key = (method, status)
+            stats.requests[key] = stats.requests.get(key, 0) + 1
+            stats.buckets[bisect_left(LATENCY_BUCKETS, total)] += 1
+            stats.count += 1
+            stats.seconds += total
+            stats.queries += timings.queries
+            stats.db += timings.db
+            for phase, seconds in timings.phases.items():
+                stats.phases[phase] = stats.phases.get(phase, 0.0) + seconds
+            stats.n_plus_one += n_plus_one
+
+    def render(self):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            lines = [
+                "# HELP http_requests_total Requests handled, by endpoint, method and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for endpoint, stats in endpoints:
+                for (method, status), count in sorted(stats.requests.items()):
+                    lines.append(f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+            lines += [
+                "# HELP http_request_duration_seconds Request latency, by endpoint.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for endpoint, stats in endpoints:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), stats.buckets):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {stats.seconds:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{endpoint="{endpoint}"}} {stats.count}')
+            for name, help_text, attribute in (
+                ("db_queries_total", "Database queries run, by endpoint.", "queries"),
+                ("db_duration_seconds_total", "Time spent in database queries, by endpoint.", "db"),
+                ("n_plus_one_requests_total", "Requests over the query threshold, by endpoint.", "n_plus_one"),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for endpoint, stats in endpoints:
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {getattr(stats, attribute):g}')
+            lines += [
+                "# HELP view_phase_seconds_total Time spent serializing and rendering responses, by endpoint.",
+                "# TYPE view_phase_seconds_total counter",
+            ]
+            for endpoint, stats in endpoints:
+                for phase, seconds in sorted(stats.phases.items()):
+                    lines.append(f'view_phase_seconds_total{{endpoint="{endpoint}",phase="{phase}"}} {seconds:.6f}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+class InstrumentationMiddleware:
+    """
+    Records the timings of each request (sync and async views alike).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        # Connections opened before this module was imported missed the signal
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings)
+
+    def _finish(self, request, response, timings):
+        if getattr(settings, "INSTRUMENTATION_SERVER_TIMING", True):
+            response["Server-Timing"] = timings.server_timing(time.perf_counter() - timings.started)
+        if response.streaming and not getattr(response, "is_async", False):
+            response.streaming_content = self._stream(request, response, timings, response.streaming_content)
+        else:
+            self._record(request, response, timings)
+        return response
+
+    def _stream(self, request, response, timings, content):
+        """
+        Yields the streamed body with the timings current while each chunk
+        is produced, then records the request.
+        """
+        try:
+            while True:
+                token = _current.set(timings)
+                try:
+                    chunk = next(content)
+                except StopIteration:
+                    return
+                finally:
+                    _current.reset(token)
+                yield chunk
+        finally:
+            self._record(request, response, timings)
+
+    def _record(self, request, response, timings):
+        total = time.perf_counter() - timings.started
+        match = request.resolver_match
+        endpoint = (match.url_name or match.view_name) if match else "unmatched"
+        threshold = getattr(settings, "INSTRUMENTATION_QUERY_THRESHOLD", 20)
+        n_plus_one = timings.queries > threshold
+        if n_plus_one:
+            statement, repeats = timings.statements.most_common(1)[0]
+            logger.warning(
+                "Possible N+1 queries on %s %s (%s): %d queries, %d of them: %s",
+                request.method, request.path, endpoint, timings.queries, repeats, statement,
+            )
+        metrics.record(endpoint, request.method, response.status_code, total, timings, n_plus_one)
+
+
+class InstrumentedViewMixin:
+    """
+    DRF view mixin adding the serializer and renderer time to the request
+    timings ("serialize" and "render" in Server-Timing). "serialize" runs
+    from the first get_serializer() call to finalize_response(), less the
+    database time in between: building, validating and reading serializers.
+    """
+
+    _serialize_started = None
+
+    def get_serializer(self, *args, **kwargs):
+        timings = _current.get()
+        if timings is not None and self._serialize_started is None:
+            self._serialize_started = (time.perf_counter(), timings.db)
+        return super().get_serializer(*args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        timings = _current.get()
+        if timings is not None and self._serialize_started is not None:
+            started, db = self._serialize_started
+            timings.add("serialize", max(0.0, time.perf_counter() - started - (timings.db - db)))
+            self._serialize_started = None
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if timings is not None and hasattr(response, "add_post_render_callback") and not response.is_rendered:
+            # Django renders the response after the view returns
+            start = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: timings.add("render", time.perf_counter() - start))
+        return response
+
+
+def metrics_view(request):
+    """
+    Prometheus metrics of this process. GET /metrics
+    Only served to the addresses in INSTRUMENTATION_METRICS_ALLOWED_IPS.
+    arguments:
+    request -- HttpRequest object
+    returns: metrics in the Prometheus text format
+    """
+    allowed = getattr(settings, "INSTRUMENTATION_METRICS_ALLOWED_IPS", ("127.0.0.1", "::1"))
+    if "*" not in allowed and request.META.get("REMOTE_ADDR") not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,279 @@
+"""
+PostgreSQL backend with a process-wide connection pool.
+
+Django 4.2 has no built-in pool (OPTIONS["pool"] arrives in 5.1 and needs
+psycopg 3). With psycopg 3 and the optional psycopg_pool package installed
+this engine uses psycopg_pool.ConnectionPool, as Django 5.1 does; on
+psycopg2, which psycopg_pool does not support, it falls back to a small
+pool of its own. Both take the same OPTIONS["pool"] keys as Django 5.1
+(min_size, max_size, timeout, max_idle) so switching to the built-in pool
+later is an ENGINE change:
+
+    "ENGINE": "backend.pooled_postgresql",
+    "CONN_MAX_AGE": 0,
+    "OPTIONS": {"pool": {"min_size": 2, "max_size": 10, "timeout": 10}},
+
+Closing the connection (at the end of each request with CONN_MAX_AGE = 0)
+returns it to the pool instead of disconnecting, and connecting takes an
+idle one when there is one. At most max_size connections are open per
+process; when all are in use, connecting waits up to `timeout` seconds.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation as PostgresDatabaseCreation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel, is_psycopg3
+
+try:
+    import psycopg_pool
+except ImportError:
+    psycopg_pool = None
+
+# Same value in psycopg2 (TRANSACTION_STATUS_IDLE) and psycopg 3 (TransactionStatus.IDLE)
+TRANSACTION_STATUS_IDLE = 0
+
+# With CONN_HEALTH_CHECKS, connections idle for longer than this are
+# pinged before being handed out. One returned more recently was working
+# moments ago, and pinging it would cost a round trip per request.
+CHECK_IDLE = 1.0
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Bounded LIFO pool of driver connections, for psycopg2. Idle connections
+    beyond min_size are closed after max_idle seconds.
+    """
+
+    def __init__(self, min_size=0, max_size=10, timeout=30.0, max_idle=600.0, check=False):
+        if max_size < max(1, min_size):
+            raise ImproperlyConfigured("The connection pool max_size must be at least 1 and min_size.")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check = check
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = deque()  # (connection, returned at), most recently returned last
+        self._closed = False
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _healthy(self, connection, returned_at):
+        if connection.closed:
+            return False
+        idle = time.monotonic() - returned_at
+        if idle > self.max_idle:
+            return False
+        if self.check and idle > CHECK_IDLE:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            except Exception:
+                return False
+        return True
+
+    def getconn(self, connect):
+        """
+        Returns an idle connection, or a new one from `connect()` while fewer
+        than max_size are open. Raises PoolTimeout when none frees up within `timeout`.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No database connection available within {self.timeout:g}s (pool max_size={self.max_size}).")
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    connection, returned_at = self._idle.pop()
+                if self._healthy(connection, returned_at):
+                    return connection
+                self._discard(connection)
+            return connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, connection):
+        """
+        Returns a connection to the pool, rolling back any transaction left
+        open. Broken connections are closed instead.
+        """
+        try:
+            if not connection.closed and connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                try:
+                    connection.rollback()
+                except Exception:
+                    self._discard(connection)
+            if connection.closed or self._closed:
+                self._discard(connection)
+                return
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+                # Close connections idle for too long, keeping min_size around
+                expired = []
+                while len(self._idle) > self.min_size and time.monotonic() - self._idle[0][1] > self.max_idle:
+                    expired.append(self._idle.popleft()[0])
+            for stale in expired:
+                self._discard(stale)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """
+        Closes the idle connections; connections in use are closed when returned.
+        """
+        with self._lock:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._lock:
+            return {"idle": len(self._idle), "max_size": self.max_size}
+
+
+class PsycopgConnectionPool:
+    """
+    psycopg_pool.ConnectionPool behind the ConnectionPool interface. It
+    opens connections itself, from the connection parameters, and rolls
+    back or discards returned connections like ConnectionPool does.
+    """
+
+    def __init__(self, conn_params, configure=None, min_size=0, max_size=10, timeout=30.0, max_idle=600.0, check=False):
+        self.max_size = max_size
+        self._pool = psycopg_pool.ConnectionPool(
+            kwargs=conn_params,
+            configure=configure,
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+            max_idle=max_idle,
+            check=psycopg_pool.ConnectionPool.check_connection if check else None,
+            open=True,
+        )
+
+    def getconn(self, connect=None):
+        try:
+            return self._pool.getconn()
+        except psycopg_pool.PoolTimeout as exc:
+            raise PoolTimeout(str(exc)) from exc
+
+    def putconn(self, connection):
+        self._pool.putconn(connection)
+
+    def close(self):
+        self._pool.close()
+
+    def stats(self):
+        return {"idle": self._pool.get_stats()["pool_available"], "max_size": self.max_size}
+
+
+class DatabaseCreation(PostgresDatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Pooled connections to the test database would block DROP DATABASE
+        self.connection.close_pool()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    # One pool per alias, database and process (pools do not survive a fork)
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = None
+
+    @property
+    def pool_options(self):
+        options = self.settings_dict["OPTIONS"].get("pool", True)
+        if options is True:
+            return {}
+        if not isinstance(options, dict):
+            raise ImproperlyConfigured('OPTIONS["pool"] must be True or a dict of pool options.')
+        return options
+
+    def _pool_key(self):
+        settings_dict = self.settings_dict
+        return (self.alias, os.getpid(), settings_dict["NAME"], settings_dict["USER"], settings_dict["HOST"], settings_dict["PORT"])
+
+    @property
+    def pool(self):
+        key = self._pool_key()
+        with self._pools_lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                options = self.pool_options
+                pool_kwargs = {
+                    "min_size": options.get("min_size", 0),
+                    "max_size": options.get("max_size", 10),
+                    "timeout": options.get("timeout", 30.0),
+                    "max_idle": options.get("max_idle", 600.0),
+                    "check": options.get("check", self.settings_dict["CONN_HEALTH_CHECKS"]),
+                }
+                if is_psycopg3 and psycopg_pool is not None:
+                    pool = PsycopgConnectionPool(self.get_connection_params(), self._configure_connection, **pool_kwargs)
+                else:
+                    pool = ConnectionPool(**pool_kwargs)
+                self._pools[key] = pool
+            return pool
+
+    def _configure_connection(self, connection):
+        # What the parent's get_new_connection() does after connecting, for
+        # the connections psycopg_pool opens
+        isolation_level = self.settings_dict["OPTIONS"].get("isolation_level")
+        if isolation_level is not None:
+            connection.isolation_level = IsolationLevel(isolation_level)
+
+    def close_pool(self):
+        """
+        Closes the pool of this alias and database in this process.
+        """
+        with self._pools_lock:
+            pool = self._pools.pop(self._pool_key(), None)
+        if pool is not None:
+            pool.close()
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop("pool", None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        if self.alias == NO_DB_ALIAS:
+            # Creates and drops test databases; not worth keeping around
+            return super().get_new_connection(conn_params)
+        pool = self.pool
+        connection = pool.getconn(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        self._pool = pool
+        # Set by the parent class when connecting, needed for reused ones too
+        self.isolation_level = IsolationLevel(
+            self.settings_dict["OPTIONS"].get("isolation_level", IsolationLevel.READ_COMMITTED)
+        )
+        return connection
+
+    def _close(self):
+        pool, self._pool = self._pool, None
+        if self.connection is None or pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
@@ -25,7 +25,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = "django-insecure-f)7tz6kb$oyw-y3(rxfon6ne)c@qx3bv6)pp^*x13&n8ua!#7v"
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# gunicorn.conf.py turns it off unless DJANGO_DEBUG is set.
+DEBUG = os.getenv("DJANGO_DEBUG", "true").lower() in ("1", "true", "yes")
 
 APPEND_SLASH = False
 
@@ -49,7 +50,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its total includes the other middleware
+    "backend.instrumentation.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # Serves STATIC_ROOT (admin, browsable API) without DEBUG
+    "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -60,6 +65,13 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Request instrumentation (backend.instrumentation): Server-Timing headers,
+# /metrics for Prometheus (only served to these addresses, "*" for any) and
+# a warning for requests running more queries than the threshold (N+1).
+INSTRUMENTATION_SERVER_TIMING = os.getenv("INSTRUMENTATION_SERVER_TIMING", "true").lower() in ("1", "true", "yes")
+INSTRUMENTATION_METRICS_ALLOWED_IPS = os.getenv("INSTRUMENTATION_METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",")
+INSTRUMENTATION_QUERY_THRESHOLD = int(os.getenv("INSTRUMENTATION_QUERY_THRESHOLD", "20"))
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:4200",
     "http://127.0.0.1:4200",
@@ -68,22 +80,77 @@ CORS_ALLOWED_ORIGINS = [
 CORS_ALLOW_CREDENTIALS = True
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("users.authentication.CachedJWTAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,  # Number of results per page
+    # Login attempts per client IP, and failed attempts per (username, IP)
+    "DEFAULT_THROTTLE_RATES": {
+        "login": os.getenv("LOGIN_THROTTLE_RATE", "120/min"),
+        "login_failures": os.getenv("LOGIN_FAILURE_THROTTLE_RATE", "10/min"),
+    },
 }
 
+# Serve movie list/detail reads from values() rows through the compiled
+# MovieReadSerializer instead of model instances and MovieSerializer
+MOVIES_FAST_READ_SERIALIZER = True
+
+# GET /api/movies/ page counts: on PostgreSQL, filters the planner estimates
+# at fewer rows than this are counted exactly, larger ones report the estimate
+# (cached per filter until the next Movie write; ?count=true forces an exact count)
+MOVIES_EXACT_COUNT_THRESHOLD = int(os.getenv("MOVIES_EXACT_COUNT_THRESHOLD", "10000"))
+
+# POST/DELETE /api/movies/bulk/: items accepted per request, rows per
+# INSERT ... ON CONFLICT / DELETE statement, and request body size in bytes
+# (larger bodies are refused before any of it is parsed)
+MOVIES_BULK_MAX_ITEMS = 10000
+MOVIES_BULK_CHUNK_SIZE = 1000
+MOVIES_BULK_MAX_BODY_SIZE = 20 * 1024 * 1024
+
+# GET /api/movies/export/: rows fetched per server-side cursor round trip
+MOVIES_EXPORT_CHUNK_SIZE = 2000
+
+# GET /api/movies/analytics/: longest time (seconds) the in-process columnar
+# copy of the catalog goes without checking the database for changes
+MOVIES_ANALYTICS_REFRESH_INTERVAL = 30
+
+# GET /api/movies/{id}/similar/: directory of the index written by
+# `manage.py build_similar_index`, and IVF lists scanned per lookup
+MOVIES_SIMILAR_INDEX_DIR = os.getenv("MOVIES_SIMILAR_INDEX_DIR", str(BASE_DIR / "var" / "similar"))
+MOVIES_SIMILAR_NPROBE = 16
+
+# /api/async/movies/: requests of one ASGI worker using the database at once
+# (each holds its own connection while it does)
+MOVIES_ASYNC_DB_CONCURRENCY = int(os.getenv("MOVIES_ASYNC_DB_CONCURRENCY", "20"))
+
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
+    "TOKEN_REFRESH_SERIALIZER": "users.serializer.TokenRefreshSerializer",
 }
 
+# Refresh token blacklist (users/blacklist.py): per-process Bloom filter
+# sizing, and seconds between reads of the jtis blacklisted by other
+# processes. Run `manage.py compact_token_blacklist` periodically (e.g.
+# hourly from cron) to delete the rows of expired tokens.
+USERS_TOKEN_BLACKLIST_BLOOM_CAPACITY = 1000000
+USERS_TOKEN_BLACKLIST_BLOOM_ERROR_RATE = 0.001
+USERS_TOKEN_BLACKLIST_SYNC_INTERVAL = 5
+
+# CachedJWTAuthentication: seconds a user stays in the per-process cache
+# (bounds how long writes made by other processes go unseen) and its size.
+# With stateless reads on, GET/HEAD/OPTIONS requests trust the token claims
+# and never load the user; deactivated users keep read access until their
+# access token expires.
+USERS_AUTH_CACHE_TTL = int(os.getenv("USERS_AUTH_CACHE_TTL", "60"))
+USERS_AUTH_CACHE_SIZE = 10000
+USERS_AUTH_STATELESS_READS = os.getenv("USERS_AUTH_STATELESS_READS", "false").lower() in ("1", "true", "yes")
+
 ROOT_URLCONF = "backend.urls"
 
 TEMPLATES = [
@@ -107,19 +174,105 @@ WSGI_APPLICATION = "backend.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
-
+# Connections are reused instead of opened on every request, either:
+# - DB_POOL=true: a per-process pool (backend.pooled_postgresql) that
+#   connections return to at the end of each request. At most
+#   DB_POOL_MAX_SIZE are open per process; a request waits up to
+#   DB_POOL_TIMEOUT seconds for a free one. With psycopg 3 and psycopg_pool
+#   installed (pip install "psycopg[binary,pool]") the pool is psycopg_pool's.
+# - otherwise persistent connections, kept per thread for DB_CONN_MAX_AGE
+#   seconds ("none" for unlimited, 0 to close them after each request).
+# DB_CONN_HEALTH_CHECKS pings a reused connection before its first use in
+# a request, so one dropped by the server fails over to a new connection.
+# Behind PgBouncer in transaction mode, set DB_DISABLE_SERVER_SIDE_CURSORS.
+
+DB_POOL = os.getenv("DB_POOL", "false").lower() in ("1", "true", "yes")
+DB_CONN_MAX_AGE = os.getenv("DB_CONN_MAX_AGE", "60")
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "backend.pooled_postgresql" if DB_POOL else "django.db.backends.postgresql",
         "NAME": os.getenv("DB_NAME"),
         "USER": os.getenv("DB_USER"),
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT"),
+        "CONN_MAX_AGE": 0 if DB_POOL else None if DB_CONN_MAX_AGE.lower() == "none" else int(DB_CONN_MAX_AGE),
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "true").lower() in ("1", "true", "yes"),
+        "DISABLE_SERVER_SIDE_CURSORS": os.getenv("DB_DISABLE_SERVER_SIDE_CURSORS", "false").lower() in ("1", "true", "yes"),
+        "OPTIONS": {
+            "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "10")),
+        },
+    }
+}
+
+if DB_POOL:
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
     }
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The "movies" alias holds the versioned movie API responses. It is local
+# memory by default; point it at a shared backend (e.g.
+# django.core.cache.backends.redis.RedisCache) so all workers share entries.
+# The "throttle" alias holds the login throttle history. It must be shared
+# in production: with local memory each gunicorn worker keeps its own
+# counts, so a limit of N per minute really allows N x workers.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "movies": {
+        "BACKEND": os.getenv("MOVIES_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("MOVIES_CACHE_LOCATION", "movies"),
+    },
+    "throttle": {
+        "BACKEND": os.getenv("THROTTLE_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("THROTTLE_CACHE_LOCATION", "throttle"),
+    },
+}
+
+MOVIES_CACHE_ALIAS = "movies"
+MOVIES_CACHE_TIMEOUT = int(os.getenv("MOVIES_CACHE_TIMEOUT", "300"))  # seconds
+LOGIN_THROTTLE_CACHE_ALIAS = "throttle"
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/4.2/topics/auth/passwords/
+# PASSWORD_HASHER picks the hasher for new passwords: pbkdf2, scrypt or
+# argon2. The others still verify existing hashes, which are rehashed with
+# the preferred one on the next login. Work factors can be tuned per
+# algorithm in USERS_PASSWORD_HASHER_PARAMS (see users/hashers.py).
+
+_PASSWORD_HASHERS = {
+    "argon2": "users.hashers.Argon2PasswordHasher",
+    "scrypt": "users.hashers.ScryptPasswordHasher",
+    "pbkdf2": "users.hashers.PBKDF2PasswordHasher",
 }
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "pbkdf2")
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[PASSWORD_HASHER],
+    *(hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER),
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+USERS_PASSWORD_HASHER_PARAMS = {}
+
+# Logins hash passwords in a pool of USERS_PASSWORD_HASH_WORKERS threads per
+# process (one per CPU by default); logins beyond that many plus
+# USERS_PASSWORD_HASH_MAX_PENDING waiting ones get 503 (users/hashing.py)
+AUTHENTICATION_BACKENDS = ["users.hashing.PooledModelBackend"]
+USERS_PASSWORD_HASH_WORKERS = int(os.getenv("USERS_PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+USERS_PASSWORD_HASH_MAX_PENDING = USERS_PASSWORD_HASH_WORKERS * 8
 
+# POST /api/auth/users/bulk/ and `manage.py provision_users`: users per
+# request, and processes hashing their passwords (one per CPU by default)
+USERS_PROVISION_MAX_ITEMS = 1000
+USERS_PROVISION_PROCESSES = int(os.getenv("USERS_PROVISION_PROCESSES", str(os.cpu_count() or 1)))
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -151,9 +304,16 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
+# Collected into STATIC_ROOT (manage.py collectstatic, run by the Docker
+# image) and served by WhiteNoise with gzip copies, also when DEBUG is off
 STATIC_URL = "static/"
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedStaticFilesStorage"},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -17,6 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework import routers
+from backend.instrumentation import metrics_view
+from movies.urls import async_urlpatterns as movies_async_urlpatterns
 from movies.urls import router as movies_router
 from users.urls import router as users_router
 
@@ -27,6 +29,8 @@ router.registry.extend(users_router.registry)
 urlpatterns = [
     path("admin/", admin.site.urls), 
     path("api/", include(router.urls)),  # All the REST APIs: /api/movies/, /api/users/
+    path("api/async/", include(movies_async_urlpatterns)),  # Async reads for ASGI servers
     # Auth endpoints (login, token refresh) from users app
     path("api/auth/", include("users.urls")),
+    path("metrics", metrics_view, name="metrics"),  # Prometheus request metrics
 ]
\ No newline at end of file
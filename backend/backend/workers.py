@@ -0,0 +1,19 @@
+"""
+Gunicorn worker classes.
+"""
+
+import warnings
+
+with warnings.catch_warnings():
+    # Moved to the separate uvicorn-worker package; the bundled one still works
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from uvicorn.workers import UvicornWorker as BaseUvicornWorker
+
+
+class UvicornWorker(BaseUvicornWorker):
+    """
+    Uvicorn worker for backend.asgi. Django does not implement the ASGI
+    lifespan protocol, so it is not attempted on every worker start.
+    """
+
+    CONFIG_KWARGS = {"loop": "asyncio", "http": "h11", "lifespan": "off"}
@@ -0,0 +1,118 @@
+"""
+Compares the columnar analytics engine with the equivalent ORM aggregates.
+
+Seeds a catalog, then times average rating per genre/year/director and the
+top 5 movies per genre both ways, plus the engine's initial load and an
+incremental refresh after a batch of writes:
+
+    python -m benchmarks.analytics [--rows 100000] [--repeat 20]
+"""
+
+import argparse
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import measure, print_table, setup_django, summarize, test_database
+
+
+def seed(count):
+    from django.utils import timezone
+
+    from movies.models import Movie
+
+    genres = ["Drama", "Comedy", "Action", "Crime", "Sci-Fi", "Thriller", "Horror", "Animation"]
+    batch = 5000
+    for start in range(0, count, batch):
+        Movie.objects.bulk_create(
+            Movie(
+                title=f"Movie {i:07}",
+                release_date=date(1950, 1, 1) + timedelta(days=(i * 37) % 27000),
+                genre=genres[i % len(genres)],
+                rating=(i * 7919 % 51) / 10,
+                director=f"Director {i % 2000}" if i % 10 else None,
+            )
+            for i in range(start, min(start + batch, count))
+        )
+    # An old catalog: refreshes only read back the rows written afterwards
+    Movie.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+
+def orm_queries():
+    from django.db.models import Avg, Count, F, Window
+    from django.db.models.functions import ExtractYear, RowNumber
+
+    from movies.models import Movie
+
+    def group(field, queryset=None):
+        queryset = Movie.objects.all() if queryset is None else queryset
+        return list(queryset.values(field).annotate(count=Count("id"), avg_rating=Avg("rating")).order_by(field))
+
+    def top_per_genre():
+        ranked = Movie.objects.annotate(
+            rank=Window(RowNumber(), partition_by=[F("genre")], order_by=[F("rating").desc(), F("id").asc()])
+        ).values("id", "genre", "rank")
+        # Django 4.2 cannot filter on window functions: ranks are filtered here
+        return [row for row in ranked if row["rank"] <= 5]
+
+    return {
+        "avg by genre": lambda: group("genre"),
+        "avg by year": lambda: group("year", Movie.objects.annotate(year=ExtractYear("release_date"))),
+        "avg by director": lambda: group("director", Movie.objects.exclude(director=None)),
+        "top 5 per genre": top_per_genre,
+    }
+
+
+def engine_queries(engine):
+    return {
+        "avg by genre": lambda: engine.group_by("genre"),
+        "avg by year": lambda: engine.group_by("year"),
+        "avg by director": lambda: engine.group_by("director"),
+        "top 5 per genre": lambda: engine.top_k(5, "genre"),
+    }
+
+
+def run(rows, repeat):
+    from movies.analytics import CatalogAnalytics
+    from movies.models import Movie
+
+    engine = CatalogAnalytics()
+    start = time.perf_counter()
+    engine.load()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    orm, vectorized = orm_queries(), engine_queries(engine)
+    table = []
+    for name in orm:
+        orm_stats = summarize(measure(orm[name], repeat, warmup=1))
+        engine_stats = summarize(measure(vectorized[name], repeat, warmup=1))
+        table.append((
+            name,
+            f"{orm_stats['mean_ms']:.2f}",
+            f"{engine_stats['mean_ms']:.2f}",
+            f"{orm_stats['mean_ms'] / engine_stats['mean_ms']:.1f}x",
+        ))
+    print_table(("query", "orm ms", "engine ms", "speedup"), table)
+
+    for movie in Movie.objects.order_by("id")[:100]:
+        movie.rating = 5.0
+        movie.save()
+    start = time.perf_counter()
+    changed = engine.refresh()
+    refresh_ms = (time.perf_counter() - start) * 1000
+    print(f"\nrows {rows}: full load {load_ms:.0f} ms, refresh of {changed} changed rows {refresh_ms:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        seed(args.rows)
+        run(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
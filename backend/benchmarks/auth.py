@@ -0,0 +1,83 @@
+"""
+Compares JWT authentication strategies on GET /api/movies/.
+
+Times authenticated list requests (served from the response cache, so
+authentication is most of the work left) and counts their queries with
+JWTAuthentication, CachedJWTAuthentication and stateless reads:
+
+    python -m benchmarks.auth [--repeat 500]
+"""
+
+import argparse
+from datetime import date, timedelta
+
+from benchmarks.common import measure, print_table, setup_django, summarize, test_database
+
+STRATEGIES = (
+    ("JWTAuthentication", "rest_framework_simplejwt.authentication.JWTAuthentication", False),
+    ("CachedJWTAuthentication", "users.authentication.CachedJWTAuthentication", False),
+    ("stateless reads", "users.authentication.CachedJWTAuthentication", True),
+)
+
+
+def seed(count):
+    from movies.models import Movie
+
+    Movie.objects.bulk_create(
+        Movie(title=f"Movie {i:05}", release_date=date(1990, 1, 1) + timedelta(days=i), genre="Drama", rating=3.5)
+        for i in range(count)
+    )
+
+
+def run(repeat):
+    from django.db import connection
+    from django.test import override_settings
+    from django.utils.module_loading import import_string
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from movies.views import MovieApiCreate
+    from users.authentication import user_cache
+    from users.models import User
+
+    user = User.objects.create_user(username="bench", password="bench-password")
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+    def request():
+        response = client.get("/api/movies/", {"page": 2})
+        assert response.status_code == 200, response.content
+
+    rows = []
+    default_classes = MovieApiCreate.authentication_classes
+    for name, authentication, stateless in STRATEGIES:
+        # View classes bind DEFAULT_AUTHENTICATION_CLASSES at import time
+        MovieApiCreate.authentication_classes = [import_string(authentication)]
+        try:
+            with override_settings(USERS_AUTH_STATELESS_READS=stateless):
+                user_cache.invalidate()
+                request()
+                queries = []
+                # request_started resets connection.queries: count through a wrapper
+                with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+                    request()
+                stats = summarize(measure(request, repeat))
+        finally:
+            MovieApiCreate.authentication_classes = default_classes
+        rows.append((name, len(queries), f"{stats['mean_ms']:.3f}", f"{stats['p99_ms']:.3f}"))
+    print_table(("authentication", "queries/request", "mean ms", "p99 ms"), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        seed(100)
+        run(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Measures token refresh latency as the blacklist table grows.
+
+Grows the BlacklistedToken table to each size (half of the rows expired),
+then times POST /api/auth/token/refresh/ with token rotation (a blacklist
+check and insert per request) and the Bloom filter load. Finally times
+`compact_token_blacklist` deleting the expired rows of the largest table:
+
+    python -m benchmarks.blacklist [--sizes 0,100000,1000000] [--repeat 200]
+"""
+
+import argparse
+import time
+from datetime import timedelta
+
+from benchmarks.common import measure, print_table, setup_django, summarize, test_database
+
+
+def grow(start, stop):
+    from django.utils import timezone
+
+    from users.models import BlacklistedToken
+
+    now = timezone.now()
+    batch = 10000
+    for offset in range(start, stop, batch):
+        BlacklistedToken.objects.bulk_create(
+            BlacklistedToken(
+                jti=f"{i:032x}",
+                expires_at=now + (timedelta(days=1) if i % 2 else -timedelta(days=1)),
+            )
+            for i in range(offset, min(offset + batch, stop))
+        )
+
+
+def run(sizes, repeat):
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from users.blacklist import token_blacklist
+    from users.models import User
+
+    user = User.objects.create_user(username="bench", password="bench-password")
+    client = APIClient()
+    token = [str(RefreshToken.for_user(user))]
+
+    def refresh():
+        response = client.post("/api/auth/token/refresh/", {"refresh": token[0]}, format="json")
+        assert response.status_code == 200, response.content
+        token[0] = response.data["refresh"]
+
+    rows, current = [], 0
+    for size in sizes:
+        grow(current, size)
+        current = max(current, size)
+        token_blacklist.invalidate()
+        start = time.perf_counter()
+        token_blacklist.bloom()
+        load_ms = (time.perf_counter() - start) * 1000
+        stats = summarize(measure(refresh, repeat))
+        rows.append((size, f"{load_ms:.0f}", f"{stats['p50_ms']:.2f}", f"{stats['p99_ms']:.2f}"))
+    print_table(("table rows", "bloom load ms", "refresh p50 ms", "refresh p99 ms"), rows)
+
+    start = time.perf_counter()
+    deleted = token_blacklist.compact(batch_size=5000)
+    elapsed = time.perf_counter() - start
+    print(f"\ncompaction: {deleted} expired rows deleted in {elapsed:.1f}s ({deleted / max(elapsed, 1e-9):.0f} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=lambda value: [int(s) for s in value.split(",")], default=[0, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(sorted(args.sizes), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
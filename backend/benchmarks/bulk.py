@@ -0,0 +1,68 @@
+"""
+Throughput of the bulk movie endpoint (POST /api/movies/bulk/).
+
+Posts batches of fresh movies, then the same batches again as updates,
+and reports rows/sec for each phase:
+
+    python -m benchmarks.bulk [--batches 10] [--batch-size 5000]
+"""
+
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import print_table, setup_django, test_database
+
+
+def make_batch(batch, size, rating):
+    return [
+        {
+            "title": f"Bulk {batch:03}-{i:05}",
+            "release_date": (date(1950, 1, 1) + timedelta(days=i)).isoformat(),
+            "genre": ("Drama", "Comedy", "Action")[i % 3],
+            "rating": rating,
+            "cast": [{"name": f"Actor {i % 101}"}],
+            "director": f"Director {i % 53}",
+            "description": "Plot summary.",
+        }
+        for i in range(size)
+    ]
+
+
+def run(batches, batch_size):
+    from django.contrib.auth import get_user_model
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    user = get_user_model().objects.create_user(username="bench", password="bench-pass")
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    rows = []
+    with override_settings(MOVIES_BULK_MAX_ITEMS=batch_size):
+        for phase, rating in (("insert", 3.0), ("update", 4.0)):
+            payloads = [json.dumps(make_batch(b, batch_size, rating)) for b in range(batches)]
+            start = time.perf_counter()
+            for payload in payloads:
+                res = client.post("/api/movies/bulk/", payload, content_type="application/json")
+                assert res.status_code == 200, res.content[:500]
+            elapsed = time.perf_counter() - start
+            total = batches * batch_size
+            rows.append((phase, total, f"{elapsed:.2f}", f"{total / elapsed:,.0f}"))
+    print_table(("phase", "rows", "seconds", "rows/sec"), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batches", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.batches, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
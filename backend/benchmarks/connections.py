@@ -0,0 +1,101 @@
+"""
+Measures per-request latency by database connection strategy.
+
+Sends --repeat GET /api/movies/{id}/ requests through the WSGI handler
+(so connections are opened and closed as in production, which the test
+client skips) with a unique query parameter so the response cache is
+bypassed and each request queries the database. Compares a new connection
+per request, persistent connections with and without health checks, and
+the backend.pooled_postgresql pool. Point DB_HOST at a TCP host to include
+network round trips in the connection setup:
+
+    python -m benchmarks.connections [--repeat 500]
+"""
+
+import argparse
+from datetime import date
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from benchmarks.common import measure, print_table, setup_django, summarize, test_database
+
+STRATEGIES = (
+    ("new connection per request", {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False}, False),
+    ("persistent", {"CONN_MAX_AGE": 60, "CONN_HEALTH_CHECKS": False}, False),
+    ("persistent + health checks", {"CONN_MAX_AGE": 60, "CONN_HEALTH_CHECKS": True}, False),
+    ("pool", {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": True}, True),
+)
+
+
+def run(repeat):
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from backend.pooled_postgresql.base import DatabaseWrapper as PooledDatabaseWrapper
+    from movies.models import Movie
+    from users.models import User
+
+    user = User.objects.create_user(username="bench", password="bench-password")
+    movie = Movie.objects.create(title="Bench", release_date=date(2000, 1, 1), genre="Drama", rating=4.0, director="D")
+    authorization = f"Bearer {AccessToken.for_user(user)}"
+    handler = WSGIHandler()
+    sent, backends = [0], set()
+
+    def count_connection(connection, **kwargs):
+        # Fires on every connect, also when the pool hands out an open one
+        backends.add(connection.connection.info.backend_pid)
+
+    def request():
+        sent[0] += 1
+        environ = {
+            "PATH_INFO": f"/api/movies/{movie.pk}/",
+            "QUERY_STRING": f"nocache={sent[0]}",
+            "HTTP_AUTHORIZATION": authorization,
+            "HTTP_ACCEPT": "application/json",
+            "wsgi.input": BytesIO(),
+        }
+        setup_testing_defaults(environ)
+        response = handler(environ, lambda status, headers: None)
+        assert response.status_code == 200, response.content
+        response.close()
+
+    original = connections["default"]
+    original.close()
+    connection_created.connect(count_connection)
+    rows = []
+    try:
+        for name, overrides, pooled in STRATEGIES:
+            settings_dict = {**original.settings_dict, **overrides}
+            if pooled:
+                settings_dict["OPTIONS"] = {**settings_dict["OPTIONS"], "pool": {"max_size": 4}}
+                wrapper = PooledDatabaseWrapper(settings_dict, "default")
+            else:
+                wrapper = original.__class__(settings_dict, "default")
+            connections["default"] = wrapper
+            backends.clear()
+            stats = summarize(measure(request, repeat))
+            rows.append((name, len(backends), f"{stats['mean_ms']:.2f}", f"{stats['p50_ms']:.2f}", f"{stats['p99_ms']:.2f}"))
+            wrapper.close()
+            if pooled:
+                wrapper.close_pool()
+    finally:
+        connection_created.disconnect(count_connection)
+        connections["default"] = original
+    print(f"{repeat} requests per strategy")
+    print_table(("strategy", "server connections", "mean ms", "p50 ms", "p99 ms"), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
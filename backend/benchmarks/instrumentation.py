@@ -0,0 +1,93 @@
+"""
+Measures the overhead of the request instrumentation.
+
+Sends GET /api/movies/ (a page of 10, bypassing the response cache) and
+GET /api/movies/{id}/ through the WSGI handler with and without
+InstrumentationMiddleware (and its query recorder), alternating the two
+over --rounds rounds of --repeat requests to even out noise. Reports the
+median latency of each and the overhead, which should stay below 2%:
+
+    python -m benchmarks.instrumentation [--rounds 10] [--repeat 200]
+"""
+
+import argparse
+import statistics
+from datetime import date
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from benchmarks.common import measure, print_table, setup_django, test_database
+
+MIDDLEWARE = "backend.instrumentation.InstrumentationMiddleware"
+
+
+def run(rounds, repeat):
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+    from django.test import override_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from backend.instrumentation import install_query_recorder, record_query
+    from movies.models import Movie
+    from users.models import User
+
+    user = User.objects.create_user(username="bench", password="bench-password")
+    Movie.objects.bulk_create(
+        Movie(title=f"Movie {i:05}", release_date=date(1950 + i % 70, 1, 1), genre="Drama", rating=(i % 50) / 10,
+              director=f"Director {i % 100}", cast=[f"Actor {i % 300}"])
+        for i in range(2000)
+    )
+    movie = Movie.objects.first()
+    authorization = f"Bearer {AccessToken.for_user(user)}"
+    sent = [0]
+
+    def requester(handler, path, query=""):
+        def request():
+            sent[0] += 1
+            environ = {
+                "PATH_INFO": path,
+                "QUERY_STRING": f"{query}&nocache={sent[0]}",
+                "HTTP_AUTHORIZATION": authorization,
+                "wsgi.input": BytesIO(),
+            }
+            setup_testing_defaults(environ)
+            response = handler(environ, lambda status, headers: None)
+            assert response.status_code == 200, response.content
+            response.close()
+        return request
+
+    with override_settings(MIDDLEWARE=[m for m in settings.MIDDLEWARE if m != MIDDLEWARE]):
+        plain = WSGIHandler()
+    instrumented = WSGIHandler()
+
+    endpoints = (("movie-list", "/api/movies/", "page_size=10"), ("movie-detail", f"/api/movies/{movie.pk}/", ""))
+    rows = []
+    for name, path, query in endpoints:
+        samples = {"off": [], "on": []}
+        for _ in range(rounds):
+            # The query recorder passes queries through outside instrumented
+            # requests, but is removed too for a clean baseline
+            connection.execute_wrappers[:] = [w for w in connection.execute_wrappers if w is not record_query]
+            samples["off"] += measure(requester(plain, path, query), repeat)
+            install_query_recorder(connection)
+            samples["on"] += measure(requester(instrumented, path, query), repeat)
+        off, on = statistics.median(samples["off"]) * 1000, statistics.median(samples["on"]) * 1000
+        rows.append((name, f"{off:.3f}", f"{on:.3f}", f"{(on - off) / off * 100:+.2f}%"))
+    print(f"{rounds} rounds x {repeat} requests per endpoint and mode")
+    print_table(("endpoint", "off p50 ms", "on p50 ms", "overhead"), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.rounds, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Load test of the movie list under WSGI (gunicorn) and ASGI (uvicorn).
+
+Seeds a catalog in a throwaway database, starts gunicorn on backend.wsgi
+(serving GET /api/movies/) and uvicorn on backend.asgi (serving the async
+GET /api/async/movies/) with the same number of workers, then drives each
+with 10/100/1000 concurrent keep-alive clients and reports throughput and
+latency percentiles:
+
+    python -m benchmarks.load [--rows 20000] [--clients 10,100,1000] [--duration 10]
+
+The client is a small asyncio HTTP/1.1 client, so the benchmark needs no
+load-testing tool. 1000 clients need a file descriptor limit above that
+(ulimit -n 4096). The sync list is served from the response cache when it
+can; --cache-bust adds a unique query parameter to every request so both
+servers hit the database.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+from benchmarks.common import percentile, print_table, setup_django, test_database
+
+GENRES = ["Drama", "Comedy", "Action", "Crime", "Sci-Fi", "Thriller", "Horror", "Animation"]
+
+
+def seed(count):
+    from django.contrib.auth import get_user_model
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from movies.models import Movie
+
+    batch = 5000
+    for start in range(0, count, batch):
+        Movie.objects.bulk_create(
+            Movie(
+                title=f"Movie {i:07}",
+                release_date=date(1950, 1, 1) + timedelta(days=(i * 37) % 27000),
+                genre=GENRES[i % len(GENRES)],
+                rating=(i * 7919 % 51) / 10,
+                director=f"Director {i % 2000}",
+                cast=[f"Actor {i % 5000}", f"Actor {(i * 7) % 5000}"],
+            )
+            for i in range(start, min(start + batch, count))
+        )
+    user = get_user_model().objects.create_user(username="load", password="load-test-password")
+    return str(AccessToken.for_user(user))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, workers, threads, db_name):
+    """
+    Starts gunicorn (wsgi) or uvicorn (asgi) on a free port against the
+    test database and waits until it accepts connections.
+    returns: (process, base url)
+    """
+    port = free_port()
+    if kind == "wsgi":
+        command = [
+            sys.executable, "-m", "gunicorn", "backend.wsgi:application", "--bind", f"127.0.0.1:{port}",
+            "--workers", str(workers), "--worker-class", "gthread", "--threads", str(threads),
+            "--backlog", "2048", "--log-level", "warning",
+        ]
+    else:
+        command = [
+            sys.executable, "-m", "uvicorn", "backend.asgi:application", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--backlog", "2048", "--log-level", "warning", "--no-access-log",
+        ]
+    return launch(command, port, db_name)
+
+
+def launch(command, port, db_name, quiet=False, **env):
+    """
+    Runs the server command against the test database (plus any extra
+    environment) and waits until it accepts connections on the port.
+    quiet discards the server output (e.g. runserver's access log).
+    returns: (process, base url)
+    """
+    env = dict(os.environ, DB_NAME=db_name, DJANGO_SETTINGS_MODULE="backend.settings", **env)
+    output = subprocess.DEVNULL if quiet else None
+    process = subprocess.Popen(command, env=env, stdout=output, stderr=output)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{command[2]} server did not start")
+
+
+async def read_response(reader):
+    """
+    Reads one HTTP/1.1 response. returns: (status, keep_alive)
+    """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    length, chunked, keep_alive = 0, False, True
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding":
+            chunked = "chunked" in value
+        elif name == "connection":
+            keep_alive = value != "close"
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    else:
+        await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def client(base_url, path, token, deadline, cache_bust, latencies, errors):
+    """
+    One keep-alive client sending requests back to back until the deadline.
+    """
+    url = urlsplit(base_url)
+    rng = random.Random()
+    reader = writer = None
+    sent = 0
+    while time.monotonic() < deadline:
+        params = f"page={rng.randint(1, 50)}"
+        if rng.random() < 0.5:
+            params += f"&genre={rng.choice(GENRES)}"
+        if cache_bust:
+            params += f"&nocache={id(latencies)}-{sent}"
+        sent += 1
+        request = (
+            f"GET {path}?{params} HTTP/1.1\r\nHost: {url.netloc}\r\n"
+            f"Authorization: Bearer {token}\r\nAccept: application/json\r\n\r\n"
+        ).encode()
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(url.hostname, url.port)
+            writer.write(request)
+            status, keep_alive = await read_response(reader)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            errors.append(1)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+            continue
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors.append(status)
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def drive(base_url, path, token, clients, duration, cache_bust):
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(base_url, path, token, deadline, cache_bust, latencies, errors) for _ in range(clients)
+    ))
+    return latencies, errors, time.perf_counter() - start
+
+
+def run(args, token, db_name):
+    targets = (("wsgi", "/api/movies/"), ("asgi", "/api/async/movies/"))
+    table = []
+    for kind, path in targets:
+        process, base_url = start_server(kind, args.workers, args.threads, db_name)
+        try:
+            # Warm every worker's connections and caches
+            asyncio.run(drive(base_url, path, token, args.workers * 4, 1, args.cache_bust))
+            for clients in args.clients:
+                latencies, errors, elapsed = asyncio.run(
+                    drive(base_url, path, token, clients, args.duration, args.cache_bust)
+                )
+                table.append((
+                    kind, clients, len(latencies), f"{len(latencies) / elapsed:.0f}",
+                    f"{percentile(latencies, 50) * 1000:.1f}" if latencies else "-",
+                    f"{percentile(latencies, 99) * 1000:.1f}" if latencies else "-",
+                    len(errors),
+                ))
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    print(f"rows {args.rows}, {args.workers} workers ({args.threads} threads per gunicorn worker), {args.duration}s per run")
+    print_table(("server", "clients", "requests", "req/s", "p50 ms", "p99 ms", "errors"), table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--clients", type=lambda value: [int(c) for c in value.split(",")], default=[10, 100, 1000])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--cache-bust", action="store_true")
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database() as connection:
+        token = seed(args.rows)
+        # The servers are separate processes: the seeded rows must be committed
+        # and this process' connection must not hold the database open.
+        db_name = connection.settings_dict["NAME"]
+        connection.close()
+        run(args, token, db_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Measures login throughput per password hasher.
+
+For each hasher, a user is created with a password hashed by it and
+--threads client threads call authenticate() (PooledModelBackend, so the
+hashing runs in the bounded pool) back to back for --duration seconds.
+Reports logins/sec, logins/sec per core and latency percentiles:
+
+    python -m benchmarks.login [--threads 16] [--duration 5]
+"""
+
+import argparse
+import os
+import threading
+import time
+
+from benchmarks.common import percentile, print_table, setup_django, test_database
+
+HASHERS = (
+    ("pbkdf2", "users.hashers.PBKDF2PasswordHasher"),
+    ("scrypt", "users.hashers.ScryptPasswordHasher"),
+    ("argon2", "users.hashers.Argon2PasswordHasher"),
+)
+
+
+def run(threads, duration):
+    from django.contrib.auth import authenticate
+    from django.db import connections
+    from django.test import override_settings
+
+    from users.models import User
+
+    cores = os.cpu_count() or 1
+    rows = []
+    for name, hasher in HASHERS:
+        with override_settings(PASSWORD_HASHERS=[hasher]):
+            User.objects.create_user(username=f"bench-{name}", password="bench-password")
+            latencies, failures = [], []
+            deadline = time.monotonic() + duration
+
+            def client():
+                try:
+                    while time.monotonic() < deadline:
+                        start = time.perf_counter()
+                        user = authenticate(username=f"bench-{name}", password="bench-password")
+                        latencies.append(time.perf_counter() - start)
+                        if user is None:
+                            failures.append(1)
+                finally:
+                    connections.close_all()
+
+            start = time.perf_counter()
+            workers = [threading.Thread(target=client) for _ in range(threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+        rate = len(latencies) / elapsed
+        rows.append((
+            name, len(latencies), f"{rate:.1f}", f"{rate / cores:.1f}",
+            f"{percentile(latencies, 50) * 1000:.0f}", f"{percentile(latencies, 99) * 1000:.0f}", len(failures),
+        ))
+    print(f"{threads} client threads, {cores} cores, {duration:.0f}s per hasher")
+    print_table(("hasher", "logins", "logins/s", "logins/s/core", "p50 ms", "p99 ms", "failed"), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.threads, args.duration)
+
+
+if __name__ == "__main__":
+    main()
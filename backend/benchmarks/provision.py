@@ -0,0 +1,50 @@
+"""
+Measures bulk user provisioning throughput.
+
+Provisions --users new users through provision_users() with the password
+hashing done inline (1 process) and in the process pool (all cores), and
+reports users/sec for each:
+
+    python -m benchmarks.provision [--users 2000]
+"""
+
+import argparse
+import os
+import time
+
+from benchmarks.common import print_table, setup_django, test_database
+
+
+def run(count):
+    from users.models import User
+    from users.provisioning import hashing_process_pool, provision_users
+
+    cores = os.cpu_count() or 1
+    rows = []
+    for processes in sorted({1, cores}):
+        items = [
+            {"username": f"bench-{processes}-{i}", "email": f"bench-{processes}-{i}@example.com", "password": f"password-{i}"}
+            for i in range(count)
+        ]
+        start = time.perf_counter()
+        results = provision_users(items, processes=processes)
+        elapsed = time.perf_counter() - start
+        created = sum(result["status"] == "created" for result in results)
+        rows.append((processes, created, f"{elapsed:.1f}", f"{created / elapsed:.0f}"))
+    hashing_process_pool.shutdown()
+    print(f"{count} users per run, {cores} cores, {User.objects.count()} users created")
+    print_table(("processes", "created", "seconds", "users/s"), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.users)
+
+
+if __name__ == "__main__":
+    main()
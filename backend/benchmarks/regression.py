@@ -0,0 +1,215 @@
+"""
+API performance regression suite.
+
+Grows a synthetic catalog to each size (generate_catalog) and measures
+latency, single-client throughput and queries per request of the main
+endpoints: the movie list (plain, with each filter and with keyset
+pagination), retrieve, create, login and token refresh. Reads run with the
+response cache cold, so every request reaches the database.
+
+The results are compared with a JSON baseline. An endpoint regresses when
+its p50 latency grows by more than --tolerance, or when it runs more
+queries than in the baseline; the script then exits with status 1:
+
+    python -m benchmarks.regression --save          # record the baseline
+    python -m benchmarks.regression                 # compare with it
+    python -m benchmarks.regression --sizes 10000 --tolerance 0.3
+
+Latencies only compare on the same machine and database, so record the
+baseline where the comparison runs (e.g. the CI runner).
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+from pathlib import Path
+
+from benchmarks.common import measure, print_table, setup_django, summarize, test_database
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+
+def seed(start, size):
+    """
+    Appends the synthetic movies numbered start..size-1 (generate_catalog
+    runs ANALYZE on PostgreSQL).
+    """
+    from django.core.management import call_command
+
+    call_command("generate_catalog", movies=size - start, start=start, stdout=io.StringIO())
+
+
+def endpoints(size):
+    """
+    Returns (name, request function, repeat divisor) per endpoint. Each
+    function performs one request and checks its status.
+    """
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from movies.cache import movie_response_cache
+    from movies.models import Movie
+    from users.models import User
+
+    user, _ = User.objects.get_or_create(username="bench")
+    user.set_password("bench-password")
+    user.save()
+    client = APIClient()
+    client.force_authenticate(user=user)
+    movie = Movie.objects.get(title__endswith=f" {size // 2}")
+
+    def get(path, params=None):
+        def request():
+            movie_response_cache.clear()
+            response = client.get(path, params)
+            assert response.status_code == 200, response.content
+        return request
+
+    created = iter(range(10 ** 9))
+
+    def create():
+        number = next(created)
+        response = client.post("/api/movies/", {
+            "title": f"Regression {size} {number}", "release_date": "2000-01-01", "genre": "Drama", "rating": 3.0,
+            "cast": [{"name": "Regression Actor"}], "director": "Regression Director",
+        }, format="json")
+        assert response.status_code == 201, response.content
+
+    anonymous = APIClient()
+
+    def login():
+        response = anonymous.post("/api/auth/login/", {"username": "bench", "password": "bench-password"}, format="json")
+        assert response.status_code == 200, response.content
+
+    token = [str(RefreshToken.for_user(user))]
+
+    def refresh():
+        response = anonymous.post("/api/auth/token/refresh/", {"refresh": token[0]}, format="json")
+        assert response.status_code == 200, response.content
+        token[0] = response.data["refresh"]
+
+    return [
+        ("list", get("/api/movies/"), 1),
+        ("list?page=50", get("/api/movies/", {"page": 50}), 1),
+        ("list?genre", get("/api/movies/", {"genre": movie.genre}), 1),
+        ("list?rating", get("/api/movies/", {"rating": 4.5}), 1),
+        ("list?genre&rating", get("/api/movies/", {"genre": movie.genre, "rating": 4.5}), 1),
+        ("list?actor", get("/api/movies/", {"actor": movie.cast[0]["name"]}), 1),
+        ("list?director", get("/api/movies/", {"director": movie.director}), 1),
+        ("list?search", get("/api/movies/", {"search": movie.title.split()[0]}), 1),
+        ("list?pagination=cursor", get("/api/movies/", {"pagination": "cursor"}), 1),
+        ("retrieve", get(f"/api/movies/{movie.pk}/"), 1),
+        ("create", create, 1),
+        # Password hashing makes logins slow by design
+        ("login", login, 5),
+        ("token refresh", refresh, 1),
+    ]
+
+
+def run(sizes, repeat):
+    """
+    returns: {size: {endpoint: {mean_ms, p50_ms, p99_ms, req_s, queries}}}
+    """
+    from django.conf import settings
+    from django.db import connection
+    from django.test import override_settings
+    from django.test.utils import CaptureQueriesContext
+
+    results = {}
+    # No login throttling: the suite logs in far more often than any client should
+    rest_framework = {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {"login": None, "login_failures": None}}
+    with test_database(), override_settings(REST_FRAMEWORK=rest_framework):
+        seeded = 0
+        for size in sizes:
+            seed(seeded, size)
+            seeded = size
+            results[str(size)] = measured = {}
+            for name, request, divisor in endpoints(size):
+                with CaptureQueriesContext(connection) as captured:
+                    request()
+                # Read now: the next request resets the connection's query log
+                queries = len(captured)
+                stats = summarize(measure(request, max(1, repeat // divisor), warmup=2))
+                measured[name] = {
+                    **{key: round(value, 3) for key, value in stats.items()},
+                    "req_s": round(1000 / stats["mean_ms"], 1),
+                    "queries": queries,
+                }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the results next to the baseline.
+    returns: list of regression descriptions
+    """
+    regressions, rows = [], []
+    for size, measured in results.items():
+        for name, current in measured.items():
+            previous = baseline.get(size, {}).get(name)
+            change, verdict = "", ""
+            if previous is not None:
+                ratio = current["p50_ms"] / previous["p50_ms"] - 1
+                change = f"{ratio:+.0%}"
+                if ratio > tolerance:
+                    verdict = "SLOWER"
+                    regressions.append(f"{name} @ {size}: p50 {previous['p50_ms']:.2f} -> {current['p50_ms']:.2f} ms")
+                if current["queries"] > previous["queries"]:
+                    verdict = (verdict + " MORE QUERIES").strip()
+                    regressions.append(f"{name} @ {size}: {previous['queries']} -> {current['queries']} queries")
+            rows.append((
+                size, name, current["queries"], f"{current['p50_ms']:.2f}", f"{current['p99_ms']:.2f}",
+                f"{current['req_s']:.0f}", "" if previous is None else f"{previous['p50_ms']:.2f}", change, verdict,
+            ))
+    print_table(("movies", "endpoint", "queries", "p50 ms", "p99 ms", "req/s", "base p50", "change", ""), rows)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=lambda value: [int(s) for s in value.split(",")], default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="Write the results to the baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p50 slowdown, 0.2 = 20%%")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    results = run(sorted(args.sizes), args.repeat)
+    document = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    baseline = document.get("results", {})
+
+    if args.save:
+        compare(results, {}, args.tolerance)
+        document = {
+            "environment": {
+                "database": connection.vendor, "cpus": os.cpu_count(), "python": platform.python_version(),
+                "machine": platform.machine(),
+            },
+            # Sizes not measured this time keep their previous baseline
+            "results": {**baseline, **results},
+        }
+        args.baseline.write_text(json.dumps(document, indent=2, sort_keys=True) + "\n")
+        print(f"\nbaseline written to {args.baseline}")
+        return
+
+    if not baseline:
+        compare(results, {}, args.tolerance)
+        print(f"\nno baseline at {args.baseline}; record one with --save")
+        return
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"\nno regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
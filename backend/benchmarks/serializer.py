@@ -0,0 +1,79 @@
+"""
+Compares MovieSerializer with the MovieReadSerializer fast path.
+
+Each sample fetches one page ordered like the list endpoint, serializes
+it and renders JSON, at page sizes 10, 100 and 1000:
+
+    python -m benchmarks.serializer [--repeat 50]
+"""
+
+import argparse
+from datetime import date, timedelta
+
+from benchmarks.common import measure, print_table, setup_django, summarize, test_database
+
+PAGE_SIZES = (10, 100, 1000)
+
+
+def seed(count):
+    from movies.models import Movie
+
+    genres = ["Drama", "Comedy", "Action", "Crime", "Sci-Fi", "Thriller"]
+    Movie.objects.bulk_create(
+        Movie(
+            title=f"Movie {i:05}",
+            description="A long enough description of the plot. " * 4,
+            release_date=date(1950, 1, 1) + timedelta(days=i * 7),
+            genre=genres[i % len(genres)],
+            rating=(i % 51) / 10,
+            cast=[{"name": f"Actor {i % 97}"}, {"name": f"Actor {i % 89}"}],
+            director=f"Director {i % 50}",
+        )
+        for i in range(count)
+    )
+
+
+def run(repeat):
+    from rest_framework.renderers import JSONRenderer
+
+    from movies.models import Movie
+    from movies.serializer import MovieReadSerializer, MovieSerializer
+
+    renderer = JSONRenderer()
+    queryset = Movie.objects.order_by("title", "id")
+    rows = []
+    for size in PAGE_SIZES:
+        def baseline():
+            return renderer.render(MovieSerializer(list(queryset[:size]), many=True).data)
+
+        def fast():
+            page = list(queryset.values(*MovieReadSerializer.sources())[:size])
+            return renderer.render(MovieReadSerializer(page, many=True).data)
+
+        assert baseline() == fast(), "fast path output differs from MovieSerializer"
+        slow_stats = summarize(measure(baseline, repeat))
+        fast_stats = summarize(measure(fast, repeat))
+        rows.append((
+            size,
+            f"{slow_stats['mean_ms']:.2f}",
+            f"{fast_stats['mean_ms']:.2f}",
+            f"{slow_stats['p99_ms']:.2f}",
+            f"{fast_stats['p99_ms']:.2f}",
+            f"{slow_stats['mean_ms'] / fast_stats['mean_ms']:.1f}x",
+        ))
+    print_table(("page", "serializer ms", "fast ms", "serializer p99", "fast p99", "speedup"), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        seed(max(PAGE_SIZES))
+        run(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Measures requests/sec per core of GET /api/movies/ by serving mode.
+
+Seeds a catalog in a throwaway database and serves it with the
+development server (manage.py runserver, as the Dockerfile used to) and
+with the production configuration in gunicorn.conf.py, in WSGI mode and in
+ASGI mode (serving the async GET /api/async/movies/). Each is driven by
+--clients concurrent keep-alive clients for --duration seconds:
+
+    python -m benchmarks.serve [--rows 20000] [--clients 64] [--duration 10] [--workers N]
+
+--workers sets WEB_CONCURRENCY; by default gunicorn.conf.py sizes the
+workers from the core count. Add --cache-bust to make every request reach
+the database instead of the response cache.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+from benchmarks.common import percentile, print_table, setup_django, test_database
+from benchmarks.load import drive, free_port, launch, seed
+
+
+def server_command(mode, port):
+    if mode == "runserver":
+        return [sys.executable, "manage.py", "runserver", f"127.0.0.1:{port}", "--noreload"], {}
+    return [sys.executable, "-m", "gunicorn"], {"SERVER_MODE": mode, "GUNICORN_BIND": f"127.0.0.1:{port}"}
+
+
+def run(args, token, db_name):
+    cores = os.cpu_count() or 1
+    targets = (("runserver", "/api/movies/"), ("wsgi", "/api/movies/"), ("asgi", "/api/async/movies/"))
+    table = []
+    for mode, path in targets:
+        port = free_port()
+        command, env = server_command(mode, port)
+        if args.workers and mode != "runserver":
+            env["WEB_CONCURRENCY"] = str(args.workers)
+        process, base_url = launch(command, port, db_name, quiet=mode == "runserver", GUNICORN_LOG_LEVEL="warning", **env)
+        try:
+            # Warm every worker's connections and caches
+            asyncio.run(drive(base_url, path, token, args.clients, 2, args.cache_bust))
+            latencies, errors, elapsed = asyncio.run(
+                drive(base_url, path, token, args.clients, args.duration, args.cache_bust)
+            )
+        finally:
+            process.terminate()
+            process.wait(timeout=60)
+        rate = len(latencies) / elapsed
+        table.append((
+            mode, len(latencies), f"{rate:.0f}", f"{rate / cores:.0f}",
+            f"{percentile(latencies, 50) * 1000:.1f}" if latencies else "-",
+            f"{percentile(latencies, 99) * 1000:.1f}" if latencies else "-",
+            len(errors),
+        ))
+    print(f"rows {args.rows}, {args.clients} clients, {cores} cores, {args.duration}s per server")
+    print_table(("server", "requests", "req/s", "req/s/core", "p50 ms", "p99 ms", "errors"), table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--cache-bust", action="store_true")
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database() as connection:
+        token = seed(args.rows)
+        db_name = connection.settings_dict["NAME"]
+        connection.close()
+        run(args, token, db_name)
+
+
+if __name__ == "__main__":
+    main()
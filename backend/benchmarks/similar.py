@@ -0,0 +1,87 @@
+"""
+Measures similar-movie lookups against flat and IVF indexes.
+
+Seeds a catalog, builds both index kinds into a temporary directory and
+times SimilarMovieIndex.similar() for random movies, reporting the recall
+of IVF (at several nprobe values) against the exact (flat) neighbours:
+
+    python -m benchmarks.similar [--rows 100000] [--repeat 200]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import measure, print_table, setup_django, summarize, test_database
+
+WORDS = ("heist space dream family war love detective robot island ghost city river storm king queen "
+         "school prison desert ocean train secret murder escape future past music dance revenge").split()
+NPROBES = (4, 8, 16, 32)
+
+
+def seed(count):
+    from movies.models import Movie
+
+    rng = random.Random(3)
+    genres = ["Drama", "Comedy", "Action", "Crime", "Sci-Fi", "Thriller", "Horror", "Animation"]
+    batch = 5000
+    for start in range(0, count, batch):
+        Movie.objects.bulk_create(
+            Movie(
+                title=f"Movie {i:07}",
+                release_date=date(1950, 1, 1) + timedelta(days=rng.randrange(27000)),
+                genre=rng.choice(genres),
+                rating=rng.randrange(51) / 10,
+                director=f"Director {rng.randrange(count // 20 + 1)}",
+                cast=[f"Actor {rng.randrange(count // 5 + 1)}" for _ in range(3)],
+                description=" ".join(rng.choice(WORDS) for _ in range(12)),
+            )
+            for i in range(start, min(start + batch, count))
+        )
+
+
+def run(rows, repeat):
+    from movies.management.commands.build_similar_index import Command
+    from movies.models import Movie
+    from movies.similar import FEATURE_FIELDS, SimilarMovieIndex
+
+    rng = random.Random(5)
+    sample = list(Movie.objects.order_by("?").values(*FEATURE_FIELDS)[:repeat])
+    table, exact = [], {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in ("flat", "ivf"):
+            path = f"{tmp}/{kind}"
+            start = time.perf_counter()
+            Command().handle(kind=kind, lists=None, dim=128, path=path)
+            build_s = time.perf_counter() - start
+            index = SimilarMovieIndex(path)
+            for nprobe in (None,) if kind == "flat" else NPROBES:
+                results = {row["id"]: [pk for pk, _ in index.similar(row, 10, nprobe)] for row in sample}
+                if kind == "flat":
+                    exact = results
+                recall = sum(len(set(results[pk]) & set(exact[pk])) for pk in results) / (10 * len(results))
+                stats = summarize(measure(lambda: index.similar(rng.choice(sample), 10, nprobe), repeat))
+                table.append((
+                    kind if nprobe is None else f"{kind} nprobe={nprobe}",
+                    f"{build_s:.1f}", f"{stats['p50_ms']:.3f}", f"{stats['p99_ms']:.3f}", f"{recall:.3f}",
+                ))
+    print(f"rows {rows}")
+    print_table(("index", "build s", "lookup p50 ms", "lookup p99 ms", "recall@10"), table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        seed(args.rows)
+        run(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Production server configuration, read by gunicorn from the working
+directory:
+
+    gunicorn                       # WSGI: backend.wsgi on threaded workers
+    SERVER_MODE=asgi gunicorn      # ASGI: backend.asgi on uvicorn workers
+
+Workers are forked from a master process that has already imported Django
+and every view (preload_app), so their code and read-only data is shared
+copy-on-write instead of loaded once per worker. Each worker is replaced
+gracefully after about GUNICORN_MAX_REQUESTS requests, bounding the
+memory a slow leak can take.
+
+Environment:
+SERVER_MODE -- wsgi (default) or asgi
+GUNICORN_BIND -- address to listen on (default 0.0.0.0:8000)
+WEB_CONCURRENCY -- worker processes (default 2 per core + 1 for wsgi,
+                   1 per core for asgi, whose workers are event loops)
+GUNICORN_THREADS -- request threads per wsgi worker (default 4)
+GUNICORN_MAX_REQUESTS -- requests before a worker is recycled (default 10000,
+                         0 to disable), with up to 10% random jitter so
+                         workers do not all restart at once
+GUNICORN_TIMEOUT -- seconds a silent worker is given before it is killed
+GUNICORN_GRACEFUL_TIMEOUT -- seconds a worker gets to finish its requests
+                             on restart/shutdown
+GUNICORN_KEEPALIVE -- seconds an idle keep-alive connection is kept open
+
+Each worker holds its own database connections (DB_POOL_MAX_SIZE with
+DB_POOL, else one per thread), so workers x that must stay below the
+server's max_connections.
+
+Login throttle counts live in the "throttle" cache (THROTTLE_CACHE_BACKEND,
+THROTTLE_CACHE_LOCATION). Point it at a shared backend such as Redis:
+with the default local memory cache every worker counts on its own and
+the login rates are multiplied by the number of workers.
+"""
+
+import gc
+import multiprocessing
+import os
+
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi").lower()
+if SERVER_MODE not in ("wsgi", "asgi"):
+    raise ValueError(f"SERVER_MODE must be wsgi or asgi, not {SERVER_MODE!r}")
+
+# Production defaults for settings that read the environment; DEBUG also
+# keeps every query in memory, which costs throughput
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+os.environ.setdefault("DJANGO_DEBUG", "false")
+
+cores = multiprocessing.cpu_count()
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+backlog = 2048
+
+if SERVER_MODE == "wsgi":
+    wsgi_app = "backend.wsgi:application"
+    worker_class = "gthread"
+    workers = int(os.getenv("WEB_CONCURRENCY", str(cores * 2 + 1)))
+    threads = int(os.getenv("GUNICORN_THREADS", "4"))
+else:
+    wsgi_app = "backend.asgi:application"
+    worker_class = "backend.workers.UvicornWorker"
+    workers = int(os.getenv("WEB_CONCURRENCY", str(cores)))
+
+preload_app = True
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    """
+    Runs in the master after the app is loaded and before workers fork.
+    """
+    from django.urls import get_resolver
+
+    # Import the URLconf and with it every view, serializer and app module,
+    # which Django otherwise does lazily on the first request of each worker
+    get_resolver().url_patterns
+    # Keep the imported objects out of the collector: its reference count
+    # updates would write to (and so copy) the pages shared with workers
+    gc.collect()
+    gc.freeze()
+
+
+def pre_fork(server, worker):
+    from django.db import connections
+
+    # A worker must not inherit a socket to the database from the master
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        if hasattr(connection, "close_pool"):
+            connection.close_pool()
@@ -1,5 +1,21 @@
 from django.contrib import admin
-from .models import Movie
+from .models import Credit, Movie, Person
+from .search import search_movies
+
+class CreditInline(admin.TabularInline):
+    """
+    Read-only view of the credits derived from the cast and director.
+    """
+
+    model = Credit
+    fields = ("person", "role", "character", "order")
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 
 class MovieAdmin(admin.ModelAdmin):
     """
@@ -11,5 +27,24 @@ class MovieAdmin(admin.ModelAdmin):
     search_fields = ("title", "genre", "cast")
     list_filter = ("genre", "release_date", "rating")
     ordering = ("-title",)
+    inlines = (CreditInline,)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Uses the indexed full-text search instead of ILIKE scans over search_fields.
+        """
+        if not search_term:
+            return queryset, False
+        return search_movies(queryset, search_term), False
+
+class PersonAdmin(admin.ModelAdmin):
+    """
+    People credited on movies, searchable by name.
+    """
+
+    list_display = ("name",)
+    search_fields = ("name",)
+
 
-admin.site.register(Movie, MovieAdmin)
\ No newline at end of file
+admin.site.register(Movie, MovieAdmin)
+admin.site.register(Person, PersonAdmin)
\ No newline at end of file
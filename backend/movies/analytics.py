@@ -0,0 +1,339 @@
+"""
+Read-only columnar copy of the catalog for analytics queries.
+
+The movies are loaded once into NumPy arrays: genre and director are
+dictionary-encoded into integer codes, release dates and ratings are kept
+as typed arrays. Group-by, filter and top-k queries then run as vectorized
+operations over whole columns instead of pulling rows through the ORM.
+The copy is refreshed incrementally from the change feed given by
+Movie.updated_at whenever the catalog version moves, and at least every
+MOVIES_ANALYTICS_REFRESH_INTERVAL seconds for writes made by other
+processes when the version counter is not shared.
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import movie_response_cache
+from .models import Movie
+
+GROUP_BY_FIELDS = ("genre", "year", "director")
+
+# Rows saved up to this long before the previous load/refresh started are
+# read again, covering transactions that committed after it and clock skew
+# between application servers.
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+_LOAD_FIELDS = ("id", "title", "release_date", "genre", "rating", "director")
+
+
+class Dictionary:
+    """
+    Encodes repeated strings as dense integer codes. None is coded -1.
+    """
+
+    __slots__ = ("values", "codes")
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def encode(self, value):
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value):
+        return self.codes.get(value, -2)
+
+    def copy(self):
+        return Dictionary(self.values)
+
+
+class CatalogColumns:
+    """
+    Immutable snapshot of the catalog, sorted by id. Refreshes build a new
+    snapshot, so readers never see a half-applied change.
+    """
+
+    def __init__(self, ids, titles, release_dates, ratings, genres, genre_codes, directors, director_codes):
+        self.ids = ids
+        self.titles = titles
+        self.release_dates = release_dates
+        self.ratings = ratings
+        self.genres = genres
+        self.genre_codes = genre_codes
+        self.directors = directors
+        self.director_codes = director_codes
+        self.years = release_dates.astype("datetime64[Y]").astype(np.int32) + 1970
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows, genres=None, directors=None):
+        """
+        Builds the columns from (id, title, release_date, genre, rating, director) rows.
+        """
+        genres = Dictionary() if genres is None else genres
+        directors = Dictionary() if directors is None else directors
+        ids, titles, dates, genre_codes, ratings, director_codes = [], [], [], [], [], []
+        for pk, title, release_date, genre, rating, director in rows:
+            ids.append(pk)
+            titles.append(title)
+            dates.append(release_date)
+            genre_codes.append(genres.encode(genre))
+            ratings.append(rating)
+            director_codes.append(directors.encode(director))
+        return cls(
+            np.array(ids, dtype=np.int64),
+            np.array(titles, dtype=object),
+            np.array(dates, dtype="datetime64[D]"),
+            np.array(ratings, dtype=np.float64),
+            genres,
+            np.array(genre_codes, dtype=np.int32),
+            directors,
+            np.array(director_codes, dtype=np.int32),
+        )
+
+    def merge(self, changed, live_ids=None):
+        """
+        Returns a new snapshot with the changed rows upserted by id and,
+        when live_ids is given, the rows missing from it removed.
+        """
+        update = CatalogColumns.from_rows(changed, self.genres.copy(), self.directors.copy())
+        keep = ~np.isin(self.ids, update.ids)
+        if live_ids is not None:
+            keep &= np.isin(self.ids, live_ids)
+        merged = CatalogColumns(
+            np.concatenate([self.ids[keep], update.ids]),
+            np.concatenate([self.titles[keep], update.titles]),
+            np.concatenate([self.release_dates[keep], update.release_dates]),
+            np.concatenate([self.ratings[keep], update.ratings]),
+            update.genres,
+            np.concatenate([self.genre_codes[keep], update.genre_codes]),
+            update.directors,
+            np.concatenate([self.director_codes[keep], update.director_codes]),
+        )
+        order = np.argsort(merged.ids, kind="stable")
+        return merged.take(order)
+
+    def take(self, index):
+        return CatalogColumns(
+            self.ids[index], self.titles[index], self.release_dates[index], self.ratings[index],
+            self.genres, self.genre_codes[index], self.directors, self.director_codes[index],
+        )
+
+    def mask(self, genre=None, director=None, year_from=None, year_to=None, min_rating=None, max_rating=None):
+        """
+        Boolean row mask for the given filters.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if genre is not None:
+            mask &= self.genre_codes == self.genres.lookup(genre)
+        if director is not None:
+            mask &= self.director_codes == self.directors.lookup(director)
+        if year_from is not None:
+            mask &= self.years >= year_from
+        if year_to is not None:
+            mask &= self.years <= year_to
+        if min_rating is not None:
+            mask &= self.ratings >= min_rating
+        if max_rating is not None:
+            mask &= self.ratings <= max_rating
+        return mask
+
+    def group_codes(self, by, mask):
+        """
+        Returns (codes, labels, mask): dense non-negative group codes for the
+        rows selected by the returned mask, and the label of each code.
+        Movies without a director are left out of director groups.
+        """
+        if by == "genre":
+            return self.genre_codes[mask], self.genres.values, mask
+        if by == "director":
+            mask = mask & (self.director_codes >= 0)
+            return self.director_codes[mask], self.directors.values, mask
+        if by == "year":
+            years = self.years[mask]
+            if not len(years):
+                return years, [], mask
+            first = int(years.min())
+            return years - first, list(range(first, int(years.max()) + 1)), mask
+        raise ValueError(f"Cannot group by '{by}'")
+
+    def row(self, index):
+        return {
+            "id": int(self.ids[index]),
+            "title": self.titles[index],
+            "release_date": str(self.release_dates[index]),
+            "genre": self.genres.values[self.genre_codes[index]],
+            "rating": float(self.ratings[index]),
+            "director": self.directors.values[self.director_codes[index]] if self.director_codes[index] >= 0 else None,
+        }
+
+
+class CatalogAnalytics:
+    """
+    Process-wide analytics engine over a CatalogColumns snapshot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._columns = None
+        self._version = None
+        self._watermark = None
+        self._refreshed_at = 0.0
+
+    @property
+    def refresh_interval(self):
+        return getattr(settings, "MOVIES_ANALYTICS_REFRESH_INTERVAL", 30)
+
+    def invalidate(self):
+        """
+        Drops the snapshot; the next query loads the catalog again.
+        """
+        with self._lock:
+            self._columns = None
+
+    def load(self):
+        """
+        Loads the whole catalog into a new snapshot.
+        """
+        with self._lock:
+            return self._load()
+
+    def refresh(self):
+        """
+        Applies the movies written since the last load/refresh.
+        returns: number of changed rows read
+        """
+        with self._lock:
+            if self._columns is None:
+                return len(self._load())
+            return self._refresh()
+
+    def columns(self):
+        """
+        Returns the current snapshot, refreshing it first if the catalog
+        version moved since the last refresh.
+        """
+        with self._lock:
+            if self._columns is None:
+                self._load()
+            elif (
+                movie_response_cache.get_version() != self._version
+                or time.monotonic() - self._refreshed_at > self.refresh_interval
+            ):
+                self._refresh()
+            return self._columns
+
+    def _load(self):
+        self._refreshed_at = time.monotonic()
+        self._version = movie_response_cache.get_version()
+        self._watermark = timezone.now()
+        rows = Movie.objects.order_by("id").values_list(*_LOAD_FIELDS).iterator(chunk_size=5000)
+        self._columns = CatalogColumns.from_rows(rows)
+        return self._columns
+
+    def _refresh(self):
+        # Rows saved since the previous refresh are upserted; deleted ids are
+        # only looked for when the row count shows there were deletions.
+        self._refreshed_at = time.monotonic()
+        self._version = movie_response_cache.get_version()
+        since, self._watermark = self._watermark - REFRESH_OVERLAP, timezone.now()
+        rows = list(Movie.objects.filter(updated_at__gte=since).order_by("id").values_list(*_LOAD_FIELDS))
+
+        columns = self._columns
+        changed_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        expected = len(columns) + int(np.count_nonzero(~np.isin(changed_ids, columns.ids)))
+        live_ids = None
+        if Movie.objects.count() != expected:
+            live_ids = np.fromiter(Movie.objects.values_list("id", flat=True).iterator(chunk_size=10000), dtype=np.int64)
+        if rows or live_ids is not None:
+            self._columns = columns.merge(rows, live_ids)
+        return len(rows)
+
+    def group_by(self, by, **filters):
+        """
+        Aggregates ratings per genre, release year or director.
+        arguments:
+        by -- one of GROUP_BY_FIELDS
+        filters -- genre, director, year_from, year_to, min_rating, max_rating
+        returns: list of {by, count, avg_rating, min_rating, max_rating} ordered by group
+        """
+        columns = self.columns()
+        codes, labels, mask = columns.group_codes(by, columns.mask(**filters))
+        ratings = columns.ratings[mask]
+        size = len(labels)
+        counts = np.bincount(codes, minlength=size)
+        sums = np.bincount(codes, weights=ratings, minlength=size)
+        mins = np.full(size, np.inf)
+        maxs = np.full(size, -np.inf)
+        np.minimum.at(mins, codes, ratings)
+        np.maximum.at(maxs, codes, ratings)
+
+        present = np.flatnonzero(counts)
+        groups = [
+            {
+                by: labels[code],
+                "count": int(counts[code]),
+                "avg_rating": float(sums[code] / counts[code]),
+                "min_rating": float(mins[code]),
+                "max_rating": float(maxs[code]),
+            }
+            for code in present
+        ]
+        return sorted(groups, key=lambda group: group[by])
+
+    def top_k(self, k, by=None, **filters):
+        """
+        Best rated movies overall, or per group.
+        Ties are broken by id so results are stable.
+        arguments:
+        k -- movies per group
+        by -- one of GROUP_BY_FIELDS, or None for a single global ranking
+        filters -- same as group_by
+        returns: list of movie rows, or list of {by, movies} ordered by group
+        """
+        columns = self.columns()
+        mask = columns.mask(**filters)
+        if by is None:
+            rows = np.flatnonzero(mask)
+            if len(rows) > k:
+                # Partial selection, then a small sort of the candidates
+                cutoff = np.partition(columns.ratings[rows], len(rows) - k)[len(rows) - k]
+                rows = rows[columns.ratings[rows] >= cutoff]
+            order = np.lexsort((columns.ids[rows], -columns.ratings[rows]))[:k]
+            return [columns.row(index) for index in rows[order]]
+
+        codes, labels, mask = columns.group_codes(by, mask)
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            return []
+        # Sort by group, best rating first, then id; rank rows inside each group
+        order = np.lexsort((columns.ids[rows], -columns.ratings[rows], codes))
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        ranks = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+        selected = order[ranks < k]
+
+        groups = {}
+        for code, index in zip(codes[selected], rows[selected]):
+            groups.setdefault(int(code), []).append(columns.row(index))
+        return sorted(
+            ({by: labels[code], "movies": movies} for code, movies in groups.items()),
+            key=lambda group: group[by],
+        )
+
+
+catalog_analytics = CatalogAnalytics()
@@ -8,3 +8,9 @@ class MoviesConfig(AppConfig):
     
     default_auto_field = "django.db.models.BigAutoField"
     name = "movies"
+
+    def ready(self):
+        """
+        Connects the Movie signal handlers.
+        """
+        from . import signals  # noqa: F401
@@ -0,0 +1,154 @@
+"""
+Async (ASGI) read path for movies.
+
+Plain Django async views over the async ORM: under an ASGI server a
+worker keeps serving other requests while these wait on the database,
+instead of blocking a thread per request. The JSON, filters and
+pagination are the same as the MovieApiCreate list and retrieve actions.
+"""
+
+import asyncio
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from users.authentication import CachedJWTAuthentication
+
+from .filters import filter_movies
+from .pagination import MovieCountPagination, MovieKeysetPagination
+from .serializer import MovieReadSerializer
+
+renderer = JSONRenderer()
+
+# One semaphore per event loop (one per ASGI worker process)
+_db_slots = weakref.WeakKeyDictionary()
+
+
+def db_slots():
+    """
+    Bounds the requests using the database at once in this worker. Every
+    async ORM call of a request runs on that request's own thread, which
+    opens its own connection; without a bound, a burst of clients opens a
+    connection each and exhausts the server's max_connections.
+    """
+    loop = asyncio.get_running_loop()
+    slots = _db_slots.get(loop)
+    if slots is None:
+        slots = _db_slots[loop] = asyncio.Semaphore(getattr(settings, "MOVIES_ASYNC_DB_CONCURRENCY", 20))
+    return slots
+
+
+def json_response(data, status_code=status.HTTP_200_OK, headers=None):
+    response = HttpResponse(renderer.render(data), content_type="application/json", status=status_code)
+    for header, value in (headers or {}).items():
+        response[header] = value
+    return response
+
+
+def error_response(exc):
+    headers = {}
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        headers["WWW-Authenticate"] = 'Bearer realm="api"'
+    detail = exc.detail if isinstance(exc.detail, (dict, list)) else {"detail": exc.detail}
+    return json_response(detail, exc.status_code, headers)
+
+
+async def authenticate(request):
+    """
+    JWT authentication with the same rules as CachedJWTAuthentication; only
+    a user cache miss touches the database.
+    Raises NotAuthenticated/AuthenticationFailed.
+    """
+    authentication = CachedJWTAuthentication()
+    authentication.read_only = True
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        raise exceptions.NotAuthenticated()
+    token = authentication.get_validated_token(raw_token)
+    if authentication.stateless or jwt_settings.USER_ID_CLAIM not in token:
+        return authentication.get_user(token)
+    user = authentication.get_cached_user(token)
+    if user is None:
+        user = await sync_to_async(authentication.get_user)(token)
+    return user
+
+
+def release_connections():
+    """
+    close_old_connections() for the calling thread, leaving connections
+    inside a transaction (test cases) alone.
+    """
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close_if_unusable_or_obsolete()
+
+
+def async_api_view(view):
+    """
+    Restricts an async view to GET/HEAD and authenticates the request,
+    turning API exceptions into DRF-shaped JSON errors. The database work
+    waits for one of the worker's db_slots().
+    """
+
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return error_response(exceptions.MethodNotAllowed(request.method))
+        try:
+            async with db_slots():
+                try:
+                    request.user = await authenticate(request)
+                    return await view(request, *args, **kwargs)
+                finally:
+                    # Release this request's connection with its slot rather
+                    # than at request_finished, after the slot is taken again
+                    await sync_to_async(release_connections)()
+        except exceptions.APIException as exc:
+            return error_response(exc)
+
+    wrapper.__name__ = view.__name__
+    wrapper.__doc__ = view.__doc__
+    return wrapper
+
+
+@async_api_view
+async def movie_list(request):
+    """
+    Async movie list. GET /api/async/movies/
+    Takes the filters and both pagination styles of GET /api/movies/.
+    arguments:
+    request -- HttpRequest object
+    returns: paginated list of movies
+    """
+    queryset = filter_movies(request.GET).values(*MovieReadSerializer.sources())
+    params = request.GET
+    if params.get("pagination") == "cursor" or MovieKeysetPagination.cursor_query_param in params:
+        paginator = MovieKeysetPagination()
+    else:
+        paginator = MovieCountPagination()
+    # The paginators are synchronous; they run a few short queries
+    page = await sync_to_async(paginator.paginate_queryset)(queryset, Request(request))
+    response = paginator.get_paginated_response([MovieReadSerializer.to_representation(row) for row in page])
+    return json_response(response.data)
+
+
+@async_api_view
+async def movie_detail(request, pk):
+    """
+    Async movie detail. GET /api/async/movies/{id}/
+    arguments:
+    request -- HttpRequest object
+    pk -- id of the movie
+    returns: the movie
+    """
+    row = await filter_movies(request.GET).values(*MovieReadSerializer.sources()).filter(pk=pk).afirst()
+    if row is None:
+        raise exceptions.NotFound("No Movie matches the given query.")
+    return json_response(MovieReadSerializer.to_representation(row))
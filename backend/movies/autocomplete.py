@@ -0,0 +1,128 @@
+import threading
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Upper
+
+from .models import Movie
+
+# Fields returned by the typeahead, kept small on purpose
+SUGGESTION_FIELDS = ("id", "title", "director")
+
+# pg_trgm cannot use the index for patterns shorter than a trigram
+MIN_TRIGRAM_LENGTH = 3
+
+
+class PrefixTrie:
+    """
+    Minimal prefix tree mapping lower-cased keys to suggestion rows.
+    Every word of a title or director is inserted as its own key so typing
+    any word of it ("knight") finds the movie ("The Dark Knight").
+    """
+
+    __slots__ = ("root",)
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, key, row):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(row)
+
+    def search(self, prefix, limit):
+        """
+        Returns up to `limit` distinct rows whose key starts with prefix,
+        in lexical order of the keys.
+        """
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+
+        results, seen = [], set()
+        stack = [node]
+        while stack and len(results) < limit:
+            node = stack.pop()
+            for row in node.get(None, ()):
+                if row["id"] not in seen:
+                    seen.add(row["id"])
+                    results.append(row)
+            # Push children in reverse so the smallest character pops first
+            stack.extend(node[c] for c in sorted((c for c in node if c is not None), reverse=True))
+        return results[:limit]
+
+
+class MovieTrieIndex:
+    """
+    In-process typeahead index used when the database has no pg_trgm.
+    It is built lazily from the catalog and dropped by the Movie signals,
+    so it is meant for SQLite development and test setups; each process
+    keeps its own copy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trie = None
+
+    def invalidate(self):
+        with self._lock:
+            self._trie = None
+
+    def _build(self):
+        trie = PrefixTrie()
+        for row in Movie.objects.order_by("title", "id").values(*SUGGESTION_FIELDS).iterator(chunk_size=2000):
+            keys = set()
+            for text in (row["title"], row["director"]):
+                words = (text or "").lower().split()
+                keys.update(" ".join(words[i:]) for i in range(len(words)))
+            for key in sorted(keys):
+                trie.insert(key, row)
+        return trie
+
+    def search(self, term, limit):
+        with self._lock:
+            if self._trie is None:
+                self._trie = self._build()
+            trie = self._trie
+        return trie.search(" ".join(term.lower().split()), limit)
+
+
+movie_trie_index = MovieTrieIndex()
+
+
+def suggest_movies(term, limit=10):
+    """
+    Returns lightweight title/director suggestions for a partial search term.
+    On PostgreSQL title prefixes are matched through the UPPER(title)
+    pattern index and sorted by title; when that leaves room, infix matches
+    on title or director are added through the UPPER(...) pg_trgm GIN
+    indexes.
+    Other databases use the in-process prefix trie.
+    arguments:
+    term -- partial text typed by the user
+    limit -- maximum number of suggestions
+    returns: list of dicts with id, title and director
+    """
+    term = term.strip()
+    if not term:
+        return []
+
+    if connection.vendor != "postgresql":
+        return movie_trie_index.search(term, limit)
+
+    results = list(
+        Movie.objects.filter(title__istartswith=term)
+        .order_by(Upper("title"))
+        .values(*SUGGESTION_FIELDS)[:limit]
+    )
+    if len(results) < limit and len(term) >= MIN_TRIGRAM_LENGTH:
+        results += (
+            Movie.objects.filter(Q(title__icontains=term) | Q(director__icontains=term))
+            .exclude(id__in=[row["id"] for row in results])
+            .order_by()
+            .values(*SUGGESTION_FIELDS)[: limit - len(results)]
+        )
+    return results
@@ -0,0 +1,236 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework import serializers
+
+from .facets import apply_facet_delta, count_facets, deferred_facet_updates
+from .models import Movie
+from .serializer import MovieSerializer
+from .signals import bulk_movie_writes, movies_bulk_written
+
+# Natural key of a movie, backed by the movies_unique_title_release_date constraint
+UPSERT_KEY = ("title", "release_date")
+UPSERT_UPDATE_FIELDS = ("description", "genre", "rating", "cast", "director", "updated_at")
+
+
+class MovieBulkItemSerializer(MovieSerializer):
+    """
+    Validates one item of a bulk request.
+    The unique (title, release_date) validator is dropped: it costs one
+    query per item, and conflicts are resolved by the upsert itself.
+    """
+
+    class Meta(MovieSerializer.Meta):
+        validators = []
+
+
+def get_chunk_size():
+    return getattr(settings, "MOVIES_BULK_CHUNK_SIZE", 1000)
+
+
+def get_max_items():
+    return getattr(settings, "MOVIES_BULK_MAX_ITEMS", 10000)
+
+
+def get_max_body_size():
+    return getattr(settings, "MOVIES_BULK_MAX_BODY_SIZE", 20 * 1024 * 1024)
+
+
+def validate_movies(items):
+    """
+    Validates a batch of raw movie dicts with a single reusable serializer.
+    arguments:
+    items -- iterable of dicts as sent by the client
+    returns: (valid, results) where valid is a list of (index, validated_data)
+             and results holds the per-item error entries
+    """
+    child = MovieBulkItemSerializer()
+    valid, results = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append({"index": index, "status": "invalid", "errors": {"non_field_errors": ["Expected an object."]}})
+            continue
+        try:
+            valid.append((index, child.run_validation(item)))
+        except serializers.ValidationError as exc:
+            results.append({"index": index, "status": "invalid", "errors": exc.detail})
+    return valid, results
+
+
+def upsert_movies(validated, chunk_size=None):
+    """
+    Inserts or updates validated movies by (title, release_date), in chunks
+    of bulk_create(update_conflicts=True). Must run inside a transaction.
+    When the same key appears more than once, the last item wins and the
+    earlier ones are reported as superseded.
+    arguments:
+    validated -- list of (index, validated_data)
+    chunk_size -- rows per INSERT ... ON CONFLICT statement
+    returns: list of per-item results with id and created/updated status
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    last_by_key = {}
+    for index, data in validated:
+        last_by_key[(data["title"], data["release_date"])] = index
+    winners = [(index, data) for index, data in validated if last_by_key[(data["title"], data["release_date"])] == index]
+
+    results, ids = [], {}
+    created_ids, updated_ids = [], []
+    for start in range(0, len(winners), chunk_size):
+        chunk = winners[start:start + chunk_size]
+        keys = [(data["title"], data["release_date"]) for _, data in chunk]
+        existing = _ids_by_key(keys)
+        facets = count_facets(Movie.objects.filter(id__in=existing.values()))
+        _bulk_create_upsert(data for _, data in chunk)
+        # Django 4.2 does not return primary keys for upserts
+        ids.update(existing)
+        ids.update(_ids_by_key([key for key in keys if key not in existing]))
+        # bulk_create sends no signals: move the chunk's rows between facets here
+        written = count_facets(Movie.objects.filter(id__in=[ids[key] for key in keys]))
+        written.subtract(facets)
+        apply_facet_delta(written)
+
+        for (index, _), key in zip(chunk, keys):
+            if key in existing:
+                results.append({"index": index, "status": "updated", "id": ids[key]})
+                updated_ids.append(ids[key])
+            else:
+                results.append({"index": index, "status": "created", "id": ids[key]})
+                created_ids.append(ids[key])
+
+    for index, data in validated:
+        key = (data["title"], data["release_date"])
+        if last_by_key[key] != index:
+            results.append({"index": index, "status": "superseded", "id": ids[key]})
+
+    movies_bulk_written.send(sender=Movie, created=created_ids, updated=updated_ids, deleted=[])
+    return results
+
+
+def _bulk_create_upsert(rows):
+    Movie.objects.bulk_create(
+        [Movie(**row) for row in rows],
+        update_conflicts=True,
+        unique_fields=UPSERT_KEY,
+        update_fields=UPSERT_UPDATE_FIELDS,
+    )
+
+
+def _last_per_key(rows):
+    """
+    Keeps the last row of each (title, release_date): one INSERT ... ON
+    CONFLICT statement cannot update the same row twice.
+    """
+    return list({(row["title"], row["release_date"]): row for row in rows}.values())
+
+
+def upsert_rows(rows):
+    """
+    Upserts one chunk of normalized movie dicts with bulk_create.
+    Used by the importer, which does not need per-item results.
+    returns: ids of the written movies
+    """
+    rows = _last_per_key(rows)
+    _bulk_create_upsert(rows)
+    return list(_ids_by_key([(row["title"], row["release_date"]) for row in rows]).values())
+
+
+# PostgreSQL COPY path: rows are streamed into a session-local staging
+# table and merged into movies_movie with a single INSERT ... ON CONFLICT.
+STAGING_TABLE = "movies_import_staging"
+STAGING_COLUMNS = ("seq", "title", "description", "release_date", "genre", "rating", "cast", "director")
+
+
+def copy_upsert_rows(rows):
+    """
+    Upserts one chunk of normalized movie dicts through COPY into a
+    temporary staging table. PostgreSQL only; must run inside a transaction.
+    returns: ids of the written movies
+    """
+    table = Movie._meta.db_table
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for seq, row in enumerate(rows):
+        writer.writerow((
+            seq, row["title"], row["description"], row["release_date"].isoformat(), row["genre"], row["rating"],
+            None if row["cast"] is None else json.dumps(row["cast"]), row["director"],
+        ))
+    buffer.seek(0)
+
+    columns = ", ".join(f'"{column}"' for column in STAGING_COLUMNS)
+    data_columns = ", ".join(f'"{column}"' for column in STAGING_COLUMNS[1:])
+    updates = ", ".join(f'"{field}" = EXCLUDED."{field}"' for field in UPSERT_UPDATE_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+                seq bigint, title varchar(100), description text, release_date date,
+                genre varchar(50), rating double precision, "cast" jsonb, director varchar(100)
+            ) ON COMMIT DELETE ROWS
+            """
+        )
+        cursor.copy_expert(f"COPY {STAGING_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(
+            f"""
+            INSERT INTO {table} ({data_columns}, "updated_at")
+            SELECT DISTINCT ON (title, release_date) {data_columns}, now()
+            FROM {STAGING_TABLE}
+            ORDER BY title, release_date, seq DESC
+            ON CONFLICT (title, release_date) DO UPDATE SET {updates}
+            RETURNING id
+            """
+        )
+        ids = [pk for pk, in cursor.fetchall()]
+        cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+    return ids
+
+
+def _ids_by_key(keys):
+    """
+    Maps (title, release_date) keys to existing movie ids with one query.
+    """
+    if not keys:
+        return {}
+    wanted = set(keys)
+    rows = Movie.objects.filter(title__in={title for title, _ in wanted}).values_list("title", "release_date", "id")
+    return {(title, released): pk for title, released, pk in rows if (title, released) in wanted}
+
+
+def bulk_upsert(items, chunk_size=None):
+    """
+    Validates and upserts a batch of movies in one transaction.
+    Invalid items are reported and skipped, the rest are written.
+    returns: per-item results ordered by index
+    """
+    validated, results = validate_movies(items)
+    if validated:
+        with transaction.atomic():
+            results += upsert_movies(validated, chunk_size)
+    return sorted(results, key=lambda result: result["index"])
+
+
+def bulk_delete(ids, chunk_size=None):
+    """
+    Deletes movies by id in chunks inside one transaction.
+    Deletion goes through the ORM collector so cascades keep related data
+    consistent; the facet changes of all rows are applied once at the end,
+    and the caches are invalidated by a single movies_bulk_written rather
+    than once per row.
+    returns: per-id results with deleted/not_found status
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    results, deleted_ids = [], []
+    with transaction.atomic(), deferred_facet_updates():
+        with bulk_movie_writes():
+            for start in range(0, len(ids), chunk_size):
+                chunk = ids[start:start + chunk_size]
+                queryset = Movie.objects.filter(id__in=chunk)
+                found = set(queryset.values_list("id", flat=True))
+                queryset.delete()
+                results += [{"id": pk, "status": "deleted" if pk in found else "not_found"} for pk in chunk]
+                deleted_ids += [pk for pk in chunk if pk in found]
+        movies_bulk_written.send(sender=Movie, created=[], updated=[], deleted=deleted_ids)
+    return results
@@ -0,0 +1,161 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .conditional import VALIDATOR_HEADERS, conditional_response, is_conditional, request_fingerprint
+
+CATALOG_VERSION_KEY = "movies:catalog-version"
+
+
+class MovieResponseCache:
+    """
+    Versioned cache for movie list/detail response data.
+    Every key embeds the current catalog version, so a single increment of
+    that counter on any Movie write makes all cached pages unreachable in
+    O(1); stale entries simply expire. The backend is whichever Django
+    cache alias MOVIES_CACHE_ALIAS points to (local memory by default,
+    Redis/Memcached for a cache shared between workers).
+    """
+
+    def __init__(self, alias=None):
+        self._alias = alias
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self._alias or getattr(settings, "MOVIES_CACHE_ALIAS", "default")]
+
+    @property
+    def timeout(self):
+        return getattr(settings, "MOVIES_CACHE_TIMEOUT", 300)
+
+    def get_version(self):
+        version = self.cache.get(CATALOG_VERSION_KEY)
+        if version is None:
+            self.cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+            version = self.cache.get(CATALOG_VERSION_KEY, 1)
+        return version
+
+    def bump_version(self):
+        """
+        Invalidates every cached response by moving to a new catalog version.
+        """
+        try:
+            self.cache.incr(CATALOG_VERSION_KEY)
+        except ValueError:
+            # Key missing (first write or evicted): any new value invalidates
+            self.cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+            self.cache.incr(CATALOG_VERSION_KEY)
+
+    def invalidate(self):
+        """
+        Bumps the version now and once more when the current transaction
+        commits, so a read racing with an uncommitted write cannot cache
+        old rows under the new version.
+        """
+        self.bump_version()
+        transaction.on_commit(self.bump_version)
+
+    def make_key(self, request, action, **kwargs):
+        """
+        Builds the cache key from the action, lookup kwargs and the
+        normalized (sorted) query parameters, including the page.
+        """
+        digest = request_fingerprint(request, action, sorted(kwargs.items()))
+        return f"movies:v{self.get_version()}:{action}:{digest}"
+
+    def count_key(self, request, exclude=()):
+        """
+        Builds the key of the row count of a filtered list: the query
+        parameters minus `exclude` (the page ones), so every page of a
+        filter shares one cached count until the next Movie write.
+        """
+        params = sorted((key, sorted(values)) for key, values in request.query_params.lists() if key not in exclude)
+        digest = hashlib.sha1(repr(params).encode("utf-8")).hexdigest()
+        return f"movies:v{self.get_version()}:count:{digest}"
+
+    def fetch(self, request, action, compute, **kwargs):
+        """
+        Returns the cached response for the request, or computes and stores it.
+        Only successful responses are cached, together with their ETag and
+        Last-Modified so conditional requests are answered from the cache too.
+        arguments:
+        request -- DRF request
+        action -- name of the view action ("list", "retrieve")
+        compute -- callable producing the Response on a miss
+        kwargs -- URL lookup kwargs of the view
+        returns: Response (or 304) with an X-Cache header
+        """
+        key = self.make_key(request, action, **kwargs)
+        entry = self.cache.get(key)
+        if entry is not None:
+            self._count(hit=True)
+            data, headers = entry
+            response = conditional_response(request, headers) if is_conditional(request) else None
+            if response is None:
+                response = Response(data, headers=headers)
+            response["X-Cache"] = "HIT"
+            return response
+
+        self._count(hit=False)
+        response = compute()
+        if response.status_code == status.HTTP_200_OK:
+            headers = {h: response[h] for h in VALIDATOR_HEADERS if response.has_header(h)}
+            self.cache.set(key, (response.data, headers), self.timeout)
+        response["X-Cache"] = "MISS"
+        return response
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        """
+        Returns the hit/miss counters of this process and the catalog version.
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "version": self.get_version(),
+        }
+
+    def clear(self):
+        """
+        Drops every cached entry and resets the counters.
+        """
+        self.cache.clear()
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+movie_response_cache = MovieResponseCache()
+
+
+class CachedResponseMixin:
+    """
+    Serves list and retrieve from the movie response cache.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return movie_response_cache.fetch(
+            request, "list", lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return movie_response_cache.fetch(
+            request, "retrieve", lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs), **kwargs
+        )
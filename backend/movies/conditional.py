@@ -0,0 +1,117 @@
+import hashlib
+
+from django.db.models import F, Func, Subquery
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+
+from .models import Movie, MovieFacet
+
+# Response headers that describe a representation and travel with it
+VALIDATOR_HEADERS = ("ETag", "Last-Modified")
+
+
+def request_fingerprint(request, *extra):
+    """
+    Stable digest of what a GET response depends on: host, sorted query
+    parameters (page included) and any extra values such as the action.
+    """
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    raw = repr((request.get_host(), extra, params))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def is_conditional(request):
+    meta = request.META
+    return any(
+        header in meta
+        for header in ("HTTP_IF_NONE_MATCH", "HTTP_IF_MODIFIED_SINCE", "HTTP_IF_MATCH", "HTTP_IF_UNMODIFIED_SINCE")
+    )
+
+
+def conditional_response(request, headers):
+    """
+    Evaluates the request preconditions against the validator headers.
+    arguments:
+    request -- DRF request
+    headers -- dict with the ETag and/or Last-Modified of the representation
+    returns: 304/412 response carrying the validators, or None to serve the full response
+    """
+    validators = HttpResponse()
+    for header, value in headers.items():
+        validators[header] = value
+    last_modified = headers.get("Last-Modified")
+    result = get_conditional_response(
+        request,
+        etag=headers.get("ETag"),
+        last_modified=last_modified and parse_http_date_safe(last_modified),
+        response=validators,
+    )
+    return None if result is validators else result
+
+
+def validator_headers(fingerprint, last_modified, count=None):
+    headers = {"ETag": quote_etag(hashlib.sha1(repr((fingerprint, last_modified, count)).encode()).hexdigest())}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified.timestamp())
+    return headers
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for list and retrieve.
+    The validators come from one cheap query: for lists, the catalog's
+    latest updated_at (an index lookup) plus the MovieFacet total, which
+    changes on deletes; for details, updated_at of the row. List validators
+    are catalog-wide, like the response cache invalidation: any Movie write
+    changes them, and no query scans the filtered movies. Lists only get an
+    ETag: a delete does not move the latest updated_at, so a Last-Modified
+    date would answer If-Modified-Since with a stale 304. Unchanged
+    representations are answered with 304 before any row is fetched or
+    serialized.
+    """
+
+    def list_validators(self, request):
+        total = MovieFacet.objects.order_by().values(total=Func(F("count"), function="SUM"))
+        state = Movie.objects.order_by("-updated_at").values("updated_at").annotate(count=Subquery(total)).first()
+        last_modified, count = (state["updated_at"], state["count"]) if state else (None, 0)
+        headers = validator_headers(request_fingerprint(request, "list"), last_modified, count)
+        headers.pop("Last-Modified", None)
+        return headers
+
+    def retrieve_validators(self, request, **kwargs):
+        lookup = {self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        updated_at = self.get_queryset().filter(**lookup).order_by().values_list("updated_at", flat=True).first()
+        if updated_at is None:
+            return None
+        return validator_headers(request_fingerprint(request, "retrieve", sorted(kwargs.items())), updated_at)
+
+    def _conditional(self, request, get_validators, compute):
+        # Validators are taken before the body: a write racing with this
+        # request can only make the ETag older than the body, never newer.
+        headers = get_validators()
+        if headers is not None and is_conditional(request):
+            not_modified = conditional_response(request, headers)
+            if not_modified is not None:
+                return not_modified
+
+        response = compute()
+        if response.status_code == status.HTTP_200_OK and headers is not None:
+            for header, value in headers.items():
+                response[header] = value
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(
+            request,
+            lambda: self.list_validators(request),
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(
+            request,
+            lambda: self.retrieve_validators(request, **kwargs),
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+        )
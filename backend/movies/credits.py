@@ -0,0 +1,56 @@
+from django.db.models import Q
+
+from .models import Credit, Movie, Person
+from .normalize import credit_entries
+
+# Movies rebuilt per batch of queries
+CREDIT_SYNC_CHUNK_SIZE = 1000
+
+
+def rebuild_credits(rows, person_model, credit_model):
+    """
+    Replaces the credits of a batch of movies with the people named in their
+    cast and director, in a constant number of queries.
+    Takes the models as arguments so the data migration can pass the
+    historical ones.
+    arguments:
+    rows -- iterable of (movie_id, cast, director)
+    person_model -- Person model class
+    credit_model -- Credit model class
+    """
+    entries = {movie_id: credit_entries(cast, director) for movie_id, cast, director in rows}
+    if not entries:
+        return
+    credit_model.objects.filter(movie_id__in=list(entries)).delete()
+
+    names = {name for credits in entries.values() for name, _, _, _ in credits}
+    if not names:
+        return
+    person_model.objects.bulk_create([person_model(name=name) for name in names], ignore_conflicts=True)
+    person_ids = dict(person_model.objects.filter(name__in=names).values_list("name", "id"))
+    credit_model.objects.bulk_create([
+        credit_model(movie_id=movie_id, person_id=person_ids[name], role=role, character=character, order=order)
+        for movie_id, credits in entries.items()
+        for name, role, character, order in credits
+    ])
+
+
+def sync_credits(movie_ids, chunk_size=CREDIT_SYNC_CHUNK_SIZE):
+    """
+    Rebuilds the credits of the given movies from their current cast and
+    director. Movies that no longer exist are skipped (their credits are
+    removed by the cascade).
+    """
+    movie_ids = list(movie_ids)
+    for start in range(0, len(movie_ids), chunk_size):
+        rows = Movie.objects.filter(id__in=movie_ids[start:start + chunk_size]).values_list("id", "cast", "director")
+        rebuild_credits(rows, Person, Credit)
+
+
+def credited_movies(role, name):
+    """
+    Filter matching movies that credit `name` (case-insensitive) in `role`.
+    The id__in subquery walks the person name and (person, role, movie)
+    indexes and never multiplies the movie rows.
+    """
+    return Q(id__in=Credit.objects.filter(role=role, person__name__iexact=name.strip()).values("movie_id"))
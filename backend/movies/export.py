@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+import zlib
+
+from django.conf import settings
+
+from .serializer import MovieReadSerializer
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+# Rendered lines are buffered into blocks of about this many bytes per yield
+EXPORT_BLOCK_SIZE = 64 * 1024
+
+
+def get_export_chunk_size():
+    return getattr(settings, "MOVIES_EXPORT_CHUNK_SIZE", 2000)
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Whether an Accept-Encoding header allows a gzip body: gzip, or failing
+    that *, listed with a non-zero q-value (so "gzip;q=0" refuses it).
+    """
+    qualities = {}
+    for coding in accept_encoding.split(","):
+        name, *params = [part.strip() for part in coding.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            qualities[name.lower()] = quality
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+def _ndjson_lines(rows):
+    represent = MovieReadSerializer.to_representation
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    for row in rows:
+        yield dumps(represent(row)) + "\n"
+
+
+def _csv_lines(rows):
+    """
+    CSV with the MovieSerializer columns; cast is written as a JSON array
+    so the file can be loaded back with import_movies.
+    """
+    names = MovieReadSerializer.compile()[0]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    represent = MovieReadSerializer.to_representation
+
+    def line(values):
+        writer.writerow(values)
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    yield line(names)
+    for row in rows:
+        data = represent(row)
+        if data.get("cast") is not None:
+            data["cast"] = json.dumps(data["cast"], ensure_ascii=False)
+        yield line([data[name] for name in names])
+
+
+def _blocks(lines, block_size=EXPORT_BLOCK_SIZE):
+    block, size = [], 0
+    for line in lines:
+        block.append(line)
+        size += len(line)
+        if size >= block_size:
+            yield "".join(block).encode("utf-8")
+            block, size = [], 0
+    if block:
+        yield "".join(block).encode("utf-8")
+
+
+def _gzip(blocks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_movies(queryset, fmt, gzip=False, chunk_size=None):
+    """
+    Streams a movie queryset as NDJSON or CSV.
+    Rows are read as values() dicts through a server-side cursor, so memory
+    stays flat whatever the size of the catalog.
+    arguments:
+    queryset -- filtered queryset of movies
+    fmt -- "ndjson" or "csv"
+    gzip -- compress the stream with gzip
+    chunk_size -- rows fetched per round trip of the cursor
+    returns: iterator of bytes
+    """
+    rows = queryset.values(*MovieReadSerializer.sources()).iterator(chunk_size=chunk_size or get_export_chunk_size())
+    lines = _csv_lines(rows) if fmt == "csv" else _ndjson_lines(rows)
+    blocks = _blocks(lines)
+    return _gzip(blocks) if gzip else blocks
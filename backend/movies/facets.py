@@ -0,0 +1,128 @@
+import math
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Floor, Least
+
+from .models import Movie, MovieFacet
+
+# Ratings are histogrammed in unit buckets [0, 1) ... [4, 5]; 5.0 falls in the last one
+RATING_BUCKETS = range(5)
+
+
+def rating_bucket(rating):
+    return min(int(math.floor(rating)), RATING_BUCKETS[-1])
+
+
+def facet_key(genre, rating):
+    return genre, rating_bucket(rating)
+
+
+def count_facets(queryset):
+    """
+    Counts the movies of a queryset per (genre, rating bucket) with one GROUP BY.
+    returns: Counter keyed by (genre, bucket)
+    """
+    rows = (
+        queryset.order_by()
+        .annotate(bucket=Least(Floor("rating"), Value(float(RATING_BUCKETS[-1]))))
+        .values("genre", "bucket")
+        .annotate(count=Count("id"))
+    )
+    return Counter({(row["genre"], int(row["bucket"])): row["count"] for row in rows})
+
+
+def apply_facet_delta(delta):
+    """
+    Adds a Counter of (genre, bucket) -> change (negative for removals) to
+    the summary table: one atomic UPDATE count = count + n per touched key.
+    """
+    changes = {key: n for key, n in delta.items() if n}
+    if not changes:
+        return
+    with transaction.atomic():
+        MovieFacet.objects.bulk_create(
+            [MovieFacet(genre=genre, rating_bucket=bucket, count=0) for (genre, bucket), n in changes.items() if n > 0],
+            ignore_conflicts=True,
+        )
+        for (genre, bucket), n in changes.items():
+            MovieFacet.objects.filter(genre=genre, rating_bucket=bucket).update(count=F("count") + n)
+
+
+class _PendingFacets(threading.local):
+    delta = None
+
+
+_pending = _PendingFacets()
+
+
+@contextmanager
+def deferred_facet_updates():
+    """
+    Collects the facet changes of every row written inside the block and
+    applies them as one delta on exit, so bulk paths that go through the
+    per-row signals (e.g. ORM deletes) touch each key once. Nothing is
+    applied if the block raises.
+    """
+    if _pending.delta is not None:
+        yield
+        return
+    _pending.delta = Counter()
+    try:
+        yield
+        delta = _pending.delta
+    finally:
+        _pending.delta = None
+    apply_facet_delta(delta)
+
+
+def record_facet_change(removed=None, added=None):
+    """
+    Records that a movie left the `removed` key and/or entered the `added` one.
+    """
+    delta = Counter()
+    if removed is not None:
+        delta[removed] -= 1
+    if added is not None:
+        delta[added] += 1
+    if _pending.delta is not None:
+        _pending.delta.update(delta)
+    else:
+        apply_facet_delta(delta)
+
+
+def rebuild_facets():
+    """
+    Recomputes the whole summary table from the movies table.
+    returns: number of facet rows written
+    """
+    counts = count_facets(Movie.objects.all())
+    with transaction.atomic():
+        MovieFacet.objects.all().delete()
+        MovieFacet.objects.bulk_create(
+            [MovieFacet(genre=genre, rating_bucket=bucket, count=n) for (genre, bucket), n in counts.items()]
+        )
+    return len(counts)
+
+
+def facet_summary(genre=None):
+    """
+    Reads the per-genre counts and the rating histogram from the summary table.
+    arguments:
+    genre -- restrict the rating histogram and the total to one genre
+    returns: dict with total, genres and ratings
+    """
+    rows = MovieFacet.objects.filter(count__gt=0).values_list("genre", "rating_bucket", "count")
+    genres, ratings = Counter(), Counter()
+    for row_genre, bucket, n in rows:
+        genres[row_genre] += n
+        if genre is None or row_genre == genre:
+            ratings[bucket] += n
+    return {
+        "total": sum(ratings.values()),
+        "genres": [{"genre": name, "count": genres[name]} for name in sorted(genres)],
+        "ratings": [{"min": bucket, "max": bucket + 1, "count": ratings[bucket]} for bucket in RATING_BUCKETS],
+    }
@@ -0,0 +1,49 @@
+from django.db.models import Q
+
+from .credits import credited_movies
+from .models import Credit, Movie
+from .search import search_movies
+
+
+def filter_movies(params):
+    """
+    Builds the movie queryset for the list/detail query parameters,
+    shared by the DRF viewset and the async views.
+    arguments:
+    params -- query parameters (QueryDict)
+    returns: filtered queryset ordered by (title, id), or by relevance with ?search=
+    """
+
+    query = Q()  # Start with an empty query
+
+    param_genre = params.get("genre", None)
+    if param_genre is not None:
+        query &= Q(genre=param_genre)
+
+    param_rating = params.get("rating", None)
+    if param_rating is not None:
+        try:
+            rating = float(param_rating)
+            query &= Q(rating__gte=rating)
+        except ValueError:
+            pass  # Ignore invalid rating filter
+
+    # People are matched through the indexed Person/Credit tables
+    param_actor = params.get("actor", None)
+    if param_actor:
+        query &= credited_movies(Credit.ACTOR, param_actor)
+
+    param_director = params.get("director", None)
+    if param_director:
+        query &= credited_movies(Credit.DIRECTOR, param_director)
+
+    # Ensure global alphabetical ordering across pagination,
+    # id breaks ties between movies sharing a title
+    queryset = Movie.objects.all().filter(query).order_by('title', 'id')
+
+    # Full-text search, ranked by relevance
+    param_search = params.get("search", None)
+    if param_search:
+        queryset = search_movies(queryset, param_search)
+
+    return queryset
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from movies.models import Movie
+from movies.similar import DEFAULT_DIM, FEATURE_FIELDS, build_index, get_index_dir
+
+
+class Command(BaseCommand):
+    help = "Build the memory-mapped nearest-neighbour index behind /api/movies/{id}/similar/."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=["auto", "flat", "ivf"], default="auto",
+                            help="flat (brute force) or ivf (k-means lists); auto picks by catalog size")
+        parser.add_argument("--lists", type=int, help="IVF lists, sqrt(rows) by default")
+        parser.add_argument("--dim", type=int, default=DEFAULT_DIM, help="Feature vector size")
+        parser.add_argument("--path", help="Index directory, MOVIES_SIMILAR_INDEX_DIR by default")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        queryset = Movie.objects.order_by("id")
+        # Movies saved from here on are replayed into the new version's delta
+        since = queryset.aggregate(latest=Max("updated_at"))["latest"]
+        count = queryset.count()
+        if not count:
+            raise CommandError("The catalog is empty.")
+        meta = build_index(
+            rows=lambda: queryset.values(*FEATURE_FIELDS).iterator(chunk_size=5000),
+            count=count,
+            descriptions=lambda: queryset.values_list("description", flat=True).iterator(chunk_size=5000),
+            index_dir=options["path"] or get_index_dir(),
+            kind=options["kind"],
+            lists=options["lists"],
+            dim=options["dim"],
+            changes=lambda: queryset.filter(updated_at__gte=since).values(*FEATURE_FIELDS).iterator(chunk_size=5000),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Similar movies index {meta['version']} built: {meta['count']} movies, {meta['kind']}"
+            f" ({meta['lists']} lists, dim {meta['dim']}, {meta['replayed']} saved during the build)"
+            f" in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,219 @@
+import csv
+import io
+import json
+import os
+import time
+from multiprocessing import Pool
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from movies.facets import rebuild_facets
+from movies.models import Credit, Movie, Person
+from movies.signals import movies_bulk_written
+from movies.synthetic import (
+    ACTORS, BLOCK_SIZE, DIRECTORS, ZIPF_EXPONENT, actor_name, block_ranges, director_name, movie_block, user_block,
+)
+
+# Persons created or looked up per query
+PEOPLE_CHUNK_SIZE = 5000
+
+# Parameters of the running generation, set in each worker process by _init_worker
+_job = {}
+
+
+def _init_worker(job):
+    _job.clear()
+    _job.update(job)
+
+
+def _copy(model, columns, rows):
+    """
+    Streams rows into the model's table with COPY. PostgreSQL only.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    names = ", ".join(f'"{model._meta.get_field(name).column}"' for name in columns)
+    # copy_expert is the driver's own method: map its errors to Django's
+    with connection.cursor() as cursor, connection.wrap_database_errors:
+        cursor.copy_expert(f"COPY {model._meta.db_table} ({names}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _write_movies(block_range):
+    """
+    Writes the movies numbered lo..hi-1 of one block, with their credits,
+    in one transaction. Movie `n` gets the id first_id + n - start.
+    returns: number of movies written
+    """
+    block, lo, hi = block_range
+    job = _job
+    movies = movie_block(block, job["seed"], job["actors"], job["directors"], job["exponent"])
+    offset = block * BLOCK_SIZE
+    rows, credits = [], []
+    for number in range(lo, hi):
+        i, pk = number - offset, job["first_id"] + number - job["start"]
+        cast, director = movies["casts"][i], movies["directors"][i]
+        rows.append((
+            pk, movies["titles"][i], movies["descriptions"][i], movies["release_dates"][i], movies["genres"][i],
+            movies["ratings"][i], [{"name": actor_name(rank)} for rank in cast], director_name(director),
+        ))
+        if job["credits"]:
+            credits += [(pk, job["actor_ids"][rank], Credit.ACTOR, order) for order, rank in enumerate(cast)]
+            credits.append((pk, job["director_ids"][director], Credit.DIRECTOR, 0))
+
+    with transaction.atomic():
+        if job["copy"]:
+            _copy(Movie, ("id", "title", "description", "release_date", "genre", "rating", "cast", "director",
+                          "updated_at"),
+                  (row[:6] + (json.dumps(row[6]), row[7], job["updated_at"]) for row in rows))
+            _copy(Credit, ("movie", "person", "role", "order"), credits)
+        else:
+            Movie.objects.bulk_create([
+                Movie(id=pk, title=title, description=description, release_date=released, genre=genre,
+                      rating=rating, cast=cast, director=director)
+                for pk, title, description, released, genre, rating, cast, director in rows
+            ])
+            Credit.objects.bulk_create([
+                Credit(movie_id=pk, person_id=person, role=role, order=order) for pk, person, role, order in credits
+            ])
+    if job["forked"]:
+        # Pool processes are terminated without closing their connections
+        connection.close()
+    return hi - lo
+
+
+def _write_users(block_range):
+    """
+    Writes the users numbered lo..hi-1 of one block in one transaction.
+    returns: number of users written
+    """
+    block, lo, hi = block_range
+    job = _job
+    users = user_block(block, job["seed"])[lo - block * BLOCK_SIZE:hi - block * BLOCK_SIZE]
+    User = get_user_model()
+    with transaction.atomic():
+        if job["copy"]:
+            _copy(User, ("password", "is_superuser", "username", "email", "first_name", "last_name", "is_staff",
+                         "is_active", "date_joined"),
+                  ((job["password"], False, username, email, first_name, last_name, False, True, job["now"])
+                   for username, email, first_name, last_name in users))
+        else:
+            User.objects.bulk_create([
+                User(password=job["password"], username=username, email=email, first_name=first_name,
+                     last_name=last_name)
+                for username, email, first_name, last_name in users
+            ])
+    if job["forked"]:
+        # Pool processes are terminated without closing their connections
+        connection.close()
+    return hi - lo
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic synthetic catalog of movies (with credits) and users for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movies", type=int, default=0, help="Movies to generate")
+        parser.add_argument("--users", type=int, default=0, help="Users to generate")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed generates the same rows")
+        parser.add_argument("--start", type=int, default=0, help="Number of the first movie and user, to append to a catalog")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Writer processes (PostgreSQL only)")
+        parser.add_argument("--actors", type=int, default=ACTORS, help="Size of the actor pool")
+        parser.add_argument("--directors", type=int, default=DIRECTORS, help="Size of the director pool")
+        parser.add_argument("--zipf", type=float, default=ZIPF_EXPONENT, help="Zipf exponent of the people's popularity")
+        parser.add_argument("--no-credits", action="store_true", help="Skip the Person/Credit rows")
+        parser.add_argument("--password", default="password", help="Password of every generated user (hashed once)")
+
+    def handle(self, *args, **options):
+        if min(options["movies"], options["users"], options["start"]) < 0:
+            raise CommandError("--movies, --users and --start must not be negative.")
+        if options["actors"] < 1 or options["directors"] < 1 or options["zipf"] <= 0:
+            raise CommandError("--actors and --directors must be positive, and so must --zipf.")
+        copy = connection.vendor == "postgresql"
+        # Other databases take one writer at a time
+        workers = max(1, options["workers"]) if copy else 1
+        job = {
+            "seed": options["seed"],
+            "start": options["start"],
+            "actors": options["actors"],
+            "directors": options["directors"],
+            "exponent": options["zipf"],
+            "credits": not options["no_credits"],
+            "copy": copy,
+            "forked": workers > 1,
+        }
+
+        if options["movies"]:
+            if job["credits"]:
+                job["actor_ids"], job["director_ids"] = self._create_people(options["actors"], options["directors"])
+            job["first_id"] = (Movie.objects.aggregate(last=Max("id"))["last"] or 0) + 1
+            job["updated_at"] = timezone.now().isoformat()
+            self._run(_write_movies, block_ranges(options["start"], options["movies"]), job, workers, "movies")
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [Movie]):
+                    cursor.execute(sql)
+            rebuild_facets()
+            movies_bulk_written.send(sender=Movie, created=None, updated=None, deleted=None)
+
+        if options["users"]:
+            job["password"] = make_password(options["password"])
+            job["now"] = timezone.now().isoformat()
+            self._run(_write_users, block_ranges(options["start"], options["users"]), job, workers, "users")
+
+        if copy:
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+    def _create_people(self, actors, directors):
+        """
+        Creates the whole actor and director pools (existing names are kept).
+        returns: (actor ids by rank, director ids by rank)
+        """
+        started = time.monotonic()
+        names = [actor_name(rank) for rank in range(actors)] + [director_name(rank) for rank in range(directors)]
+        ids = {}
+        for start in range(0, len(names), PEOPLE_CHUNK_SIZE):
+            chunk = names[start:start + PEOPLE_CHUNK_SIZE]
+            Person.objects.bulk_create([Person(name=name) for name in chunk], ignore_conflicts=True)
+            ids.update(Person.objects.filter(name__in=chunk).values_list("name", "id"))
+        self.stdout.write(f"  {len(names)} people in {time.monotonic() - started:.1f}s")
+        return [ids[name] for name in names[:actors]], [ids[name] for name in names[actors:]]
+
+    def _run(self, write, ranges, job, workers, label):
+        """
+        Writes the block ranges, spread over `workers` forked processes.
+        """
+        started = time.monotonic()
+        written = 0
+        try:
+            if workers > 1:
+                # Each process opens its own connections: none may be inherited
+                connections.close_all()
+                with Pool(workers, initializer=_init_worker, initargs=(job,)) as pool:
+                    for count in pool.imap_unordered(write, ranges):
+                        written = self._progress(label, written, count, started)
+            else:
+                _init_worker(job)
+                for block_range in ranges:
+                    written = self._progress(label, written, write(block_range), started)
+        except IntegrityError as exc:
+            raise CommandError(
+                f"Some of the generated {label} already exist ({exc}). "
+                "Generate into an empty catalog or append with --start."
+            )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {written} {label} in {elapsed:.1f}s ({written / max(elapsed, 1e-9):.0f} rows/s)"
+        ))
+
+    def _progress(self, label, written, count, started):
+        written += count
+        if written % (BLOCK_SIZE * 10) < count:
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"  {written} {label}, {written / max(elapsed, 1e-9):.0f} rows/s")
+        return written
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from movies.facets import count_facets, rebuild_facets
+from movies.models import Movie, MovieFacet
+
+
+class Command(BaseCommand):
+    help = "Rebuild the genre/rating facet counts from the movies table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Only report facets that drifted from the movies table")
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            expected = count_facets(Movie.objects.all())
+            stored = {
+                (genre, bucket): n
+                for genre, bucket, n in MovieFacet.objects.filter(count__gt=0).values_list("genre", "rating_bucket", "count")
+            }
+            drifted = sorted(key for key in set(expected) | set(stored) if expected.get(key, 0) != stored.get(key, 0))
+            for genre, bucket in drifted:
+                self.stdout.write(
+                    f"{genre} [{bucket}, {bucket + 1}): stored {stored.get((genre, bucket), 0)}, "
+                    f"actual {expected.get((genre, bucket), 0)}"
+                )
+            if drifted:
+                self.stdout.write(self.style.WARNING(f"{len(drifted)} facets drifted."))
+            else:
+                self.stdout.write(self.style.SUCCESS("Facets are up to date."))
+            return
+
+        rows = rebuild_facets()
+        self.stdout.write(self.style.SUCCESS(f"Facets rebuilt: {rows} rows."))
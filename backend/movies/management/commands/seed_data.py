@@ -1,14 +1,30 @@
-from django.core.management.base import BaseCommand
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
 from django.apps import apps
-from datetime import datetime
+from movies.normalize import to_date, to_rating_0_5
 
 class Command(BaseCommand):
-    help = "Seed superuser and 15 movies."
+    help = "Seed superuser and 15 movies, plus optionally a synthetic catalog (--movies N, see generate_catalog)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movies", type=int, default=0, help="Synthetic movies to generate on top of the 15")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic movies")
+        parser.add_argument("--start", type=int, default=0, help="Number of the first synthetic movie, to append to a catalog")
+        parser.add_argument("--workers", type=int, help="Writer processes (PostgreSQL only)")
+        parser.add_argument("--no-credits", action="store_true", help="Skip the Person/Credit rows of the synthetic movies")
 
     def handle(self, *args, **options):
+        if options["movies"] < 0:
+            raise CommandError("--movies must not be negative.")
         self._ensure_superuser()
         self._seed_movies()
+        if options["movies"]:
+            generate = {"movies": options["movies"], "seed": options["seed"], "start": options["start"],
+                        "no_credits": options["no_credits"]}
+            if options["workers"]:
+                generate["workers"] = options["workers"]
+            call_command("generate_catalog", stdout=self.stdout, stderr=self.stderr, **generate)
 
     def _ensure_superuser(self):
         User = get_user_model()
@@ -48,20 +64,6 @@ class Command(BaseCommand):
             {"title": "City of God", "genre": "Crime", "release_date": "2002-08-30", "rating": 8.6, "director": "Fernando Meirelles", "description": "The rise of crime in Rio."},
         ]
 
-        def to_date(s):
-            try:
-                return datetime.strptime(s, "%Y-%m-%d").date()
-            except Exception:
-                return None
-
-        def to_rating_0_5(r):
-            # convierte ratings en escala 0–10 a 0–5 y respeta el constraint
-            try:
-                val = float(r) / 2.0
-                return max(0.0, min(5.0, val))
-            except Exception:
-                return None
-
         created, updated = 0, 0
         for m in movies:
             defaults = {}
@@ -83,4 +85,4 @@ class Command(BaseCommand):
             created += 1 if was_created else 0
             updated += 0 if was_created else 1
 
-        self.stdout.write(self.style.SUCCESS(f"Seed done. Created: {created}, updated: {updated}"))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(f"Seed done. Created: {created}, updated: {updated}"))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-18 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_alter_movie_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['title', 'id'], name='movies_title_id_idx'),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 4.2.27 on 2026-10-18 16:08
+
+import django.contrib.postgres.search
+from django.db import migrations, transaction
+
+# The search document is computed by a trigger so that every write path
+# (ORM saves, bulk_create, raw SQL imports) keeps it in sync.
+SEARCH_DOCUMENT = """
+setweight(to_tsvector('english', coalesce({row}.title, '')), 'A') ||
+setweight(to_tsvector('english', coalesce({row}.director, '')), 'B') ||
+setweight(to_tsvector('english', coalesce((
+    SELECT string_agg(coalesce(member ->> 'name', member #>> '{{}}'), ' ')
+    FROM jsonb_array_elements(
+        CASE WHEN jsonb_typeof({row}."cast") = 'array' THEN {row}."cast" ELSE '[]'::jsonb END
+    ) AS member
+), '')), 'B') ||
+setweight(to_tsvector('english', coalesce({row}.description, '')), 'C')
+"""
+
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION movies_movie_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := %s;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER movies_movie_search_vector
+    BEFORE INSERT OR UPDATE OF title, description, director, "cast" ON movies_movie
+    FOR EACH ROW EXECUTE FUNCTION movies_movie_search_vector_update();
+""" % SEARCH_DOCUMENT.strip().format(row="NEW")
+
+# Existing rows are backfilled by id range, each batch in its own
+# transaction, so a large catalog is never locked by one long UPDATE.
+# Writing search_vector does not fire the trigger (it only watches the
+# source columns).
+BACKFILL_BATCH = """
+UPDATE movies_movie SET search_vector = %s
+WHERE id >= %%s AND id < %%s AND search_vector IS NULL;
+""" % SEARCH_DOCUMENT.strip().format(row="movies_movie")
+
+BACKFILL_BATCH_SIZE = 5000
+
+CREATE_INDEX = """
+CREATE INDEX movies_search_vector_gin ON movies_movie USING gin (search_vector);
+"""
+
+DROP_TRIGGER = """
+DROP INDEX IF EXISTS movies_search_vector_gin;
+DROP TRIGGER IF EXISTS movies_movie_search_vector ON movies_movie;
+DROP FUNCTION IF EXISTS movies_movie_search_vector_update();
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    connection = schema_editor.connection
+    with transaction.atomic(using=connection.alias):
+        schema_editor.execute(CREATE_TRIGGER)
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT min(id), max(id) FROM movies_movie")
+        first_id, last_id = cursor.fetchone()
+    if first_id is not None:
+        for start in range(first_id, last_id + 1, BACKFILL_BATCH_SIZE):
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.execute(BACKFILL_BATCH, [start, start + BACKFILL_BATCH_SIZE])
+
+    with transaction.atomic(using=connection.alias):
+        schema_editor.execute(CREATE_INDEX)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    # The backfill commits batch by batch.
+    atomic = False
+
+    dependencies = [
+        ('movies', '0006_movie_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
@@ -0,0 +1,71 @@
+from django.db import DatabaseError, migrations, transaction
+
+# Typeahead indexes, PostgreSQL only: a pattern-ops index on UPPER(title)
+# for prefix matches (the SQL Django emits for title__istartswith)
+# and pg_trgm GIN indexes for infix matches on title and director. The
+# trigram indexes are on UPPER(...) too, since that is what icontains
+# compares. Servers without pg_trgm, or roles not allowed to create it,
+# only get the prefix index; infix suggestions still work there, without
+# index support.
+CREATE_PREFIX_INDEX = """
+CREATE INDEX movies_title_upper_prefix ON movies_movie (UPPER(title) text_pattern_ops);
+"""
+
+CREATE_TRIGRAM_EXTENSION = "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+
+CREATE_TRIGRAM_INDEXES = """
+CREATE INDEX movies_title_trgm ON movies_movie USING gin (UPPER(title) gin_trgm_ops);
+CREATE INDEX movies_director_trgm ON movies_movie USING gin (UPPER(director) gin_trgm_ops);
+"""
+
+DROP_INDEXES = """
+DROP INDEX IF EXISTS movies_director_trgm;
+DROP INDEX IF EXISTS movies_title_trgm;
+DROP INDEX IF EXISTS movies_title_upper_prefix;
+"""
+
+
+def create_typeahead_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(CREATE_PREFIX_INDEX)
+    if has_trigram_extension(schema_editor):
+        schema_editor.execute(CREATE_TRIGRAM_INDEXES)
+
+
+def has_trigram_extension(schema_editor):
+    """
+    Returns whether pg_trgm is installed, installing it when the server
+    ships it and the role is allowed to create it.
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is not None:
+            return True
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return False
+    try:
+        with transaction.atomic(using=connection.alias):
+            schema_editor.execute(CREATE_TRIGRAM_EXTENSION)
+    except DatabaseError:
+        # e.g. insufficient privilege to create the extension
+        return False
+    return True
+
+
+def drop_typeahead_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_INDEXES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_movie_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_typeahead_indexes, drop_typeahead_indexes),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.27 on 2026-10-18 16:22
+
+from django.db import IntegrityError, migrations, models
+from django.db.models import Count, Max, Min
+
+# Colliding keys listed in the error before it is cut short
+MAX_REPORTED_DUPLICATES = 20
+
+
+def check_duplicate_movies(apps, schema_editor):
+    """
+    Stops the migration with the list of colliding rows when existing
+    movies share a (title, release_date): which copy to keep is for the
+    operator to decide, not the migration.
+    """
+    Movie = apps.get_model("movies", "Movie")
+    duplicates = (
+        Movie.objects.using(schema_editor.connection.alias)
+        .values("title", "release_date")
+        .annotate(rows=Count("id"), first_id=Min("id"), last_id=Max("id"))
+        .filter(rows__gt=1)
+        .order_by("title", "release_date")
+    )
+    total = duplicates.count()
+    if not total:
+        return
+    lines = [
+        f"  {row['title']!r} ({row['release_date']}): {row['rows']} rows, ids {row['first_id']}..{row['last_id']}"
+        for row in duplicates[:MAX_REPORTED_DUPLICATES]
+    ]
+    if total > MAX_REPORTED_DUPLICATES:
+        lines.append(f"  ... and {total - MAX_REPORTED_DUPLICATES} more")
+    raise IntegrityError(
+        f"Cannot add movies_unique_title_release_date: {total} (title, release_date) keys are used by "
+        "more than one movie. Merge or delete the extra rows, then run the migration again.\n" + "\n".join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0009_movie_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_movies, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='movie',
+            constraint=models.UniqueConstraint(fields=('title', 'release_date'), name='movies_unique_title_release_date'),
+        ),
+    ]
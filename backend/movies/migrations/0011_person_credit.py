@@ -0,0 +1,108 @@
+# Generated by Django 4.2.27 on 2026-10-18 16:29
+
+from django.db import migrations, models, transaction
+import django.db.models.deletion
+import django.db.models.functions.text
+
+# Frozen copy of the credit backfill as of this migration, independent of
+# movies.credits / movies.normalize so later changes there cannot alter it.
+# Movies are processed by id in batches, each in its own transaction.
+BACKFILL_BATCH_SIZE = 1000
+MAX_NAME_LENGTH = 200
+
+
+def credit_entries(cast, director):
+    entries, seen = [], set()
+
+    def add(name, role, character, order):
+        name = " ".join(str(name or "").split())
+        if name and len(name) <= MAX_NAME_LENGTH and (name, role) not in seen:
+            seen.add((name, role))
+            character = " ".join(str(character or "").split())[:MAX_NAME_LENGTH] or None
+            entries.append((name, role, character, order))
+
+    if isinstance(cast, list):
+        for order, member in enumerate(cast):
+            if isinstance(member, dict):
+                add(member.get("name"), "actor", member.get("character") or member.get("role"), order)
+            elif isinstance(member, str):
+                add(member, "actor", None, order)
+    if director:
+        add(director, "director", None, 0)
+    return entries
+
+
+def insert_credits(rows, Person, Credit, using):
+    entries = {movie_id: credit_entries(cast, director) for movie_id, cast, director in rows}
+    names = {name for credits in entries.values() for name, _, _, _ in credits}
+    if not names:
+        return
+    Person.objects.using(using).bulk_create([Person(name=name) for name in names], ignore_conflicts=True)
+    person_ids = dict(Person.objects.using(using).filter(name__in=names).values_list("name", "id"))
+    Credit.objects.using(using).bulk_create([
+        Credit(movie_id=movie_id, person_id=person_ids[name], role=role, character=character, order=order)
+        for movie_id, credits in entries.items()
+        for name, role, character, order in credits
+    ], ignore_conflicts=True)
+
+
+def backfill_credits(apps, schema_editor):
+    Movie = apps.get_model("movies", "Movie")
+    Person = apps.get_model("movies", "Person")
+    Credit = apps.get_model("movies", "Credit")
+    using = schema_editor.connection.alias
+    last_id = 0
+    while True:
+        with transaction.atomic(using=using):
+            rows = list(
+                Movie.objects.using(using).filter(id__gt=last_id).order_by("id")
+                .values_list("id", "cast", "director")[:BACKFILL_BATCH_SIZE]
+            )
+            if not rows:
+                return
+            insert_credits(rows, Person, Credit, using)
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    # The backfill commits batch by batch.
+    atomic = False
+
+    dependencies = [
+        ('movies', '0010_movie_unique_title_release_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Person',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+                'indexes': [models.Index(django.db.models.functions.text.Upper('name'), name='movies_person_name_upper_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Credit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('actor', 'Actor'), ('director', 'Director')], max_length=10)),
+                ('character', models.CharField(blank=True, max_length=200, null=True)),
+                ('order', models.PositiveSmallIntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credits', to='movies.movie')),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credits', to='movies.person')),
+            ],
+            options={
+                'ordering': ['movie', 'role', 'order'],
+                'indexes': [models.Index(fields=['person', 'role', 'movie'], name='movies_credit_person_role_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='credit',
+            constraint=models.UniqueConstraint(fields=('movie', 'person', 'role'), name='movies_unique_credit'),
+        ),
+        migrations.RunPython(backfill_credits, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.27 on 2026-10-18 16:31
+
+from django.db import migrations, models
+
+from movies.facets import count_facets
+
+
+def backfill_facets(apps, schema_editor):
+    Movie = apps.get_model("movies", "Movie")
+    MovieFacet = apps.get_model("movies", "MovieFacet")
+    MovieFacet.objects.bulk_create(
+        [MovieFacet(genre=genre, rating_bucket=bucket, count=n) for (genre, bucket), n in count_facets(Movie.objects.all()).items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0011_person_credit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('genre', models.CharField(max_length=50)),
+                ('rating_bucket', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['genre', 'rating_bucket'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='moviefacet',
+            constraint=models.UniqueConstraint(fields=('genre', 'rating_bucket'), name='movies_unique_facet'),
+        ),
+        migrations.RunPython(backfill_facets, migrations.RunPython.noop),
+    ]
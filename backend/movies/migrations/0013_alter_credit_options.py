@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-18 18:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0012_moviefacet'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='credit',
+            options={'ordering': ['movie_id', 'role', 'order']},
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db.models import Q
+from django.db.models.functions import Upper
 
 class Movie(models.Model):
     """
@@ -14,6 +16,10 @@ class Movie(models.Model):
         rating (float): The movie's rating between 0.0 and 5.0.
         cast (list): A list of actors in the movie.
         director (str): The director of the movie.
+        updated_at (datetime): Last time the movie was written, used for
+            conditional GETs (ETag / Last-Modified).
+        search_vector (tsvector): Full-text document of title, director, cast
+            and description, kept up to date by a database trigger on PostgreSQL.
     """
 
     title = models.CharField(max_length=100)
@@ -23,18 +29,144 @@ class Movie(models.Model):
     rating = models.FloatField(validators=[MinValueValidator(0.0), MaxValueValidator(5.0)])
     cast = models.JSONField(blank=True, null=True) # List of actors
     director = models.CharField(max_length=100, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Maintained by the movies_movie_search_vector trigger, GIN indexed (see migration 0007)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['-title']
+        indexes = [
+            # Backs the (title, id) keyset used by the list endpoint
+            models.Index(fields=["title", "id"], name="movies_title_id_idx"),
+            # ?genre=X pages come out of the index already sorted by title
+            models.Index(fields=["genre", "title", "id"], name="movies_genre_title_id_idx"),
+            # ?genre=X&rating=Y range lookups
+            models.Index(fields=["genre", "rating"], name="movies_genre_rating_idx"),
+            # ?rating=Y without genre, and the admin's rating filter
+            models.Index(fields=["rating"], name="movies_rating_idx"),
+            models.Index(fields=["release_date"], name="movies_release_date_idx"),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=Q(rating__gte=0.0) & Q(rating__lte=5.0),
                 name="movies_rating_between_0_and_5",
-            )
+            ),
+            # Natural key used by the bulk upserts
+            models.UniqueConstraint(
+                fields=["title", "release_date"],
+                name="movies_unique_title_release_date",
+            ),
         ]
 
     def __str__(self):
         """
         String representation of the Movie instance.
         """
-        return f"{self.title} ({self.release_date.year}) - Genre: {self.genre}, Rating: {self.rating}"
\ No newline at end of file
+        return f"{self.title} ({self.release_date.year}) - Genre: {self.genre}, Rating: {self.rating}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_stored_facet()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using, fields)
+        self.remember_stored_facet()
+
+    def remember_stored_facet(self):
+        """
+        Keeps the genre/rating the stored row has, so the facet signals know
+        which facet an update moves the movie out of without reading the row
+        again. None when either field is deferred. Like any loaded state it
+        goes stale if the row is written through another instance meanwhile.
+        """
+        loaded = self.__dict__
+        self._stored_facet = (loaded["genre"], loaded["rating"]) if "genre" in loaded and "rating" in loaded else None
+
+
+class MovieFacet(models.Model):
+    """
+    Precomputed number of movies per genre and rating bucket, backing the
+    facets endpoint. Kept up to date incrementally by the Movie signals and
+    bulk paths (see movies.facets); rebuilt with `manage.py rebuild_facets`.
+
+    Attributes:
+        genre (str): Genre of the movies counted.
+        rating_bucket (int): Integer part of the rating, 0 to 4 (5.0 counts in 4).
+        count (int): Number of movies with that genre and rating bucket.
+    """
+
+    genre = models.CharField(max_length=50)
+    rating_bucket = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["genre", "rating_bucket"]
+        constraints = [
+            models.UniqueConstraint(fields=["genre", "rating_bucket"], name="movies_unique_facet"),
+        ]
+
+    def __str__(self):
+        return f"{self.genre} [{self.rating_bucket}, {self.rating_bucket + 1}): {self.count}"
+
+
+class Person(models.Model):
+    """
+    Actor or director credited on movies, normalized out of Movie.cast
+    and Movie.director.
+
+    Attributes:
+        name (str): Name as written in the cast/director of the movies.
+    """
+
+    name = models.CharField(max_length=200, unique=True)
+
+    class Meta:
+        ordering = ["name"]
+        indexes = [
+            # Case-insensitive ?actor= / ?director= lookups (name__iexact)
+            models.Index(Upper("name"), name="movies_person_name_upper_idx"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class Credit(models.Model):
+    """
+    Link between a movie and a person, rebuilt from Movie.cast and
+    Movie.director whenever the movie is written (see movies.credits).
+
+    Attributes:
+        movie (Movie): The credited movie.
+        person (Person): The credited person.
+        role (str): "actor" or "director".
+        character (str): Character played, when the cast entry names one.
+        order (int): Position of the person in the cast list.
+    """
+
+    ACTOR = "actor"
+    DIRECTOR = "director"
+    ROLE_CHOICES = [(ACTOR, "Actor"), (DIRECTOR, "Director")]
+
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="credits")
+    person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name="credits")
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    character = models.CharField(max_length=200, blank=True, null=True)
+    order = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        # movie_id, not movie: following Movie's ordering would add a join
+        ordering = ["movie_id", "role", "order"]
+        indexes = [
+            # "Movies with actor X": person -> role -> movie ids, index only
+            models.Index(fields=["person", "role", "movie"], name="movies_credit_person_role_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["movie", "person", "role"], name="movies_unique_credit"),
+        ]
+
+    def __str__(self):
+        # Local columns only, so printing a credit never queries
+        return f"person {self.person_id} ({self.role}) in movie {self.movie_id}"
@@ -0,0 +1,134 @@
+"""
+Normalization of raw movie records (seed data, CSV and NDJSON imports).
+
+Pure functions without Django model imports, so they can run in worker
+processes that never set Django up.
+"""
+
+import json
+from datetime import datetime
+
+MOVIE_FIELDS = ("title", "description", "release_date", "genre", "rating", "cast", "director")
+MAX_LENGTHS = {"title": 100, "genre": 50, "director": 100}
+
+
+def to_date(s):
+    try:
+        return datetime.strptime(s, "%Y-%m-%d").date()
+    except Exception:
+        return None
+
+
+def to_rating_0_5(r):
+    # convierte ratings en escala 0–10 a 0–5 y respeta el constraint
+    try:
+        val = float(r) / 2.0
+        return max(0.0, min(5.0, val))
+    except Exception:
+        return None
+
+
+def to_cast(value):
+    """
+    Accepts a list, a JSON array string or "Name A|Name B" and returns a list.
+    """
+    if value is None or isinstance(value, list):
+        return value
+    value = str(value).strip()
+    if not value:
+        return None
+    if value.startswith("["):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return [{"name": name.strip()} for name in value.split("|") if name.strip()]
+
+
+def credit_entries(cast, director, max_length=200):
+    """
+    Lists the people credited by a cast list and a director.
+    Cast members may be names or {"name": ..., "role"/"character": ...}
+    objects; blank, repeated and over-long names are skipped.
+    returns: list of (name, role, character, order) tuples
+    """
+    entries, seen = [], set()
+
+    def add(name, role, character, order):
+        name = " ".join(str(name or "").split())
+        if name and len(name) <= max_length and (name, role) not in seen:
+            seen.add((name, role))
+            character = " ".join(str(character or "").split())[:max_length] or None
+            entries.append((name, role, character, order))
+
+    if isinstance(cast, list):
+        for order, member in enumerate(cast):
+            if isinstance(member, dict):
+                add(member.get("name"), "actor", member.get("character") or member.get("role"), order)
+            elif isinstance(member, str):
+                add(member, "actor", None, order)
+    if director:
+        add(director, "director", None, 0)
+    return entries
+
+
+def normalize_movie(record, rating_scale=10):
+    """
+    Converts a raw record into Movie field values.
+    arguments:
+    record -- dict read from CSV or NDJSON
+    rating_scale -- 10 when ratings come on a 0–10 scale (like the seed data), 5 otherwise
+    returns: dict of Movie fields, or None when the record cannot be stored
+    """
+    title = (record.get("title") or "").strip()
+    genre = (record.get("genre") or "").strip()
+    release_date = to_date(str(record.get("release_date") or "").strip())
+    if rating_scale == 10:
+        rating = to_rating_0_5(record.get("rating"))
+    else:
+        try:
+            rating = float(record.get("rating"))
+        except (TypeError, ValueError):
+            rating = None
+    if not title or not genre or release_date is None or rating is None or not 0.0 <= rating <= 5.0:
+        return None
+
+    movie = {
+        "title": title,
+        "description": record.get("description") or None,
+        "release_date": release_date,
+        "genre": genre,
+        "rating": rating,
+        "cast": to_cast(record.get("cast")),
+        "director": (record.get("director") or "").strip() or None,
+    }
+    if any(movie[field] and len(movie[field]) > limit for field, limit in MAX_LENGTHS.items()):
+        return None
+    return movie
+
+
+def normalize_block(args):
+    """
+    Normalizes a block of records; runs in importer worker processes.
+    arguments:
+    args -- (records, fmt, rating_scale); NDJSON records are raw lines
+    returns: (movies, invalid_count)
+    """
+    records, fmt, rating_scale = args
+    movies, invalid = [], 0
+    for record in records:
+        if fmt == "ndjson":
+            try:
+                record = json.loads(record)
+            except ValueError:
+                invalid += 1
+                continue
+            if not isinstance(record, dict):
+                invalid += 1
+                continue
+        movie = normalize_movie(record, rating_scale)
+        if movie is None:
+            invalid += 1
+        else:
+            movies.append(movie)
+    return movies, invalid
@@ -0,0 +1,294 @@
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, InvalidPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import movie_response_cache
+
+
+class MovieKeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination for the movie list.
+    Pages are walked through the stable (title, id) key instead of OFFSET,
+    so every page costs the same index range scan no matter how deep the
+    client goes. The total count is only computed when the client asks
+    for it with ?count=true. Searches are ordered by relevance, which a
+    (title, id) cursor cannot walk, so they are rejected with 400.
+    """
+
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    search_query_param = "search"
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = _("Invalid cursor")
+    search_not_supported_message = _("Cursor pagination cannot be combined with search; use page numbers instead.")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Returns a single page of movies positioned after (or before) the cursor.
+        arguments:
+        queryset -- filtered queryset of movies
+        request -- HttpRequest object
+        view -- view that is paginating
+        returns: list of movies for the current page
+        """
+        if request.query_params.get(self.search_query_param):
+            raise ValidationError({self.search_query_param: [self.search_not_supported_message]})
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.count = None
+        if request.query_params.get(self.count_query_param, "").lower() in ("1", "true", "yes"):
+            self.count = queryset.count()
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor["reverse"]
+
+        if cursor is not None:
+            title, pk = cursor["title"], cursor["id"]
+            # The leading range condition on title lets the planner use an
+            # index range scan on (title, id); the second one breaks ties.
+            if reverse:
+                queryset = queryset.filter(Q(title__lte=title) & (Q(title__lt=title) | Q(id__lt=pk)))
+            else:
+                queryset = queryset.filter(Q(title__gte=title) & (Q(title__gt=title) | Q(id__gt=pk)))
+
+        ordering = ("-title", "-id") if reverse else ("title", "id")
+        results = list(queryset.order_by(*ordering)[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next = cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = results
+        return results
+
+    def decode_cursor(self, request):
+        """
+        Decodes the cursor query parameter into a position dict.
+        Raises NotFound if the cursor has been tampered with.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            data = json.loads(b64decode(encoded.encode("ascii")).decode("utf-8"))
+            return {
+                "title": str(data["t"]),
+                "id": int(data["i"]),
+                "reverse": bool(data.get("r", False)),
+            }
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, movie, reverse):
+        """
+        Encodes the position of a movie (instance or values() row) into an
+        opaque cursor URL.
+        """
+        if isinstance(movie, dict):
+            data = {"t": movie["title"], "i": movie["id"]}
+        else:
+            data = {"t": movie.title, "i": movie.id}
+        if reverse:
+            data["r"] = True
+        encoded = b64encode(json.dumps(data, separators=(",", ":")).encode("utf-8")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        payload = OrderedDict()
+        if self.count is not None:
+            payload["count"] = self.count
+        payload["next"] = self.get_next_link()
+        payload["previous"] = self.get_previous_link()
+        payload["results"] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "count": {"type": "integer", "example": 123},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+def estimate_count(queryset):
+    """
+    Planner's row estimate for a queryset, from EXPLAIN without running it.
+    The planner derives it from the table statistics (pg_class.reltuples and
+    the column histograms kept by ANALYZE/autovacuum), so it can be off,
+    typically for correlated filters.
+    returns: estimated rows, or None on databases other than PostgreSQL
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class CountedPaginator(Paginator):
+    """
+    Django paginator whose count is given by the caller and may be an
+    estimate. Pages are fetched with one extra row: a short page fixes the
+    count to the exact total, and a page followed by more rows raises an
+    estimate that is too low, so next links never stop early.
+    """
+
+    def __init__(self, object_list, per_page, count):
+        super().__init__(object_list, per_page)
+        self.count = count
+        self.exact = False
+
+    def validate_number(self, number):
+        # No upper bound: the count may be an estimate, page() finds the end
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_("That page number is not an integer"))
+        if number < 1:
+            raise EmptyPage(_("That page number is less than 1"))
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_("That page contains no results"))
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            self.count = max(self.count, bottom + len(rows) + 1)
+        else:
+            self.count = bottom + len(rows)
+            self.exact = True
+        # num_pages is cached from the count
+        self.__dict__.pop("num_pages", None)
+        return self._get_page(rows, number, self)
+
+
+class MovieCountPagination(PageNumberPagination):
+    """
+    Page number pagination for the movie list that avoids an exact COUNT(*)
+    over the filtered movies on every page. The count is:
+    - exact when the client asks with ?count=true (or for ?page=last)
+    - otherwise cached per filter until the next Movie write, so every
+      page of a filter after the first reuses it
+    - on a cache miss, exact when the page turns out to be the last one
+      (it is fetched with one extra row)
+    - else the planner's estimate on PostgreSQL, counted exactly only when
+      the estimate is below MOVIES_EXACT_COUNT_THRESHOLD
+    Responses say whether the count is estimated in "count_estimated".
+    """
+
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Returns a single page of movies and computes the count.
+        arguments:
+        queryset -- filtered queryset of movies
+        request -- HttpRequest object
+        view -- view that is paginating
+        returns: list of movies for the current page
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        params = request.query_params
+        cache = movie_response_cache.cache
+        key = movie_response_cache.count_key(request, exclude=(self.page_query_param, self.page_size_query_param,
+                                                               self.count_query_param))
+        wants_exact = (
+            params.get(self.count_query_param, "").lower() in ("1", "true", "yes")
+            or params.get(self.page_query_param) in self.last_page_strings
+        )
+        cached = cache.get(key)
+        if cached is not None and not (wants_exact and cached[1]):
+            count, estimated = cached
+        elif wants_exact:
+            count, estimated = queryset.count(), False
+        else:
+            count, estimated = None, True
+
+        paginator = CountedPaginator(queryset, page_size, count or 0)
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        if paginator.exact:
+            estimated = False
+        elif count is None:
+            count = estimate_count(queryset)
+            threshold = getattr(settings, "MOVIES_EXACT_COUNT_THRESHOLD", 10000)
+            if count is None or count < threshold:
+                count, estimated = queryset.count(), False
+            paginator.count = max(count, paginator.count)
+            paginator.__dict__.pop("num_pages", None)
+        self.count_estimated = estimated
+        # Only a new or changed count is written: a hit leaves the entry alone
+        if cached != (paginator.count, estimated):
+            cache.set(key, (paginator.count, estimated), movie_response_cache.timeout)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("count", self.page.paginator.count),
+            ("count_estimated", self.count_estimated),
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_estimated"] = {"type": "boolean", "example": False}
+        return response_schema
@@ -0,0 +1,34 @@
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON (one object per line) into a list.
+    Lines are decoded one at a time from the request stream, so the raw
+    body is never held in memory as a whole. When the view passes
+    "max_items" in the parser context, parsing stops with a ParseError at
+    the first line beyond it instead of reading the rest of the body.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        max_items = parser_context.get("max_items")
+        items = []
+        for number, line in enumerate(iter(stream.readline, b""), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if max_items is not None and len(items) >= max_items:
+                raise ParseError(f"At most {max_items} items per request")
+            try:
+                items.append(json.loads(line.decode(encoding)))
+            except ValueError as exc:
+                raise ParseError(f"NDJSON parse error on line {number} - {exc}")
+        return items
@@ -0,0 +1,48 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+# Text search configuration shared by the search_vector trigger and the queries
+SEARCH_CONFIG = "english"
+
+
+def search_movies(queryset, term):
+    """
+    Filters a Movie queryset by a free text search term and orders it by relevance.
+    On PostgreSQL the maintained search_vector column (GIN indexed) is matched
+    with a websearch query and ranked with ts_rank. Other databases fall back
+    to case-insensitive substring matching with a coarse field-based rank.
+    arguments:
+    queryset -- Movie queryset to filter
+    term -- text typed by the user
+    returns: filtered queryset annotated with `rank`, best matches first
+    """
+    term = term.strip()
+    if not term:
+        return queryset
+
+    if connection.vendor == "postgresql":
+        query = SearchQuery(term, search_type="websearch", config=SEARCH_CONFIG)
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "title", "id")
+        )
+
+    return (
+        queryset.filter(
+            Q(title__icontains=term)
+            | Q(director__icontains=term)
+            | Q(cast__icontains=term)
+            | Q(description__icontains=term)
+        )
+        .annotate(
+            rank=Case(
+                When(title__icontains=term, then=Value(3)),
+                When(Q(director__icontains=term) | Q(cast__icontains=term), then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("-rank", "title", "id")
+    )
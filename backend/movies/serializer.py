@@ -1,13 +1,121 @@
+from datetime import date
+from operator import itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.settings import ISO_8601, api_settings
 from .models import Movie
 
 class MovieSerializer(serializers.ModelSerializer):
     """
     Serializer for the Movie model.
-    Validates that the rating is between 0.0 and 5.0. and serializes all fields.
+    Validates that the rating is between 0.0 and 5.0. and serializes all fields
+    except the internal full-text search document.
     """
     rating = serializers.FloatField(min_value=0.0, max_value=5.0)
 
     class Meta:
         model = Movie
-        fields = "__all__"
\ No newline at end of file
+        exclude = ["search_vector"]
+
+def _datetime_converter(field):
+    """
+    Same output as DateTimeField.to_representation for aware datetimes
+    in ISO 8601, the only kind the database returns with USE_TZ.
+    """
+    field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+
+    def convert(value):
+        if field_timezone is None or not timezone.is_aware(value):
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    return convert
+
+
+def _is_iso_format(field, default):
+    output_format = getattr(field, "format", default)
+    return output_format is not None and output_format.lower() == ISO_8601
+
+
+def _compile_converter(field):
+    """
+    Returns a plain callable equivalent to field.to_representation for
+    non-None values, or None when the value is emitted as is.
+    """
+    field_type = type(field)
+    if field_type is serializers.JSONField and not field.binary:
+        return None
+    if field_type is serializers.CharField:
+        return str
+    if field_type is serializers.IntegerField:
+        return int
+    if field_type is serializers.FloatField:
+        return float
+    if field_type is serializers.DateField and _is_iso_format(field, api_settings.DATE_FORMAT):
+        return date.isoformat
+    if field_type is serializers.DateTimeField and _is_iso_format(field, api_settings.DATETIME_FORMAT):
+        return _datetime_converter(field)
+    return field.to_representation
+
+
+class MovieReadSerializer:
+    """
+    Read-only fast path with the exact output of MovieSerializer.
+    The readable fields of MovieSerializer are compiled once into names,
+    value converters and a single itemgetter over the row; rows are plain
+    dicts coming from Movie.objects.values(*MovieReadSerializer.sources()),
+    so no model instances or per-request field objects are built.
+    """
+
+    serializer_class = MovieSerializer
+    _compiled = None
+
+    def __init__(self, instance=None, many=False, **kwargs):
+        self.instance = instance
+        self.many = many
+
+    @classmethod
+    def compile(cls):
+        """
+        Returns (names, sources, converters, getter) for the readable fields.
+        """
+        if cls._compiled is None:
+            names, sources, converters = [], [], []
+            for name, field in cls.serializer_class().fields.items():
+                if field.write_only:
+                    continue
+                if "." in field.source or field.source == "*":
+                    raise ImproperlyConfigured(f"Field '{name}' cannot be read from a values() row.")
+                names.append(name)
+                sources.append(field.source)
+                converters.append(_compile_converter(field))
+            cls._compiled = (tuple(names), tuple(sources), tuple(converters), itemgetter(*sources))
+        return cls._compiled
+
+    @classmethod
+    def sources(cls):
+        """
+        Column names to pass to QuerySet.values().
+        """
+        return cls.compile()[1]
+
+    @classmethod
+    def to_representation(cls, row):
+        names, sources, converters, getter = cls.compile()
+        values = getter(row) if isinstance(row, dict) else [getattr(row, source) for source in sources]
+        return {
+            name: value if value is None or convert is None else convert(value)
+            for name, convert, value in zip(names, converters, values)
+        }
+
+    @property
+    def data(self):
+        if self.many:
+            represent = self.to_representation
+            return [represent(row) for row in self.instance]
+        return self.to_representation(self.instance)
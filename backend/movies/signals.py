@@ -0,0 +1,139 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.db import transaction
+from django.dispatch import Signal, receiver
+
+from .autocomplete import movie_trie_index
+from .cache import movie_response_cache
+from .credits import rebuild_credits, sync_credits
+from .facets import facet_key, record_facet_change
+from .models import Credit, Movie, Person
+from .similar import FEATURE_FIELDS, similar_movie_index
+
+# Sent by the bulk write paths, which bypass post_save, with the ids of the
+# `created`, `updated` and `deleted` movies. The lists are None when the
+# writer does not know them (e.g. the streaming importer), which then keeps
+# the credits in sync itself.
+movies_bulk_written = Signal()
+
+_bulk_write = threading.local()
+
+
+@contextmanager
+def bulk_movie_writes():
+    """
+    Skips the per-row invalidation of movie_changed for the ORM writes
+    inside the block (e.g. a bulk delete through the collector). The
+    caller sends one movies_bulk_written for the whole batch instead.
+    """
+    if getattr(_bulk_write, "active", False):
+        yield
+        return
+    _bulk_write.active = True
+    try:
+        yield
+    finally:
+        _bulk_write.active = False
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+@receiver(movies_bulk_written, sender=Movie)
+def movie_changed(sender, instance=None, **kwargs):
+    """
+    Drops the in-process typeahead index and invalidates the cached
+    movie responses whenever a movie is written.
+    """
+    if instance is not None and getattr(_bulk_write, "active", False):
+        return
+    movie_trie_index.invalidate()
+    movie_response_cache.invalidate()
+
+
+@receiver(post_save, sender=Movie)
+def movie_saved_credits(sender, instance, update_fields=None, **kwargs):
+    """
+    Rebuilds the Person/Credit rows of a saved movie from its cast and director.
+    """
+    if update_fields is not None and not {"cast", "director"} & set(update_fields):
+        return
+    rebuild_credits([(instance.pk, instance.cast, instance.director)], Person, Credit)
+
+
+@receiver(movies_bulk_written, sender=Movie)
+def movies_bulk_written_credits(sender, created=None, updated=None, **kwargs):
+    """
+    Rebuilds the credits of the movies written by a bulk upsert.
+    """
+    if created is not None and updated is not None:
+        sync_credits([*created, *updated])
+
+
+@receiver(pre_save, sender=Movie)
+def movie_facet_before_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Remembers the facet the stored row counts in, before an update overwrites it.
+    Instances loaded from the database carry it (Movie.from_db); only those
+    built by hand with a pk, or with genre/rating deferred, read the row.
+    """
+    instance._facet_key_before = None
+    stored = getattr(instance, "_stored_facet", None)
+    if update_fields is not None and not {"genre", "rating"} & set(update_fields):
+        instance._facet_key_before = facet_key(instance.genre, instance.rating)
+    elif instance.pk is None:
+        return
+    elif stored is not None:
+        instance._facet_key_before = facet_key(*stored)
+    else:
+        row = Movie.objects.filter(pk=instance.pk).values_list("genre", "rating").first()
+        if row is not None:
+            instance._facet_key_before = facet_key(*row)
+
+
+@receiver(post_save, sender=Movie)
+def movie_facet_saved(sender, instance, update_fields=None, **kwargs):
+    """
+    Moves the movie between facets when it is created or its genre/rating changes.
+    """
+    before = getattr(instance, "_facet_key_before", None)
+    after = facet_key(instance.genre, instance.rating)
+    if before != after:
+        record_facet_change(removed=before, added=after)
+    if update_fields is None or {"genre", "rating"} & set(update_fields):
+        instance.remember_stored_facet()
+
+
+@receiver(post_delete, sender=Movie)
+def movie_facet_deleted(sender, instance, **kwargs):
+    """
+    Removes a deleted movie from its facet.
+    """
+    record_facet_change(removed=facet_key(instance.genre, instance.rating))
+
+
+def _add_to_similar_index(ids):
+    if similar_movie_index.available():
+        similar_movie_index.add(list(Movie.objects.filter(id__in=ids).values(*FEATURE_FIELDS)))
+
+
+@receiver(post_save, sender=Movie)
+def movie_similar_saved(sender, instance, **kwargs):
+    """
+    Appends the vector of a saved movie to the similar movies index once
+    the write is committed.
+    """
+    if similar_movie_index.available():
+        row = {field: getattr(instance, field) for field in FEATURE_FIELDS}
+        transaction.on_commit(lambda: similar_movie_index.add([row]))
+
+
+@receiver(movies_bulk_written, sender=Movie)
+def movies_bulk_written_similar(sender, created=None, updated=None, **kwargs):
+    """
+    Appends the vectors of the movies written by a bulk upsert.
+    """
+    if created is not None and updated is not None and (created or updated):
+        ids = [*created, *updated]
+        transaction.on_commit(lambda: _add_to_similar_index(ids))
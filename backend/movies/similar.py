@@ -0,0 +1,435 @@
+"""
+Content-based "similar movies" index.
+
+Every movie is encoded into a fixed-size, L2-normalized float32 vector by
+feature hashing of its genre, director, cast, release year, rating and the
+TF-IDF weighted words of its description; cosine similarity is then a dot
+product. `manage.py build_similar_index` writes the vectors of the whole
+catalog to .npy files that worker processes open with mmap, so they share
+one copy through the page cache. Small catalogs are scanned brute force;
+large ones are partitioned into k-means lists (IVF) and only the lists
+closest to the query are scanned. Movies saved after the build are encoded
+on commit and appended to a shared delta file until the next build; those
+saved while a build runs are replayed into the new version's delta.
+"""
+
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+
+from .normalize import credit_entries
+
+FEATURE_FIELDS = ("id", "genre", "director", "cast", "release_date", "rating", "description")
+# Weight of each feature block in the final vector
+FEATURE_WEIGHTS = {"genre": 1.0, "director": 0.8, "cast": 0.6, "description": 0.8, "year": 0.4, "rating": 0.3}
+DEFAULT_DIM = 128
+# Catalogs up to this size get a brute-force (flat) index with --kind auto;
+# a flat scan stays under a millisecond up to about this many vectors
+FLAT_MAX_ROWS = 20000
+
+CURRENT_FILE = "CURRENT"
+DELTA_FILE = "added.bin"
+WORD_RE = re.compile(r"[a-z0-9]{3,}")
+_CHUNK = 8192
+
+
+def get_index_dir():
+    return str(getattr(settings, "MOVIES_SIMILAR_INDEX_DIR", os.path.join(settings.BASE_DIR, "var", "similar")))
+
+
+def get_nprobe():
+    return getattr(settings, "MOVIES_SIMILAR_NPROBE", 16)
+
+
+def _slot(key, dim):
+    # crc32 is stable across processes, unlike hash()
+    value = zlib.crc32(key.encode("utf-8"))
+    return value % dim, 1.0 if value & 0x80000000 else -1.0
+
+
+def description_words(text):
+    return WORD_RE.findall((text or "").lower())
+
+
+class FeatureEncoder:
+    """
+    Turns movie rows (dicts with FEATURE_FIELDS) into unit vectors.
+    arguments:
+    dim -- vector size
+    idf -- inverse document frequency of each description slot, from the build
+    """
+
+    def __init__(self, dim=DEFAULT_DIM, idf=None):
+        self.dim = dim
+        self.idf = np.ones(dim, dtype=np.float32) if idf is None else np.asarray(idf, dtype=np.float32)
+
+    def description_slots(self, text):
+        return {_slot("w:" + word, self.dim)[0] for word in description_words(text)}
+
+    def _block(self, weighted_keys):
+        block = np.zeros(self.dim, dtype=np.float32)
+        for key, weight in weighted_keys:
+            slot, sign = _slot(key, self.dim)
+            block[slot] += sign * weight
+        return block
+
+    def vector(self, row):
+        year = row["release_date"].year if row.get("release_date") else None
+        names = [name for name, role, _, _ in credit_entries(row.get("cast"), None) if role == "actor"]
+        words = Counter(description_words(row.get("description")))
+        blocks = {
+            "genre": self._block([("g:" + row["genre"].lower(), 1.0)] if row.get("genre") else []),
+            "director": self._block([("d:" + row["director"].lower(), 1.0)] if row.get("director") else []),
+            "cast": self._block([("c:" + name.lower(), 1.0) for name in names]),
+            # Neighbouring 5-year buckets overlap so nearby years stay similar
+            "year": self._block(
+                [("y:%d" % (year // 5), 1.0), ("y:%d" % ((year + 2) // 5), 0.5)] if year else []
+            ),
+            "rating": self._block([("r:%d" % round(row["rating"] * 2), 1.0)] if row.get("rating") is not None else []),
+            "description": self._block([("w:" + word, count) for word, count in words.items()]) * self.idf,
+        }
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for name, block in blocks.items():
+            norm = np.linalg.norm(block)
+            if norm:
+                vector += FEATURE_WEIGHTS[name] * block / norm
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+def _top_k(ids, scores, k):
+    if len(scores) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        ids, scores = ids[best], scores[best]
+    order = np.lexsort((ids, -scores))
+    return ids[order], scores[order]
+
+
+def train_centroids(vectors, lists, iterations=10, seed=0):
+    """
+    Spherical k-means over a sample of the vectors.
+    returns: (lists, dim) array of unit centroids
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), lists * 32)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))])
+    centroids = sample[rng.choice(sample_size, lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = assign_lists(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = ~sums.any(axis=1)
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+
+def delta_dtype(dim):
+    return np.dtype([("id", "<i8"), ("vector", "<f4", (dim,))])
+
+
+def append_delta(path, encoder, rows):
+    """
+    Appends the vectors of movie rows to the delta file of an index version.
+    Each batch is one O_APPEND write, so concurrent workers do not
+    interleave records.
+    returns: number of rows appended
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    records = np.zeros(len(rows), dtype=delta_dtype(encoder.dim))
+    for index, row in enumerate(rows):
+        records["id"][index] = row["id"]
+        records["vector"][index] = encoder.vector(row)
+    fd = os.open(os.path.join(path, DELTA_FILE), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, records.tobytes())
+    finally:
+        os.close(fd)
+    return len(rows)
+
+
+def assign_lists(vectors, centroids):
+    return np.concatenate([
+        np.argmax(np.asarray(vectors[start:start + _CHUNK]) @ centroids.T, axis=1)
+        for start in range(0, len(vectors), _CHUNK)
+    ]) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+
+def build_index(rows, count, descriptions, index_dir=None, kind="auto", lists=None, dim=DEFAULT_DIM, changes=None):
+    """
+    Writes a new index version and makes it current.
+    Until CURRENT switches, workers append saved movies to the previous
+    version's delta, so `changes` is replayed into the new version's delta
+    just before the switch, and once more right after it for the saves made
+    in between (a movie in the delta twice is harmless, the last wins).
+    arguments:
+    rows -- callable returning an iterator of movie dicts (FEATURE_FIELDS)
+    count -- number of rows the iterator yields
+    descriptions -- callable returning an iterator of descriptions, for the IDF pass
+    changes -- callable returning the movie dicts written since the build started
+    index_dir -- directory holding the index versions
+    kind -- "flat", "ivf" or "auto" (flat up to FLAT_MAX_ROWS rows)
+    lists -- number of IVF lists, sqrt(count) by default
+    returns: metadata of the new index, with the number of replayed movies
+    """
+    if count < 1:
+        raise ValueError("Cannot build a similarity index of an empty catalog")
+    index_dir = index_dir or get_index_dir()
+    os.makedirs(index_dir, exist_ok=True)
+    if kind == "auto":
+        kind = "flat" if count <= FLAT_MAX_ROWS else "ivf"
+    if kind == "ivf":
+        lists = min(max(lists or int(math.sqrt(count)), 1), max(count, 1))
+
+    # Pass 1: document frequency of the description slots
+    encoder = FeatureEncoder(dim)
+    frequency = np.zeros(dim, dtype=np.float64)
+    for text in descriptions():
+        frequency[list(encoder.description_slots(text))] += 1
+    encoder.idf = (np.log((1 + count) / (1 + frequency)) + 1).astype(np.float32)
+
+    version = "v%d" % time.time_ns()
+    target = os.path.join(index_dir, version)
+    os.makedirs(target)
+
+    # Pass 2: vectors straight into a memory-mapped file, in id order
+    raw = np.lib.format.open_memmap(os.path.join(target, "raw.npy"), mode="w+", dtype=np.float32, shape=(count, dim))
+    ids = np.zeros(count, dtype=np.int64)
+    written = 0
+    for row in rows():
+        if written == count:
+            break
+        raw[written] = encoder.vector(row)
+        ids[written] = row["id"]
+        written += 1
+    raw.flush()
+
+    offsets = np.array([0, written], dtype=np.int64)
+    if kind == "ivf" and written:
+        centroids = train_centroids(raw[:written], lists)
+        assign = assign_lists(raw[:written], centroids)
+        order = np.argsort(assign, kind="stable")
+        vectors = np.lib.format.open_memmap(
+            os.path.join(target, "vectors.npy"), mode="w+", dtype=np.float32, shape=(written, dim)
+        )
+        for start in range(0, written, _CHUNK):
+            vectors[start:start + _CHUNK] = raw[order[start:start + _CHUNK]]
+        vectors.flush()
+        del vectors, raw
+        os.remove(os.path.join(target, "raw.npy"))
+        ids = ids[:written][order]
+        offsets = np.searchsorted(assign[order], np.arange(lists + 1)).astype(np.int64)
+        np.save(os.path.join(target, "centroids.npy"), centroids)
+    else:
+        kind = "flat"
+        del raw
+        if written < count:
+            # Rows deleted while building: keep the ones actually encoded
+            np.save(os.path.join(target, "raw.npy"), np.array(np.load(os.path.join(target, "raw.npy"))[:written]))
+        os.replace(os.path.join(target, "raw.npy"), os.path.join(target, "vectors.npy"))
+        ids = ids[:written]
+
+    positions = np.argsort(ids, kind="stable")
+    np.save(os.path.join(target, "ids.npy"), ids)
+    np.save(os.path.join(target, "sorted_ids.npy"), ids[positions])
+    np.save(os.path.join(target, "positions.npy"), positions)
+    np.save(os.path.join(target, "offsets.npy"), offsets)
+    np.save(os.path.join(target, "idf.npy"), encoder.idf)
+    meta = {"version": version, "kind": kind, "dim": dim, "count": int(written), "lists": int(len(offsets) - 1)}
+    with open(os.path.join(target, "meta.json"), "w") as handle:
+        json.dump(meta, handle)
+
+    replayed = append_delta(target, encoder, changes()) if changes else 0
+
+    # Switch readers over atomically, then drop all but the previous version
+    pointer = os.path.join(index_dir, CURRENT_FILE + ".tmp")
+    with open(pointer, "w") as handle:
+        handle.write(version)
+    previous = _read_current(index_dir)
+    os.replace(pointer, os.path.join(index_dir, CURRENT_FILE))
+    if changes:
+        replayed = max(replayed, append_delta(target, encoder, changes()))
+    meta["replayed"] = replayed
+    for name in os.listdir(index_dir):
+        if name.startswith("v") and name not in (version, previous):
+            shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+    return meta
+
+
+def _read_current(index_dir):
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE)) as handle:
+            return handle.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class SimilarMovieIndex:
+    """
+    Read side of the index, shared by the threads of a worker process.
+    The current version is memory-mapped on first use and re-opened when a
+    build switches CURRENT; the delta file is re-mapped when it grows.
+    """
+
+    def __init__(self, index_dir=None):
+        self._index_dir = index_dir
+        self._lock = threading.Lock()
+        self._state = None
+        self._current_mtime = None
+        self._delta = None
+
+    @property
+    def index_dir(self):
+        return self._index_dir or get_index_dir()
+
+    def available(self):
+        return os.path.exists(os.path.join(self.index_dir, CURRENT_FILE))
+
+    def _load(self):
+        pointer = os.path.join(self.index_dir, CURRENT_FILE)
+        try:
+            mtime = os.stat(pointer).st_mtime_ns
+        except FileNotFoundError:
+            self._state, self._delta = None, None
+            return None
+        if self._state is not None and mtime == self._current_mtime:
+            return self._state
+        with self._lock:
+            if self._state is None or mtime != self._current_mtime:
+                path = os.path.join(self.index_dir, _read_current(self.index_dir))
+                with open(os.path.join(path, "meta.json")) as handle:
+                    meta = json.load(handle)
+                mapped = {
+                    name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+                    for name in ("vectors", "ids", "sorted_ids", "positions", "offsets")
+                }
+                if meta["kind"] == "ivf":
+                    mapped["centroids"] = np.load(os.path.join(path, "centroids.npy"))
+                mapped["offsets"] = np.array(mapped["offsets"])
+                self._state = {
+                    "path": path,
+                    "meta": meta,
+                    "encoder": FeatureEncoder(meta["dim"], np.load(os.path.join(path, "idf.npy"))),
+                    "delta_dtype": delta_dtype(meta["dim"]),
+                    **mapped,
+                }
+                self._current_mtime = mtime
+                self._delta = None
+        return self._state
+
+    def _load_delta(self, state):
+        path = os.path.join(state["path"], DELTA_FILE)
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            size = 0
+        records = size // state["delta_dtype"].itemsize
+        delta = self._delta
+        if delta is not None and delta["records"] == records:
+            return delta
+        if records:
+            data = np.memmap(path, dtype=state["delta_dtype"], mode="r", shape=(records,))
+            # The last record of an id supersedes the earlier ones
+            reversed_ids = data["id"][::-1]
+            _, first = np.unique(reversed_ids, return_index=True)
+            keep = np.sort(records - 1 - first)
+            delta = {"records": records, "ids": np.array(data["id"][keep]), "vectors": np.array(data["vector"][keep])}
+        else:
+            delta = {"records": 0, "ids": np.zeros(0, np.int64), "vectors": np.zeros((0, state["meta"]["dim"]), np.float32)}
+        self._delta = delta
+        return delta
+
+    def encode(self, row):
+        state = self._load()
+        return None if state is None else state["encoder"].vector(row)
+
+    def add(self, rows):
+        """
+        Appends the vectors of new or changed movies to the delta file of
+        the current version.
+        returns: number of movies added, 0 when no index has been built
+        """
+        state = self._load()
+        if state is None:
+            return 0
+        return append_delta(state["path"], state["encoder"], rows)
+
+    def vector(self, movie_id):
+        """
+        Stored vector of a movie (delta first), or None if it is not indexed.
+        """
+        state = self._load()
+        if state is None:
+            return None
+        delta = self._load_delta(state)
+        found = np.flatnonzero(delta["ids"] == movie_id)
+        if len(found):
+            return delta["vectors"][found[0]]
+        sorted_ids = state["sorted_ids"]
+        index = np.searchsorted(sorted_ids, movie_id)
+        if index < len(sorted_ids) and sorted_ids[index] == movie_id:
+            return np.asarray(state["vectors"][state["positions"][index]])
+        return None
+
+    def search(self, query, k, exclude=None, nprobe=None):
+        """
+        Nearest movies to a query vector by cosine similarity.
+        arguments:
+        query -- unit vector from FeatureEncoder
+        k -- number of results
+        exclude -- movie id left out of the results (the query movie)
+        nprobe -- IVF lists scanned, MOVIES_SIMILAR_NPROBE by default
+        returns: list of (movie_id, score), best first
+        """
+        state = self._load()
+        if state is None:
+            return []
+        delta = self._load_delta(state)
+        vectors, offsets = state["vectors"], state["offsets"]
+        if state["meta"]["kind"] == "ivf":
+            nprobe = min(nprobe or get_nprobe(), len(offsets) - 1)
+            closest = np.argpartition(-(state["centroids"] @ query), nprobe - 1)[:nprobe]
+            spans = [(offsets[i], offsets[i + 1]) for i in closest]
+        else:
+            spans = [(0, len(vectors))]
+
+        candidate_ids, candidate_scores = [delta["ids"]], [delta["vectors"] @ query]
+        for start, end in spans:
+            if end > start:
+                candidate_ids.append(state["ids"][start:end])
+                candidate_scores.append(vectors[start:end] @ query)
+        ids = np.concatenate(candidate_ids)
+        scores = np.concatenate(candidate_scores)
+        # Main index entries superseded by the delta, and the query movie
+        stale = np.zeros(len(ids), dtype=bool)
+        stale[len(delta["ids"]):] = np.isin(ids[len(delta["ids"]):], delta["ids"])
+        if exclude is not None:
+            stale |= ids == exclude
+        ids, scores = _top_k(ids[~stale], scores[~stale], k)
+        return [(int(pk), float(score)) for pk, score in zip(ids, scores)]
+
+    def similar(self, row, k, nprobe=None):
+        """
+        Movies most similar to a movie row (dict with FEATURE_FIELDS).
+        Uses the stored vector, or encodes the row if it is not indexed yet.
+        """
+        query = self.vector(row["id"])
+        if query is None:
+            query = self.encode(row)
+            if query is None:
+                return []
+        return self.search(query, k, exclude=row["id"], nprobe=nprobe)
+
+
+similar_movie_index = SimilarMovieIndex()
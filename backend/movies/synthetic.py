@@ -0,0 +1,192 @@
+"""
+Synthetic movie catalogs and users for benchmarks and load tests.
+
+Rows are numbered and generated in blocks of BLOCK_SIZE, each block from
+its own random stream seeded with (seed, block number): movie or user `n`
+is the same for a seed whatever the count, the start or the number of
+processes generating the catalog.
+
+- genres follow GENRE_WEIGHTS and ratings a normal distribution around a
+  mean per genre
+- release years get more frequent towards the present
+- directors and actors come from fixed pools with Zipf-distributed
+  popularity: the k-th most popular person is credited about 1/k^s as
+  often as the first, so a few names are in a large share of the catalog
+
+Pure Python and numpy without Django model imports, like movies.normalize.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+BLOCK_SIZE = 10000
+
+GENRE_WEIGHTS = (
+    ("Drama", 0.24), ("Comedy", 0.18), ("Thriller", 0.10), ("Action", 0.10), ("Documentary", 0.08),
+    ("Horror", 0.07), ("Romance", 0.07), ("Crime", 0.06), ("Sci-Fi", 0.05), ("Animation", 0.05),
+)
+GENRES = tuple(genre for genre, _ in GENRE_WEIGHTS)
+# Mean rating (0-5) per genre; ratings spread RATING_SD around it
+GENRE_RATING_MEANS = {
+    "Drama": 3.4, "Comedy": 3.0, "Thriller": 3.1, "Action": 2.9, "Documentary": 3.6,
+    "Horror": 2.6, "Romance": 3.1, "Crime": 3.3, "Sci-Fi": 3.0, "Animation": 3.5,
+}
+RATING_SD = 0.75
+
+FIRST_YEAR, LAST_YEAR = 1930, 2024
+# Relative growth of the number of releases per year
+YEAR_GROWTH = 0.04
+
+# Pool sizes and Zipf exponent of the credited people
+ACTORS = 200000
+DIRECTORS = 20000
+ZIPF_EXPONENT = 1.0
+# Actors per movie: 1 + Poisson(MEAN_CAST - 1), at most MAX_CAST
+MEAN_CAST = 4
+MAX_CAST = 10
+
+WORDS = (
+    "Night", "River", "Last", "Silent", "Broken", "Golden", "Lost", "Shadow", "City", "Winter", "Fire", "Blue",
+    "Dark", "Summer", "Iron", "Secret", "Wild", "Glass", "Falling", "Empire", "Stranger", "Storm", "Echo", "Garden",
+)
+FIRST_NAMES = ("Ana", "Ben", "Carla", "David", "Elena", "Frank", "Grace", "Hugo", "Iris", "Jonas", "Kate", "Luis")
+LAST_NAMES = ("Moreno", "Novak", "Okafor", "Park", "Quinn", "Rossi", "Silva", "Tanaka", "Ueda", "Varga", "Weber")
+
+
+def person_name(number):
+    """
+    Distinct, readable name of the synthetic person `number`.
+    """
+    first = FIRST_NAMES[number % len(FIRST_NAMES)]
+    last = LAST_NAMES[number // len(FIRST_NAMES) % len(LAST_NAMES)]
+    return f"{first} {last} {number}"
+
+
+def actor_name(rank):
+    return person_name(2 * rank)
+
+
+def director_name(rank):
+    # Odd numbers: directors never share a name with actors
+    return person_name(2 * rank + 1)
+
+
+@lru_cache(maxsize=8)
+def _zipf_cdf(size, exponent):
+    cdf = np.cumsum(1.0 / np.arange(1, size + 1) ** exponent)
+    return cdf / cdf[-1]
+
+
+def zipf_ranks(rng, size, exponent, n):
+    """
+    Draws n ranks in [0, size) with P(rank k) proportional to 1 / (k + 1)^exponent.
+    """
+    return np.minimum(np.searchsorted(_zipf_cdf(size, exponent), rng.random(n), side="right"), size - 1)
+
+
+@lru_cache(maxsize=1)
+def _year_weights():
+    weights = np.exp(YEAR_GROWTH * np.arange(LAST_YEAR - FIRST_YEAR + 1))
+    return weights / weights.sum()
+
+
+def _rng(seed, kind, block):
+    return np.random.default_rng([seed, kind, block])
+
+
+def movie_block(block, seed=0, actors=ACTORS, directors=DIRECTORS, exponent=ZIPF_EXPONENT):
+    """
+    Generates the BLOCK_SIZE movies numbered from block * BLOCK_SIZE.
+    People are returned as pool ranks (see actor_name and director_name).
+    returns: dict of columns: titles, descriptions, release_dates, genres,
+             ratings, directors (ranks) and casts (lists of distinct ranks)
+    """
+    rng = _rng(seed, 0, block)
+    n = BLOCK_SIZE
+    first = block * BLOCK_SIZE
+
+    genre_index = rng.choice(len(GENRES), n, p=[weight for _, weight in GENRE_WEIGHTS])
+    means = np.array([GENRE_RATING_MEANS[genre] for genre in GENRES])[genre_index]
+    ratings = np.clip(np.round(rng.normal(means, RATING_SD), 1), 0.0, 5.0)
+
+    years = FIRST_YEAR + rng.choice(LAST_YEAR - FIRST_YEAR + 1, n, p=_year_weights())
+    release_dates = (years - 1970).astype("datetime64[Y]").astype("datetime64[D]") + rng.integers(0, 365, n)
+
+    words = rng.integers(0, len(WORDS), (n, 3))
+    lengths = rng.integers(1, 4, n)
+
+    cast_sizes = np.minimum(1 + rng.poisson(MEAN_CAST - 1, n), MAX_CAST)
+    cast_ranks = zipf_ranks(rng, actors, exponent, int(cast_sizes.sum()))
+    director_ranks = zipf_ranks(rng, directors, exponent, n)
+
+    # Zipf draws repeat popular actors: each is credited once per movie
+    ranks, casts, begin = cast_ranks.tolist(), [], 0
+    for end in np.cumsum(cast_sizes).tolist():
+        casts.append(list(dict.fromkeys(ranks[begin:end])))
+        begin = end
+    genres = [GENRES[i] for i in genre_index.tolist()]
+    return {
+        # The number keeps (title, release_date) unique
+        "titles": [
+            " ".join(WORDS[word] for word in row[:length]) + f" {first + i}"
+            for i, (row, length) in enumerate(zip(words.tolist(), lengths.tolist()))
+        ],
+        "descriptions": [f"Synthetic {genre.lower()} movie {first + i}." for i, genre in enumerate(genres)],
+        "release_dates": release_dates.tolist(),
+        "genres": genres,
+        "ratings": ratings.tolist(),
+        "directors": director_ranks.tolist(),
+        "casts": casts,
+    }
+
+
+def block_ranges(start, count):
+    """
+    Splits the numbers [start, start + count) at block boundaries.
+    returns: list of (block, lo, hi) with lo <= number < hi inside the block
+    """
+    ranges = []
+    number, stop = start, start + count
+    while number < stop:
+        block = number // BLOCK_SIZE
+        hi = min(stop, (block + 1) * BLOCK_SIZE)
+        ranges.append((block, number, hi))
+        number = hi
+    return ranges
+
+
+def synthetic_movies(count, seed=0, start=0, actors=ACTORS, directors=DIRECTORS, exponent=ZIPF_EXPONENT):
+    """
+    Generates `count` movies numbered from `start` as normalized movie
+    dicts, ready for movies.bulk.upsert_rows / copy_upsert_rows.
+    returns: iterator of movie dicts
+    """
+    for block, lo, hi in block_ranges(start, count):
+        movies = movie_block(block, seed, actors, directors, exponent)
+        offset = block * BLOCK_SIZE
+        for i in range(lo - offset, hi - offset):
+            yield {
+                "title": movies["titles"][i],
+                "description": movies["descriptions"][i],
+                "release_date": movies["release_dates"][i],
+                "genre": movies["genres"][i],
+                "rating": movies["ratings"][i],
+                "cast": [{"name": actor_name(rank)} for rank in movies["casts"][i]],
+                "director": director_name(movies["directors"][i]),
+            }
+
+
+def user_block(block, seed=0):
+    """
+    Generates the BLOCK_SIZE users numbered from block * BLOCK_SIZE.
+    returns: list of (username, email, first_name, last_name)
+    """
+    rng = _rng(seed, 1, block)
+    first = block * BLOCK_SIZE
+    first_names = rng.integers(0, len(FIRST_NAMES), BLOCK_SIZE).tolist()
+    last_names = rng.integers(0, len(LAST_NAMES), BLOCK_SIZE).tolist()
+    return [
+        (f"user{number}", f"user{number}@example.com", FIRST_NAMES[i], LAST_NAMES[j])
+        for number, i, j in zip(range(first, first + BLOCK_SIZE), first_names, last_names)
+    ]
@@ -1,12 +1,73 @@
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import re
+import tempfile
+from collections import Counter
 from datetime import date, timedelta
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import ExtractYear
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
 from django.contrib.auth import get_user_model
-from rest_framework.test import APITestCase, APIClient
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APITestCase, APIClient, APIRequestFactory
 from rest_framework import status
-from movies.models import Movie
+from rest_framework_simplejwt.tokens import AccessToken
+from backend.instrumentation import MAX_TRACKED_STATEMENTS, RequestTimings, metrics
+from backend.pooled_postgresql.base import ConnectionPool, DatabaseWrapper as PooledDatabaseWrapper, PoolTimeout
+from movies.analytics import CatalogAnalytics, catalog_analytics
+from movies.cache import movie_response_cache
+from movies.credits import sync_credits
+from movies.facets import count_facets
+from movies.models import Credit, Movie, MovieFacet, Person
+from movies.pagination import CountedPaginator
+from movies.parsers import NDJSONParser
+from movies.serializer import MovieReadSerializer, MovieSerializer
+from movies.synthetic import BLOCK_SIZE, movie_block, synthetic_movies
+from movies.views import MovieApiCreate
 
-class MoviesAPITests(APITestCase):
+
+class MovieCacheTestMixin:
+    """
+    Starts every test with an empty movie response cache.
+    """
+
+    def setUp(self):
+        super().setUp()
+        movie_response_cache.clear()
+
+
+class AuthenticatedMovieTestMixin(MovieCacheTestMixin):
+    """
+    Adds self.user and self.auth_client, an APIClient authenticated as
+    that user.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(username="tester", password="secret123")
+        self.auth_client = APIClient()
+        self.auth_client.force_authenticate(user=self.user)
+
+
+class MoviesAPITests(MovieCacheTestMixin, APITestCase):
     def setUp(self):
+        super().setUp()
         # User and JWT login
         self.username = "tester"
         self.password = "secret123"
@@ -53,6 +114,13 @@ class MoviesAPITests(APITestCase):
         self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.content)
         self.assertTrue(Movie.objects.filter(title="Interstellar").exists())
 
+    def test_create_rejects_existing_title_and_release_date(self):
+        payload = self._movie_payload(rating=4.3)
+        self.assertEqual(self.auth_client.post(self.list_url, payload, format="json").status_code, status.HTTP_201_CREATED)
+        res = self.auth_client.post(self.list_url, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, res.content)
+        self.assertEqual(Movie.objects.filter(title="Interstellar").count(), 1)
+
     def test_retrieve_update_delete_movie(self):
         # Create
         create = self.auth_client.post(self.list_url, self._movie_payload(title="Inception", rating=8.8), format="json")
@@ -125,4 +193,1396 @@ class MoviesAPITests(APITestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIn("count", res.data)
         self.assertEqual(res.data["count"], 12)
-        self.assertEqual(len(res.data["results"]), 10)
\ No newline at end of file
+        self.assertEqual(len(res.data["results"]), 10)
+
+class MoviesKeysetPaginationTests(AuthenticatedMovieTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.list_url = reverse("movie-list")
+
+        # 25 movies, with repeated titles to exercise the id tie-breaker
+        Movie.objects.bulk_create([
+            Movie(title=f"M{i % 8:02}", release_date=date(2000, 1, 1) + timedelta(days=i), genre="Drama", rating=3.0)
+            for i in range(25)
+        ])
+        self.expected = list(Movie.objects.order_by("title", "id").values_list("id", flat=True))
+
+    def _ids(self, res):
+        return [m["id"] for m in res.data["results"]]
+
+    def test_cursor_walks_all_pages_forward_and_back(self):
+        res = self.auth_client.get(f"{self.list_url}?pagination=cursor")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", res.data)
+        self.assertIsNone(res.data["previous"])
+
+        pages = [self._ids(res)]
+        while res.data["next"]:
+            res = self.auth_client.get(res.data["next"])
+            pages.append(self._ids(res))
+        self.assertEqual([pk for page in pages for pk in page], self.expected)
+        self.assertEqual([len(p) for p in pages], [10, 10, 5])
+
+        back = []
+        while res.data["previous"]:
+            res = self.auth_client.get(res.data["previous"])
+            back.insert(0, self._ids(res))
+        self.assertEqual(back, pages[:-1])
+
+    def test_cursor_skips_count_query_unless_requested(self):
+        # ETag aggregate + page, the paginator itself adds no COUNT(*)
+        with self.assertNumQueries(2):
+            self.auth_client.get(f"{self.list_url}?pagination=cursor")
+        with self.assertNumQueries(3):
+            res = self.auth_client.get(f"{self.list_url}?pagination=cursor&count=true")
+        self.assertEqual(res.data["count"], 25)
+
+    def test_cursor_respects_filters(self):
+        Movie.objects.create(title="Z", release_date=date(2000, 1, 1), genre="Comedy", rating=4.0)
+        res = self.auth_client.get(f"{self.list_url}?pagination=cursor&genre=Comedy")
+        self.assertEqual([m["title"] for m in res.data["results"]], ["Z"])
+        self.assertIsNone(res.data["next"])
+
+    def test_cursor_rejects_search(self):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(self.user)}"}
+        for url in (self.list_url, "/api/async/movies/"):
+            with self.subTest(url=url):
+                res = self.client.get(url, {"pagination": "cursor", "search": "M01"}, **headers)
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn("search", res.json())
+
+    def test_invalid_cursor_returns_404(self):
+        res = self.auth_client.get(f"{self.list_url}?cursor=not-a-cursor")
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@skipUnless(connection.vendor == "postgresql", "Query plans are only checked on PostgreSQL")
+class MovieQueryPlanTests(TestCase):
+    """
+    Checks through EXPLAIN that the list endpoint queries are served by the
+    Movie indexes instead of sequential scans. The catalog size can be
+    lowered with MOVIES_PLAN_TEST_ROWS for quicker local runs.
+    """
+
+    rows = int(os.getenv("MOVIES_PLAN_TEST_ROWS", "1000000"))
+
+    @classmethod
+    def setUpTestData(cls):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Movie._meta.db_table} (title, release_date, genre, rating, updated_at)
+                SELECT 'Movie ' || lpad(i::text, 7, '0'),
+                       date '1950-01-01' + (i %% 25000),
+                       (ARRAY['Drama','Comedy','Action','Crime','Sci-Fi',
+                              'Thriller','Horror','Romance','Animation','Documentary'])[i %% 10 + 1],
+                       (i %% 51) / 10.0,
+                       now()
+                FROM generate_series(1, %s) AS i
+                """,
+                [cls.rows],
+            )
+            # Autovacuum flushes the GIN pending list in production; inside
+            # the test transaction it has to be done by hand.
+            cursor.execute("SELECT gin_clean_pending_list('movies_search_vector_gin')")
+            cursor.execute(f"ANALYZE {Movie._meta.db_table}")
+
+    def _list_queryset(self, query=""):
+        view = MovieApiCreate()
+        view.request = Request(APIRequestFactory().get(f"/api/movies/?{query}"))
+        view.format_kwarg = None
+        view.action = "list"
+        return view.get_queryset()
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        self.assertNotIn(f"Seq Scan on {Movie._meta.db_table}", plan, plan)
+        self.assertIn("Index", plan, plan)
+
+    def test_first_page_uses_title_index(self):
+        self.assertUsesIndex(self._list_queryset()[:10])
+
+    def test_genre_filter_uses_index(self):
+        self.assertUsesIndex(self._list_queryset("genre=Drama")[:10])
+
+    def test_rating_filter_uses_index(self):
+        self.assertUsesIndex(self._list_queryset("rating=4.9")[:10])
+
+    def test_genre_and_rating_filter_uses_index(self):
+        qs = self._list_queryset("genre=Comedy&rating=4.5")
+        self.assertUsesIndex(qs[:10])
+        self.assertUsesIndex(qs.order_by())  # same filter as the paginator COUNT(*)
+
+    def test_keyset_page_uses_title_index(self):
+        qs = self._list_queryset().filter(title__gte="Movie 0500000").order_by("title", "id")
+        self.assertUsesIndex(qs[:11])
+
+    def test_search_uses_gin_index(self):
+        self.assertUsesIndex(self._list_queryset("search=0500000")[:10])
+
+    def test_autocomplete_prefix_uses_index(self):
+        from movies.autocomplete import SUGGESTION_FIELDS
+        from django.db.models.functions import Upper
+        qs = Movie.objects.filter(title__istartswith="movie 05").order_by(Upper("title"))
+        self.assertUsesIndex(qs.values(*SUGGESTION_FIELDS)[:10])
+
+    def test_autocomplete_infix_uses_trigram_index(self):
+        from django.db.models import Q
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            if cursor.fetchone() is None:
+                self.skipTest("pg_trgm is not installed")
+        qs = Movie.objects.filter(Q(title__icontains="0500000") | Q(director__icontains="0500000"))
+        self.assertUsesIndex(qs.order_by()[:10])
+
+    def test_release_date_range_uses_index(self):
+        qs = Movie.objects.filter(release_date__range=(date(1990, 1, 1), date(1990, 1, 31)))
+        self.assertUsesIndex(qs)
+
+
+class MovieSearchTests(AuthenticatedMovieTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.list_url = reverse("movie-list")
+
+        def movie(title, **extra):
+            return Movie.objects.create(title=title, release_date=date(2000, 1, 1), genre="Drama", rating=4.0, **extra)
+
+        self.inception = movie("Inception", director="Christopher Nolan", description="A dream within a dream.",
+                               cast=[{"name": "Leonardo DiCaprio"}])
+        self.dreamgirls = movie("Dreamgirls", director="Bill Condon", description="A Motown story.")
+        self.titanic = movie("Titanic", director="James Cameron", cast=["Leonardo DiCaprio", "Kate Winslet"])
+
+    def _titles(self, query):
+        res = self.auth_client.get(f"{self.list_url}?{query}")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [m["title"] for m in res.data["results"]]
+
+    def test_search_matches_cast_names_in_both_formats(self):
+        self.assertEqual(sorted(self._titles("search=DiCaprio")), ["Inception", "Titanic"])
+
+    def test_search_matches_director_and_description(self):
+        self.assertEqual(self._titles("search=Nolan"), ["Inception"])
+        self.assertEqual(self._titles("search=motown"), ["Dreamgirls"])
+
+    def test_search_ranks_title_matches_first(self):
+        Movie.objects.create(title="Toy Story", release_date=date(1995, 1, 1), genre="Animation", rating=4.5)
+        self.assertEqual(self._titles("search=story"), ["Toy Story", "Dreamgirls"])
+
+    def test_search_combines_with_filters(self):
+        Movie.objects.filter(pk=self.titanic.pk).update(genre="Romance")
+        self.assertEqual(self._titles("search=DiCaprio&genre=Romance"), ["Titanic"])
+
+    def test_search_vector_is_not_serialized(self):
+        res = self.auth_client.get(reverse("movie-detail", args=[self.inception.pk]))
+        self.assertNotIn("search_vector", res.data)
+
+
+class MovieAutocompleteTests(AuthenticatedMovieTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("movie-autocomplete")
+
+        for title, director in [("The Dark Knight", "Christopher Nolan"), ("Inception", "Christopher Nolan"),
+                                ("The Matrix", "The Wachowskis"), ("Interstellar", "Christopher Nolan")]:
+            Movie.objects.create(title=title, director=director, release_date=date(2000, 1, 1), genre="Drama", rating=4.0)
+
+    def _suggest(self, q, **params):
+        res = self.auth_client.get(self.url, {"q": q, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_prefix_returns_only_lightweight_fields(self):
+        data = self._suggest("int")
+        self.assertEqual([m["title"] for m in data], ["Interstellar"])
+        self.assertEqual(set(data[0]), {"id", "title", "director"})
+
+    def test_matches_inner_words_and_directors(self):
+        self.assertEqual([m["title"] for m in self._suggest("knight")], ["The Dark Knight"])
+        self.assertEqual(len(self._suggest("nolan")), 3)
+
+    def test_limit_and_empty_query(self):
+        self.assertEqual(len(self._suggest("christopher", limit=2)), 2)
+        self.assertEqual(self._suggest(""), [])
+
+    def test_new_movies_are_suggested(self):
+        self._suggest("mem")
+        Movie.objects.create(title="Memento", release_date=date(2000, 1, 1), genre="Thriller", rating=4.2)
+        self.assertEqual([m["title"] for m in self._suggest("mem")], ["Memento"])
+
+    def test_requires_auth(self):
+        self.assertEqual(self.client.get(self.url, {"q": "in"}).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class MovieResponseCacheTests(AuthenticatedMovieTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.list_url = reverse("movie-list")
+        self.movie = Movie.objects.create(title="Heat", release_date=date(1995, 12, 15), genre="Crime", rating=4.1)
+
+    def test_second_read_is_served_from_cache(self):
+        first = self.auth_client.get(f"{self.list_url}?genre=Crime&rating=4")
+        self.assertEqual(first["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            second = self.auth_client.get(f"{self.list_url}?rating=4&genre=Crime")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.data, first.data)
+
+    def test_pages_and_filters_have_separate_entries(self):
+        self.auth_client.get(f"{self.list_url}?genre=Crime")
+        self.assertEqual(self.auth_client.get(f"{self.list_url}?genre=Drama")["X-Cache"], "MISS")
+        self.assertEqual(self.auth_client.get(f"{self.list_url}?genre=Crime&page=1")["X-Cache"], "MISS")
+
+    def test_writes_invalidate_list_and_detail(self):
+        detail_url = reverse("movie-detail", args=[self.movie.pk])
+        self.auth_client.get(self.list_url)
+        self.auth_client.get(detail_url)
+
+        self.auth_client.patch(detail_url, {"rating": 4.5}, format="json")
+        res = self.auth_client.get(detail_url)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["rating"], 4.5)
+
+        Movie.objects.create(title="Ronin", release_date=date(1998, 9, 25), genre="Crime", rating=3.6)
+        res = self.auth_client.get(self.list_url)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["count"], 2)
+
+        self.movie.delete()
+        self.assertEqual(self.auth_client.get(self.list_url).data["count"], 1)
+
+    def test_errors_are_not_cached(self):
+        url = reverse("movie-detail", args=[self.movie.pk + 100])
+        for _ in range(2):
+            self.assertEqual(self.auth_client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(movie_response_cache.stats()["misses"], 2)
+
+    def test_stats_are_admin_only(self):
+        self.auth_client.get(self.list_url)
+        self.auth_client.get(self.list_url)
+        stats_url = reverse("movie-cache-stats")
+        self.assertEqual(self.auth_client.get(stats_url).status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = get_user_model().objects.create_superuser(username="admin", password="admin123")
+        self.auth_client.force_authenticate(user=admin)
+        res = self.auth_client.get(stats_url)
+        self.assertEqual((res.data["hits"], res.data["misses"]), (1, 1))
+
+
+class MovieConditionalGetTests(AuthenticatedMovieTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.list_url = reverse("movie-list")
+        self.movie = Movie.objects.create(title="Alien", release_date=date(1979, 5, 25), genre="Horror", rating=4.2)
+        self.detail_url = reverse("movie-detail", args=[self.movie.pk])
+
+    def test_list_returns_304_with_single_query_when_unchanged(self):
+        first = self.auth_client.get(self.list_url, {"genre": "Horror"})
+        self.assertIn("ETag", first)
+        self.assertNotIn("Last-Modified", first)
+
+        movie_response_cache.clear()
+        with self.assertNumQueries(1):
+            res = self.auth_client.get(self.list_url, {"genre": "Horror"}, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], first["ETag"])
+
+    def test_cached_representation_answers_conditional_requests(self):
+        first = self.auth_client.get(self.detail_url)
+        with self.assertNumQueries(0):
+            res = self.auth_client.get(self.detail_url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        res = self.auth_client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_on_update_delete_and_page(self):
+        etag = self.auth_client.get(self.list_url)["ETag"]
+        self.assertNotEqual(self.auth_client.get(self.list_url, {"genre": "Horror"})["ETag"], etag)
+
+        self.auth_client.patch(self.detail_url, {"rating": 4.4}, format="json")
+        res = self.auth_client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+        other = Movie.objects.create(title="Aliens", release_date=date(1986, 7, 18), genre="Horror", rating=4.0)
+        etag = self.auth_client.get(self.list_url)["ETag"]
+        other.delete()
+        self.assertEqual(self.auth_client.get(self.list_url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_list_validators_are_catalog_wide_and_see_deletes(self):
+        other = Movie.objects.create(title="Aliens", release_date=date(1986, 7, 18), genre="Horror", rating=4.0)
+        since = http_date(timezone.now().timestamp() + 60)
+        first = self.auth_client.get(self.list_url, {"genre": "Horror"})
+        # No query over the filtered movies: one for the validators, whatever the filter
+        movie_response_cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            self.auth_client.get(self.list_url, {"genre": "Horror"}, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(len(captured), 1)
+        self.assertNotIn("genre", captured.captured_queries[0]["sql"])
+
+        Movie.objects.create(title="Up", release_date=date(2009, 5, 29), genre="Animation", rating=4.1)
+        res = self.auth_client.get(self.list_url, {"genre": "Horror"}, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        # If-Modified-Since alone never yields a 304 for a list, even after a delete
+        other.delete()
+        res = self.auth_client.get(self.list_url, {"genre": "Horror"}, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 1)
+
+    def test_missing_movie_is_still_404(self):
+        res = self.auth_client.get(reverse("movie-detail", args=[self.movie.pk + 100]), HTTP_IF_NONE_MATCH='"x"')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class MovieReadSerializerTests(AuthenticatedMovieTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        Movie.objects.create(title="Amélie", description="Le fabuleux destin…", release_date=date(2001, 4, 25),
+                             genre="Comedy", rating=4.15, cast=[{"name": "Audrey Tautou", "role": "Amélie"}],
+                             director="Jean-Pierre Jeunet")
+        Movie.objects.create(title="Untitled", release_date=date(1900, 1, 1), genre="Drama", rating=0.0)
+        Movie.objects.create(title="Top", release_date=date(2024, 2, 29), genre="Drama", rating=5,
+                             cast=["A", "B"], description="")
+
+    def test_output_is_byte_identical_to_movie_serializer(self):
+        expected = JSONRenderer().render(MovieSerializer(Movie.objects.order_by("id"), many=True).data)
+        rows = Movie.objects.order_by("id").values(*MovieReadSerializer.sources())
+        self.assertEqual(JSONRenderer().render(MovieReadSerializer(rows, many=True).data), expected)
+
+        movie = Movie.objects.first()
+        self.assertEqual(
+            JSONRenderer().render(MovieReadSerializer(movie).data),
+            JSONRenderer().render(MovieSerializer(movie).data),
+        )
+
+    def test_api_reads_match_movie_serializer(self):
+        res = self.auth_client.get(reverse("movie-list"))
+        expected = MovieSerializer(Movie.objects.order_by("title", "id"), many=True).data
+        self.assertEqual(JSONRenderer().render(res.data["results"]), JSONRenderer().render(expected))
+
+        movie = Movie.objects.get(title="Amélie")
+        res = self.auth_client.get(reverse("movie-detail", args=[movie.pk]))
+        self.assertEqual(JSONRenderer().render(res.data), JSONRenderer().render(MovieSerializer(movie).data))
+
+    def test_browsable_api_still_renders_forms(self):
+        res = self.auth_client.get(reverse("movie-list"), HTTP_ACCEPT="text/html")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class MovieBulkTests(AuthenticatedMovieTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("movie-bulk")
+        self.existing = Movie.objects.create(title="Heat", release_date=date(1995, 12, 15), genre="Crime", rating=4.0)
+
+    def _item(self, title, **extra):
+        return {"title": title, "release_date": "1995-12-15", "genre": "Crime", "rating": 4.0, **extra}
+
+    @override_settings(MOVIES_BULK_CHUNK_SIZE=2)
+    def test_upsert_creates_and_updates_across_chunks(self):
+        items = [self._item("Heat", rating=4.6, director="Michael Mann")] + [self._item(f"Movie {i}") for i in range(4)]
+        res = self.auth_client.post(self.url, items, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+        self.assertEqual((res.data["created"], res.data["updated"], res.data["invalid"]), (4, 1, 0))
+        self.assertEqual(res.data["results"][0], {"index": 0, "status": "updated", "id": self.existing.pk})
+
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.rating, self.existing.director), (4.6, "Michael Mann"))
+        for result in res.data["results"][1:]:
+            self.assertEqual(Movie.objects.get(pk=result["id"]).title, f"Movie {result['index'] - 1}")
+
+    def test_invalid_items_are_reported_and_skipped(self):
+        items = [self._item("Good"), self._item("Bad", rating=9.0), "not an object"]
+        res = self.auth_client.post(self.url, items, format="json")
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([r["status"] for r in res.data["results"]], ["created", "invalid", "invalid"])
+        self.assertIn("rating", res.data["results"][1]["errors"])
+        self.assertFalse(Movie.objects.filter(title="Bad").exists())
+
+    def test_duplicate_keys_last_item_wins(self):
+        res = self.auth_client.post(self.url, [self._item("Twice", rating=1.0), self._item("Twice", rating=2.0)], format="json")
+        self.assertEqual([r["status"] for r in res.data["results"]], ["superseded", "created"])
+        self.assertEqual(Movie.objects.get(title="Twice").rating, 2.0)
+
+    def test_ndjson_stream(self):
+        body = "\n".join(json.dumps(self._item(f"Line {i}")) for i in range(3)) + "\n"
+        res = self.auth_client.post(self.url, body, content_type="application/x-ndjson")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+        self.assertEqual(res.data["created"], 3)
+
+        res = self.auth_client.post(self.url, "{broken\n", content_type="application/x-ndjson")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_writes_invalidate_cached_lists(self):
+        self.assertEqual(self.auth_client.get(reverse("movie-list")).data["count"], 1)
+        self.auth_client.post(self.url, [self._item("New")], format="json")
+        self.assertEqual(self.auth_client.get(reverse("movie-list")).data["count"], 2)
+
+    def test_bulk_delete(self):
+        res = self.auth_client.delete(self.url, {"ids": [self.existing.pk, self.existing.pk + 100]}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual((res.data["deleted"], res.data["not_found"]), (1, 1))
+        self.assertFalse(Movie.objects.exists())
+
+        res = self.auth_client.delete(self.url, {"ids": "all"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(MOVIES_BULK_CHUNK_SIZE=2)
+    def test_bulk_delete_invalidates_caches_once(self):
+        ids = [self.existing.pk] + [Movie.objects.create(**self._item(f"Movie {i}")).pk for i in range(4)]
+        with mock.patch.object(movie_response_cache, "invalidate") as invalidate:
+            res = self.auth_client.delete(self.url, {"ids": ids}, format="json")
+        self.assertEqual(res.data["deleted"], 5)
+        invalidate.assert_called_once_with()
+
+    @override_settings(MOVIES_BULK_MAX_ITEMS=2)
+    def test_rejects_oversized_batches(self):
+        res = self.auth_client.post(self.url, [self._item(f"M{i}") for i in range(3)], format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(MOVIES_BULK_MAX_ITEMS=2)
+    def test_ndjson_parsing_stops_past_the_item_limit(self):
+        lines = [json.dumps(self._item(f"M{i}")).encode() + b"\n" for i in range(3)]
+        stream = io.BytesIO(b"".join(lines) + b"{never parsed\n")
+        with self.assertRaisesMessage(ParseError, "At most 2 items"):
+            NDJSONParser().parse(stream, parser_context={"max_items": 2})
+        self.assertEqual(stream.tell(), len(b"".join(lines)))
+
+        body = b"".join(lines).decode()
+        res = self.auth_client.post(self.url, body, content_type="application/x-ndjson")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Movie.objects.filter(title="M0").exists())
+
+    @override_settings(MOVIES_BULK_MAX_BODY_SIZE=100)
+    def test_rejects_oversized_bodies_before_parsing(self):
+        with mock.patch.object(JSONParser, "parse") as parse:
+            res = self.auth_client.post(self.url, [self._item(f"M{i}") for i in range(3)], format="json")
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        parse.assert_not_called()
+
+
+class ImportMoviesCommandTests(MovieCacheTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(path, "wt", encoding="utf-8") as handle:
+            handle.write(text)
+        return path
+
+    def _import(self, *args):
+        out = io.StringIO()
+        call_command("import_movies", *args, stdout=out)
+        return out.getvalue()
+
+    def _csv(self):
+        return self._write("movies.csv", (
+            "title,description,release_date,genre,rating,cast,director\n"
+            "Heat,Cops and robbers,1995-12-15,Crime,8.2,Al Pacino|Robert De Niro,Michael Mann\n"
+            "Alien,In space,1979-05-25,Sci-Fi,8.5,,Ridley Scott\n"
+            "Broken,,not-a-date,Drama,7.0,,\n"
+            "Heat,Cops and robbers,1995-12-15,Crime,8.4,,Michael Mann\n"
+        ))
+
+    def test_csv_import_normalizes_and_upserts(self):
+        output = self._import(self._csv(), "--chunk-size", "2", "--method", "orm")
+        self.assertIn("Written: 3, invalid: 1", output)
+        self.assertIn("rows/s", output)
+        self.assertEqual(Movie.objects.count(), 2)
+        # the later Heat row wins, rating converted from the 0–10 scale
+        heat = Movie.objects.get(title="Heat")
+        self.assertEqual((heat.rating, heat.director), (4.2, "Michael Mann"))
+        self.assertEqual(Movie.objects.get(title="Alien").release_date, date(1979, 5, 25))
+        self.assertEqual(MovieFacet.objects.get(genre="Crime").count, 1)
+
+        self._import(self._csv(), "--method", "orm")
+        self.assertEqual(Movie.objects.count(), 2)
+
+    def test_ndjson_gzip_import(self):
+        lines = [
+            json.dumps({"title": "Heat", "release_date": "1995-12-15", "genre": "Crime", "rating": 4.5,
+                        "cast": [{"name": "Al Pacino"}]}),
+            "{broken",
+            json.dumps({"title": "Alien", "release_date": "1979-05-25", "genre": "Sci-Fi", "rating": 6.0}),
+        ]
+        path = self._write("movies.ndjson.gz", "\n".join(lines) + "\n")
+        output = self._import(path, "--rating-scale", "5", "--method", "orm")
+        self.assertIn("Written: 1, invalid: 2", output)
+        self.assertEqual(Movie.objects.get().cast, [{"name": "Al Pacino"}])
+        self.assertEqual(Credit.objects.get().person.name, "Al Pacino")
+
+    def test_import_invalidates_cached_lists(self):
+        client = APIClient()
+        client.force_authenticate(user=get_user_model().objects.create_user(username="tester", password="secret123"))
+        self.assertEqual(client.get(reverse("movie-list")).data["count"], 0)
+        self._import(self._csv(), "--method", "orm")
+        self.assertEqual(client.get(reverse("movie-list")).data["count"], 2)
+
+    @skipUnless(connection.vendor == "postgresql", "COPY requires PostgreSQL")
+    def test_copy_method(self):
+        Movie.objects.create(title="Heat", release_date=date(1995, 12, 15), genre="Crime", rating=1.0)
+        output = self._import(self._csv(), "--method", "copy", "--chunk-size", "10")
+        self.assertIn("Written: 3, invalid: 1", output)
+        self.assertEqual(Movie.objects.count(), 2)
+        heat = Movie.objects.get(title="Heat")
+        self.assertEqual((heat.rating, heat.cast), (4.2, None))
+        self.assertEqual(list(heat.credits.values_list("person__name", flat=True)), ["Michael Mann"])
+        self.assertIsNotNone(Movie.objects.get(title="Alien").search_vector)
+
+
+class MovieExportTests(AuthenticatedMovieTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("movie-export")
+        for i in range(5):
+            Movie.objects.create(
+                title=f"Movie {i}", release_date=date(2000, 1, 1) + timedelta(days=i),
+                genre="Drama" if i % 2 else "Crime", rating=i, cast=[{"name": f"Actor {i}"}],
+            )
+
+    def _body(self, response):
+        return b"".join(response.streaming_content)
+
+    @override_settings(MOVIES_EXPORT_CHUNK_SIZE=2)
+    def test_ndjson_export_matches_serializer(self):
+        res = self.auth_client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertTrue(res["Content-Type"].startswith("application/x-ndjson"))
+        rows = [json.loads(line) for line in self._body(res).decode().splitlines()]
+        expected = MovieSerializer(Movie.objects.order_by("title", "id"), many=True).data
+        self.assertEqual(rows, json.loads(JSONRenderer().render(expected)))
+
+    def test_filters_apply(self):
+        res = self.auth_client.get(self.url, {"genre": "Drama", "rating": 3})
+        rows = [json.loads(line) for line in self._body(res).decode().splitlines()]
+        self.assertEqual([row["title"] for row in rows], ["Movie 3"])
+
+    def test_csv_export(self):
+        res = self.auth_client.get(self.url, {"as": "csv"})
+        self.assertIn('filename="movies.csv"', res["Content-Disposition"])
+        lines = list(csv.DictReader(io.StringIO(self._body(res).decode())))
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[0]["title"], "Movie 0")
+        self.assertEqual(json.loads(lines[0]["cast"]), [{"name": "Actor 0"}])
+
+    def test_gzip_export(self):
+        res = self.auth_client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", res["Vary"])
+        self.assertEqual(len(gzip.decompress(self._body(res)).decode().splitlines()), 5)
+
+    def test_gzip_export_honours_q_values(self):
+        for header, compressed in (("gzip;q=0, deflate", False), ("x-gzip-foo", False), ("*;q=0.5", True),
+                                   ("GZIP ; q=0.8", True), ("*, gzip;q=0", False), ("", False)):
+            with self.subTest(header=header):
+                res = self.auth_client.get(self.url, HTTP_ACCEPT_ENCODING=header)
+                self.assertEqual(res.get("Content-Encoding") == "gzip", compressed)
+
+    def test_unknown_format(self):
+        res = self.auth_client.get(self.url, {"as": "xml"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MovieCreditTests(AuthenticatedMovieTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.list_url = reverse("movie-list")
+        self.heat = Movie.objects.create(
+            title="Heat", release_date=date(1995, 12, 15), genre="Crime", rating=4.1, director="Michael Mann",
+            cast=[{"name": "Al Pacino", "role": "Vincent Hanna"}, "Robert De Niro", {"name": "Al Pacino"}],
+        )
+        Movie.objects.create(title="Scarface", release_date=date(1983, 12, 9), genre="Crime", rating=4.0,
+                             director="Brian De Palma", cast=["Al Pacino"])
+        Movie.objects.create(title="Ronin", release_date=date(1998, 9, 25), genre="Action", rating=3.6,
+                             director="John Frankenheimer", cast=[{"name": "Robert De Niro"}])
+
+    def _titles(self, **params):
+        res = self.auth_client.get(self.list_url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [m["title"] for m in res.data["results"]]
+
+    def test_credits_follow_cast_and_director(self):
+        credits = self.heat.credits.order_by("role", "order").values_list("person__name", "role", "character", "order")
+        self.assertEqual(list(credits), [
+            ("Al Pacino", "actor", "Vincent Hanna", 0),
+            ("Robert De Niro", "actor", None, 1),
+            ("Michael Mann", "director", None, 0),
+        ])
+        self.assertEqual(Person.objects.filter(name="Al Pacino").count(), 1)
+
+        self.heat.cast = ["Val Kilmer"]
+        self.heat.director = None
+        self.heat.save()
+        self.assertEqual(list(self.heat.credits.values_list("person__name", flat=True)), ["Val Kilmer"])
+
+    def test_actor_and_director_filters(self):
+        self.assertEqual(self._titles(actor="al pacino"), ["Heat", "Scarface"])
+        self.assertEqual(self._titles(actor="Robert De Niro", genre="Action"), ["Ronin"])
+        self.assertEqual(self._titles(director="Michael Mann"), ["Heat"])
+        self.assertEqual(self._titles(director="Al Pacino"), [])
+
+    def test_filtered_list_query_count_is_constant(self):
+        # Validators, exact count and page, whatever the number of matches
+        with self.assertNumQueries(3):
+            self.auth_client.get(self.list_url, {"actor": "Al Pacino", "count": "true"})
+        for i in range(10):
+            Movie.objects.create(title=f"Pacino {i}", release_date=date(2000, 1, 1), genre="Drama", rating=3.0,
+                                 cast=["Al Pacino", f"Co-star {i}"])
+        with self.assertNumQueries(3):
+            res = self.auth_client.get(self.list_url, {"actor": "Al Pacino", "count": "true"})
+        self.assertEqual(res.data["count"], 12)
+
+    def test_bulk_writes_and_deletes_keep_credits(self):
+        res = self.auth_client.post(reverse("movie-bulk"), [
+            {"title": "Heat", "release_date": "1995-12-15", "genre": "Crime", "rating": 4.2, "cast": ["Ashley Judd"]},
+            {"title": "Collateral", "release_date": "2004-08-06", "genre": "Crime", "rating": 3.8,
+             "director": "Michael Mann"},
+        ], format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+        self.assertEqual(self._titles(actor="Ashley Judd"), ["Heat"])
+        self.assertEqual(self._titles(actor="Al Pacino"), ["Scarface"])
+        self.assertEqual(self._titles(director="michael mann"), ["Collateral"])
+
+        self.auth_client.delete(reverse("movie-bulk"), {"ids": [self.heat.pk]}, format="json")
+        self.assertFalse(Credit.objects.filter(movie_id=self.heat.pk).exists())
+
+    def test_sync_credits_rebuilds_from_columns(self):
+        Movie.objects.filter(pk=self.heat.pk).update(cast=["Jon Voight"], director="Michael Mann")
+        sync_credits([self.heat.pk])
+        self.assertEqual(self._titles(actor="Jon Voight"), ["Heat"])
+
+    def test_credit_queries_do_not_join_movies(self):
+        self.assertNotIn("JOIN", str(Credit.objects.all().query))
+        credits = list(Credit.objects.filter(movie_id=self.heat.pk))
+        with self.assertNumQueries(0):
+            self.assertIn(f"movie {self.heat.pk}", str(credits[0]))
+
+
+class MovieFacetTests(AuthenticatedMovieTestMixin, APITestCase):
+    GENRES = ["Crime", "Drama", "Sci-Fi"]
+
+    def setUp(self):
+        super().setUp()
+        self.serial = 0
+
+    def _stored(self):
+        return {
+            (genre, bucket): n
+            for genre, bucket, n in MovieFacet.objects.filter(count__gt=0).values_list("genre", "rating_bucket", "count")
+        }
+
+    def assertFacetsMatchRecompute(self):
+        self.assertEqual(self._stored(), dict(count_facets(Movie.objects.all())))
+        self.assertFalse(MovieFacet.objects.filter(count__lt=0).exists())
+
+    def _item(self, rng, title=None):
+        self.serial += 1
+        return {
+            "title": title or f"Movie {self.serial}", "release_date": "2000-01-01",
+            "genre": rng.choice(self.GENRES), "rating": rng.choice([0.0, 0.5, 1.9, 2.0, 3.3, 4.99, 5.0]),
+        }
+
+    def test_incremental_counts_match_recompute_after_random_mutations(self):
+        rng = random.Random(12)
+        for step in range(120):
+            ids = list(Movie.objects.values_list("id", flat=True))
+            op = rng.choice(["create", "update", "patch", "delete", "bulk", "bulk_delete", "queryset_delete"])
+            if op == "create" or not ids:
+                Movie.objects.create(**self._item(rng))
+            elif op == "update":
+                movie = Movie.objects.get(pk=rng.choice(ids))
+                movie.genre, movie.rating = rng.choice(self.GENRES), rng.choice([0.2, 1.0, 4.5, 5.0])
+                movie.save()
+            elif op == "patch":
+                res = self.auth_client.patch(reverse("movie-detail", args=[rng.choice(ids)]),
+                                             {"rating": rng.choice([0.0, 2.5, 3.9])}, format="json")
+                self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+            elif op == "delete":
+                Movie.objects.get(pk=rng.choice(ids)).delete()
+            elif op == "bulk":
+                titles = list(Movie.objects.values_list("title", flat=True)[:3])
+                items = [self._item(rng, title) for title in rng.sample(titles, min(2, len(titles)))]
+                items += [self._item(rng) for _ in range(rng.randint(1, 4))]
+                res = self.auth_client.post(reverse("movie-bulk"), items, format="json")
+                self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+            elif op == "bulk_delete":
+                self.auth_client.delete(reverse("movie-bulk"), {"ids": rng.sample(ids, min(3, len(ids)))}, format="json")
+            else:
+                Movie.objects.filter(genre=rng.choice(self.GENRES), rating__lt=1).delete()
+            if step % 10 == 0:
+                self.assertFacetsMatchRecompute()
+        self.assertFacetsMatchRecompute()
+
+    def test_update_reads_previous_facet_from_the_instance(self):
+        movie = Movie.objects.create(title="M", release_date=date(2000, 1, 1), genre="Crime", rating=4.1)
+        movie.genre = "Drama"
+        movie.save()
+        movie = Movie.objects.get(pk=movie.pk)
+        for rating in (1.0, 3.0):
+            movie.rating = rating
+            with CaptureQueriesContext(connection) as captured:
+                movie.save()
+            reads = [q["sql"] for q in captured.captured_queries
+                     if q["sql"].startswith("SELECT") and f"{Movie._meta.db_table}\".\"genre" in q["sql"]]
+            self.assertEqual(reads, [])
+            self.assertFacetsMatchRecompute()
+
+        stale = Movie(pk=movie.pk, title="M", release_date=date(2000, 1, 1), genre="Sci-Fi", rating=2.0)
+        stale.save()
+        self.assertFacetsMatchRecompute()
+
+    def test_facets_endpoint(self):
+        for genre, rating in [("Crime", 4.1), ("Crime", 5.0), ("Drama", 1.5), ("Drama", 0.0)]:
+            self.serial += 1
+            Movie.objects.create(title=f"M{self.serial}", release_date=date(2000, 1, 1), genre=genre, rating=rating)
+        with self.assertNumQueries(1):
+            res = self.auth_client.get(reverse("movie-facets"))
+        self.assertEqual(res.data["total"], 4)
+        self.assertEqual(res.data["genres"], [{"genre": "Crime", "count": 2}, {"genre": "Drama", "count": 2}])
+        self.assertEqual([bucket["count"] for bucket in res.data["ratings"]], [1, 1, 0, 0, 2])
+
+        res = self.auth_client.get(reverse("movie-facets"), {"genre": "Drama"})
+        self.assertEqual(res.data["total"], 2)
+        self.assertEqual([bucket["count"] for bucket in res.data["ratings"]], [1, 1, 0, 0, 0])
+
+    def test_rebuild_command_repairs_drift(self):
+        Movie.objects.create(title="Heat", release_date=date(1995, 12, 15), genre="Crime", rating=4.1)
+        # queryset.update() bypasses the signals
+        Movie.objects.update(genre="Drama")
+        out = io.StringIO()
+        call_command("rebuild_facets", "--check", stdout=out)
+        self.assertIn("2 facets drifted", out.getvalue())
+
+        call_command("rebuild_facets", stdout=io.StringIO())
+        self.assertEqual(self._stored(), {("Drama", 4): 1})
+
+
+class MovieAnalyticsTests(AuthenticatedMovieTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        catalog_analytics.invalidate()
+        self.url = reverse("movie-analytics")
+        rng = random.Random(7)
+        Movie.objects.bulk_create([
+            Movie(
+                title=f"Movie {i:03}", release_date=date(1990 + i % 7, 1 + i % 12, 1),
+                genre=rng.choice(["Crime", "Drama", "Sci-Fi"]), rating=round(rng.uniform(0, 5), 1),
+                director=rng.choice(["Mann", "Nolan", "Scott", None]),
+            )
+            for i in range(120)
+        ])
+
+    def _orm_groups(self, field, queryset=None):
+        queryset = Movie.objects.all() if queryset is None else queryset
+        if field == "year":
+            queryset = queryset.annotate(year=ExtractYear("release_date"))
+        if field == "director":
+            queryset = queryset.exclude(director=None)
+        rows = queryset.values(field).annotate(
+            count=Count("id"), avg_rating=Avg("rating"), min_rating=Min("rating"), max_rating=Max("rating")
+        ).order_by(field)
+        return [dict(row) for row in rows]
+
+    def assertGroupsEqual(self, actual, expected):
+        self.assertEqual(len(actual), len(expected))
+        for got, want in zip(actual, expected):
+            self.assertEqual({k: v for k, v in got.items() if k != "avg_rating"},
+                             {k: v for k, v in want.items() if k != "avg_rating"})
+            self.assertAlmostEqual(got["avg_rating"], want["avg_rating"])
+
+    def test_group_by_matches_orm_aggregates(self):
+        engine = CatalogAnalytics()
+        for field in ("genre", "year", "director"):
+            self.assertGroupsEqual(engine.group_by(field), self._orm_groups(field))
+        self.assertGroupsEqual(
+            engine.group_by("genre", year_from=1992, year_to=1994, min_rating=2.5),
+            self._orm_groups("genre", Movie.objects.filter(
+                release_date__year__gte=1992, release_date__year__lte=1994, rating__gte=2.5)),
+        )
+        self.assertEqual(engine.group_by("genre", genre="Western"), [])
+
+    def test_top_k_per_group(self):
+        engine = CatalogAnalytics()
+        groups = engine.top_k(3, "genre", director="Nolan")
+        for group in groups:
+            expected = Movie.objects.filter(genre=group["genre"], director="Nolan").order_by("-rating", "id")[:3]
+            self.assertEqual([m["id"] for m in group["movies"]], [m.id for m in expected])
+        best = engine.top_k(5)
+        self.assertEqual([m["id"] for m in best], list(Movie.objects.order_by("-rating", "id").values_list("id", flat=True)[:5]))
+
+    def test_incremental_refresh_matches_full_load(self):
+        # Rows older than the refresh overlap are not read again
+        Movie.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        engine = CatalogAnalytics()
+        engine.load()
+        Movie.objects.create(title="New", release_date=date(2001, 1, 1), genre="Western", rating=4.9, director="Leone")
+        moved = Movie.objects.order_by("id").first()
+        moved.genre = "Western"
+        moved.save()
+        Movie.objects.order_by("-id")[1].delete()
+
+        self.assertEqual(engine.refresh(), 2)
+        fresh = CatalogAnalytics()
+        for field in ("genre", "director"):
+            self.assertEqual(engine.group_by(field), fresh.group_by(field))
+        self.assertEqual(engine.top_k(10), fresh.top_k(10))
+        self.assertEqual(len(engine.columns()), Movie.objects.count())
+
+    def test_analytics_endpoint(self):
+        res = self.auth_client.get(self.url, {"group_by": "year", "genre": "Drama"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertGroupsEqual(res.data, self._orm_groups("year", Movie.objects.filter(genre="Drama")))
+
+        res = self.auth_client.get(self.url, {"group_by": "genre", "top": 2})
+        self.assertEqual([len(group["movies"]) for group in res.data], [2, 2, 2])
+
+        # writes are picked up through the catalog version
+        Movie.objects.create(title="Last", release_date=date(2001, 1, 1), genre="Western", rating=1.0)
+        res = self.auth_client.get(self.url)
+        self.assertEqual(res.data[-1], {"genre": "Western", "count": 1, "avg_rating": 1.0, "min_rating": 1.0,
+                                        "max_rating": 1.0})
+
+        for params in ({"group_by": "title"}, {"year_from": "x"}, {"group_by": "none"}):
+            self.assertEqual(self.auth_client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MovieSimilarTests(AuthenticatedMovieTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.index_dir = os.path.join(tmp.name, "similar")
+        settings = override_settings(MOVIES_SIMILAR_INDEX_DIR=self.index_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        def movie(title, year, genre, director, cast, description, rating=4.0):
+            return Movie.objects.create(title=title, release_date=date(year, 6, 1), genre=genre, rating=rating,
+                                        director=director, cast=cast, description=description)
+
+        self.inception = movie("Inception", 2010, "Sci-Fi", "Christopher Nolan", ["Leonardo DiCaprio", "Michael Caine"],
+                               "A thief steals secrets through dream sharing technology.")
+        self.interstellar = movie("Interstellar", 2014, "Sci-Fi", "Christopher Nolan", ["Michael Caine"],
+                                  "Explorers travel through a wormhole in space.")
+        self.heat = movie("Heat", 1995, "Crime", "Michael Mann", ["Al Pacino", "Robert De Niro"],
+                          "A detective hunts a professional thief and his crew.", rating=4.1)
+        for i in range(12):
+            movie(f"Filler {i}", 1960 + i, ["Comedy", "Drama", "Romance"][i % 3], f"Director {i}", [f"Actor {i}"],
+                  f"An unrelated story number {i} about families and weddings.", rating=(i % 5) + 0.5)
+
+    def _similar(self, movie, **params):
+        res = self.auth_client.get(reverse("movie-similar", args=[movie.pk]), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+        return [m["title"] for m in res.data]
+
+    def test_not_built_returns_503(self):
+        res = self.auth_client.get(reverse("movie-similar", args=[self.inception.pk]))
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_flat_index_ranks_related_movies_first(self):
+        call_command("build_similar_index", "--kind", "flat", stdout=io.StringIO())
+        titles = self._similar(self.inception, limit=3)
+        self.assertEqual(titles[0], "Interstellar")
+        self.assertNotIn("Inception", titles)
+        self.assertEqual(len(titles), 3)
+        res = self.auth_client.get(reverse("movie-similar", args=[self.inception.pk]))
+        self.assertGreater(res.data[0]["similarity"], res.data[-1]["similarity"])
+
+    def test_ivf_index_matches_flat_when_probing_every_list(self):
+        call_command("build_similar_index", "--kind", "flat", stdout=io.StringIO())
+        flat = self._similar(self.heat, limit=5)
+        with override_settings(MOVIES_SIMILAR_NPROBE=4):
+            out = io.StringIO()
+            call_command("build_similar_index", "--kind", "ivf", "--lists", "4", stdout=out)
+            self.assertIn("ivf (4 lists", out.getvalue())
+            self.assertEqual(self._similar(self.heat, limit=5), flat)
+        # Only the previous version is kept next to the current one
+        call_command("build_similar_index", stdout=io.StringIO())
+        self.assertEqual(len([name for name in os.listdir(self.index_dir) if name.startswith("v")]), 2)
+
+    def test_new_and_changed_movies_are_added_incrementally(self):
+        call_command("build_similar_index", stdout=io.StringIO())
+        with self.captureOnCommitCallbacks(execute=True):
+            tenet = Movie.objects.create(
+                title="Tenet", release_date=date(2020, 8, 26), genre="Sci-Fi", rating=4.0, director="Christopher Nolan",
+                cast=["Michael Caine"], description="Explorers travel through time inversion in space.",
+            )
+        self.assertIn("Tenet", self._similar(self.interstellar, limit=2))
+        self.assertEqual(self._similar(tenet, limit=1), ["Interstellar"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.heat.genre, self.heat.director, self.heat.cast = "Sci-Fi", "Christopher Nolan", ["Michael Caine"]
+            self.heat.save()
+        self.assertIn("Heat", self._similar(self.interstellar, limit=3))
+
+        self.interstellar.delete()
+        self.assertNotIn("Interstellar", self._similar(self.inception))
+
+    def test_movies_saved_during_a_build_are_kept(self):
+        call_command("build_similar_index", stdout=io.StringIO())
+        dump = json.dump
+
+        def save_then_dump(*args, **kwargs):
+            # Runs after the new vectors are written, while CURRENT still
+            # points at the previous version
+            with self.captureOnCommitCallbacks(execute=True):
+                Movie.objects.create(
+                    title="Tenet", release_date=date(2020, 8, 26), genre="Sci-Fi", rating=4.0,
+                    director="Christopher Nolan", cast=["Michael Caine"],
+                    description="Explorers travel through time inversion in space.",
+                )
+            return dump(*args, **kwargs)
+
+        out = io.StringIO()
+        with mock.patch("movies.similar.json.dump", side_effect=save_then_dump):
+            call_command("build_similar_index", stdout=out)
+        self.assertIn("saved during the build", out.getvalue())
+        self.assertIn("Tenet", self._similar(self.interstellar, limit=2))
+
+
+class AsyncMovieViewsTests(AuthenticatedMovieTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(self.user)}"}
+        genres = ["Drama", "Comedy", "Action"]
+        for i in range(25):
+            Movie.objects.create(title=f"Movie {i:02}", release_date=date(1990 + i, 1, 1), genre=genres[i % 3],
+                                 rating=(i % 5) + 0.5, director=f"Director {i % 4}", cast=[f"Actor {i % 6}"])
+
+    def _both(self, path, params=None):
+        sync = self.client.get(f"/api/movies/{path}", params or {}, **self.headers)
+        asynchronous = self.client.get(f"/api/async/movies/{path}", params or {}, **self.headers)
+        self.assertEqual(asynchronous.status_code, sync.status_code, asynchronous.content)
+        return sync, asynchronous
+
+    def assertSameBody(self, sync, asynchronous):
+        self.assertEqual(asynchronous.content.replace(b"/api/async/movies/", b"/api/movies/"), sync.content)
+
+    def test_list_matches_sync_list(self):
+        for params in ({}, {"page": 2}, {"page": 3}, {"genre": "Drama"}, {"rating": 3}, {"search": "Movie"},
+                       {"director": "director 1", "page": 1}):
+            with self.subTest(params=params):
+                sync, asynchronous = self._both("", params)
+                self.assertEqual(asynchronous.status_code, status.HTTP_200_OK)
+                self.assertSameBody(sync, asynchronous)
+
+    def test_cursor_pagination_matches_sync_list(self):
+        sync, asynchronous = self._both("", {"pagination": "cursor", "count": "true"})
+        self.assertSameBody(sync, asynchronous)
+        cursor = json.loads(sync.content)["next"].split("cursor=")[1]
+        sync, asynchronous = self._both("", {"cursor": cursor})
+        self.assertSameBody(sync, asynchronous)
+
+    def test_detail_matches_sync_detail(self):
+        movie = Movie.objects.get(title="Movie 07")
+        sync, asynchronous = self._both(f"{movie.pk}/")
+        self.assertEqual(asynchronous.status_code, status.HTTP_200_OK)
+        self.assertSameBody(sync, asynchronous)
+
+    def test_not_found(self):
+        sync, asynchronous = self._both("999999/")
+        self.assertEqual(asynchronous.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertSameBody(sync, asynchronous)
+        _, asynchronous = self._both("", {"page": 99})
+        self.assertEqual(asynchronous.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_requires_authentication(self):
+        res = self.client.get("/api/async/movies/")
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("Bearer", res["WWW-Authenticate"])
+        res = self.client.get("/api/async/movies/", HTTP_AUTHORIZATION="Bearer not-a-token")
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_read_only(self):
+        res = self.client.post("/api/async/movies/", {}, **self.headers)
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class FakeDriverConnection:
+    def __init__(self):
+        self.closed = False
+        self.info = mock.Mock(transaction_status=0)
+        self.rollback = mock.Mock(side_effect=lambda: setattr(self.info, "transaction_status", 0))
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """
+    The psycopg2 fallback pool, over fake driver connections.
+    """
+
+    def test_reuses_the_most_recently_returned_connection(self):
+        pool = ConnectionPool(max_size=2)
+        first, second = pool.getconn(FakeDriverConnection), pool.getconn(FakeDriverConnection)
+        pool.putconn(first)
+        pool.putconn(second)
+        self.assertEqual(pool.stats(), {"idle": 2, "max_size": 2})
+        self.assertIs(pool.getconn(FakeDriverConnection), second)
+
+    def test_waits_at_most_timeout_for_a_free_connection(self):
+        pool = ConnectionPool(max_size=1, timeout=0.05)
+        connection = pool.getconn(FakeDriverConnection)
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(FakeDriverConnection)
+        pool.putconn(connection)
+        self.assertIs(pool.getconn(FakeDriverConnection), connection)
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = ConnectionPool(max_size=1, timeout=0.05)
+        with self.assertRaises(RuntimeError):
+            pool.getconn(mock.Mock(side_effect=RuntimeError))
+        self.assertIsInstance(pool.getconn(FakeDriverConnection), FakeDriverConnection)
+
+    def test_returned_connections_are_rolled_back_or_discarded(self):
+        pool = ConnectionPool()
+        open_transaction, broken = pool.getconn(FakeDriverConnection), pool.getconn(FakeDriverConnection)
+        open_transaction.info.transaction_status = 2
+        broken.close()
+        pool.putconn(open_transaction)
+        pool.putconn(broken)
+        open_transaction.rollback.assert_called_once_with()
+        self.assertEqual(pool.stats()["idle"], 1)
+
+    def test_idle_connections_expire_down_to_min_size(self):
+        pool = ConnectionPool(min_size=1, max_idle=60)
+        connections = [pool.getconn(FakeDriverConnection) for _ in range(3)]
+        with mock.patch("backend.pooled_postgresql.base.time.monotonic", return_value=0):
+            pool.putconn(connections[0])
+            pool.putconn(connections[1])
+        with mock.patch("backend.pooled_postgresql.base.time.monotonic", return_value=120):
+            pool.putconn(connections[2])
+        self.assertEqual(pool.stats()["idle"], 1)
+        self.assertEqual([c.closed for c in connections], [True, True, False])
+
+    def test_closing_discards_idle_and_returned_connections(self):
+        pool = ConnectionPool()
+        idle, in_use = pool.getconn(FakeDriverConnection), pool.getconn(FakeDriverConnection)
+        pool.putconn(idle)
+        pool.close()
+        pool.putconn(in_use)
+        self.assertTrue(idle.closed and in_use.closed)
+        self.assertEqual(pool.stats()["idle"], 0)
+
+
+@skipUnless(connection.vendor == "postgresql", "The connection pool is PostgreSQL only")
+class PooledDatabaseTests(TestCase):
+    def _wrapper(self, **pool):
+        settings_dict = {**connection.settings_dict, "OPTIONS": {**connection.settings_dict["OPTIONS"], "pool": pool}}
+        wrapper = PooledDatabaseWrapper(settings_dict, alias="pool_test")
+        self.addCleanup(wrapper.close_pool)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def _backend_pid(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT pg_backend_pid()")
+            return cursor.fetchone()[0]
+
+    def test_closed_connections_are_reused(self):
+        wrapper = self._wrapper(max_size=2)
+        pid = self._backend_pid(wrapper)
+        wrapper.close()
+        self.assertEqual(wrapper.pool.stats()["idle"], 1)
+        self.assertEqual(self._backend_pid(wrapper), pid)
+        self.assertEqual(wrapper.pool.stats()["idle"], 0)
+
+    def test_open_transaction_is_rolled_back_on_return(self):
+        wrapper = self._wrapper()
+        wrapper.set_autocommit(False)
+        self._backend_pid(wrapper)
+        raw = wrapper.connection
+        wrapper.close()
+        self.assertEqual(raw.info.transaction_status, 0)
+        wrapper.connect()
+        self.assertIs(wrapper.connection, raw)
+        self.assertTrue(wrapper.get_autocommit())
+
+    def test_waits_for_a_free_connection(self):
+        first = self._wrapper(max_size=1, timeout=0.1)
+        second = self._wrapper(max_size=1, timeout=0.1)
+        first.connect()
+        with self.assertRaises(PoolTimeout):
+            second.connect()
+        first.close()
+        second.connect()
+        self.assertIsNotNone(second.connection)
+
+    def test_broken_connections_are_discarded(self):
+        wrapper = self._wrapper()
+        pid = self._backend_pid(wrapper)
+        wrapper.connection.close()
+        wrapper.close()
+        self.assertEqual(wrapper.pool.stats()["idle"], 0)
+        self.assertNotEqual(self._backend_pid(wrapper), pid)
+
+
+class RequestInstrumentationTests(AuthenticatedMovieTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.clear()
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(self.user)}"}
+        for i in range(5):
+            Movie.objects.create(title=f"Movie {i}", release_date=date(2000 + i, 1, 1), genre="Drama",
+                                 rating=3.5, director="Director", cast=["Actor"])
+
+    def _timing(self, response):
+        timing = {}
+        for metric in response["Server-Timing"].split(", "):
+            name, *params = metric.split(";")
+            timing[name] = dict(param.split("=", 1) for param in params)
+        return timing
+
+    def test_server_timing_header(self):
+        response = self.client.get("/api/movies/", **self.headers)
+        timing = self._timing(response)
+        self.assertEqual(set(timing), {"db", "serialize", "render", "total"})
+        queries = int(timing["db"]["desc"].strip('"').split()[0])
+        self.assertGreater(queries, 0)
+        self.assertGreaterEqual(float(timing["total"]["dur"]), float(timing["db"]["dur"]))
+
+        cached = self._timing(self.client.get("/api/movies/", **self.headers))
+        self.assertEqual(cached["db"]["desc"], '"0 queries"')
+        self.assertNotIn("serialize", cached)
+
+    def test_metrics_per_endpoint(self):
+        movie = Movie.objects.first()
+        self.client.get("/api/movies/", **self.headers)
+        self.client.get(f"/api/movies/{movie.pk}/", **self.headers)
+        self.client.get(f"/api/movies/{movie.pk}/", **self.headers)
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn('http_requests_total{endpoint="movie-list",method="GET",status="200"} 1', body)
+        self.assertIn('http_requests_total{endpoint="movie-detail",method="GET",status="200"} 2', body)
+        self.assertIn('http_request_duration_seconds_count{endpoint="movie-detail"} 2', body)
+        self.assertIn('http_request_duration_seconds_bucket{endpoint="movie-list",le="+Inf"} 1', body)
+        self.assertIn('view_phase_seconds_total{endpoint="movie-list",phase="serialize"}', body)
+        self.assertRegex(body, r'db_queries_total\{endpoint="movie-list"\} [1-9]')
+
+    def test_async_view_queries_are_counted(self):
+        async_client = AsyncClient()
+
+        async def get():
+            return await async_client.get("/api/async/movies/", AUTHORIZATION=self.headers["HTTP_AUTHORIZATION"])
+
+        response = async_to_sync(get)()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(self._timing(response)["db"]["desc"], '"0 queries"')
+
+    @override_settings(INSTRUMENTATION_QUERY_THRESHOLD=2)
+    def test_flags_n_plus_one(self):
+        with self.assertLogs("backend.instrumentation", "WARNING") as logs:
+            self.client.get("/api/movies/", {"genre": "Drama"}, **self.headers)
+        self.assertIn("Possible N+1 queries on GET /api/movies/ (movie-list)", logs.output[0])
+        self.assertIn('n_plus_one_requests_total{endpoint="movie-list"} 1', metrics.render())
+
+    def test_streamed_export_queries_are_counted(self):
+        response = self.client.get(reverse("movie-export"), **self.headers)
+        before_body = int(self._timing(response)["db"]["desc"].strip('"').split()[0])
+        self.assertNotIn('endpoint="movie-export"', metrics.render())
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 5)
+        queries = re.search(r'db_queries_total\{endpoint="movie-export"\} (\d+)', metrics.render())
+        self.assertGreater(int(queries.group(1)), before_body)
+
+    def test_tracked_statements_are_bounded(self):
+        timings = RequestTimings()
+        for i in range(MAX_TRACKED_STATEMENTS * 2):
+            timings.add_query(f"SELECT {i}", 0.001)
+        timings.add_query("SELECT 0", 0.001)
+        self.assertEqual(timings.queries, MAX_TRACKED_STATEMENTS * 2 + 1)
+        self.assertEqual(len(timings.statements), MAX_TRACKED_STATEMENTS)
+        self.assertEqual(timings.statements.most_common(1), [("SELECT 0", 2)])
+
+    def test_metrics_restricted_to_allowed_addresses(self):
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="10.1.2.3").status_code, status.HTTP_403_FORBIDDEN)
+        with override_settings(INSTRUMENTATION_METRICS_ALLOWED_IPS=["*"]):
+            self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="10.1.2.3").status_code, status.HTTP_200_OK)
+
+
+class MovieQueryBudgetTests(AuthenticatedMovieTestMixin, APITestCase):
+    """
+    Queries per request of the movie endpoints, with the response cache
+    cold. The catalog is larger than a page, so a per-row query shows up
+    as a budget overrun.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user)
+        call_command("seed_data", stdout=io.StringIO())
+        call_command("generate_catalog", movies=30, actors=50, directors=10, workers=1, stdout=io.StringIO())
+        self.movie = Movie.objects.filter(title__endswith=" 0").get()
+
+    def test_list(self):
+        filters = ({}, {"genre": self.movie.genre}, {"rating": "3"}, {"actor": self.movie.cast[0]["name"]},
+                   {"director": self.movie.director}, {"search": "synthetic"})
+        for params in filters:
+            with self.subTest(**params):
+                movie_response_cache.clear()
+                with self.settings(MOVIES_EXACT_COUNT_THRESHOLD=0), CaptureQueriesContext(connection) as captured:
+                    res = self.client.get("/api/movies/", params)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                # Validators + page, + the count estimate (EXPLAIN) or COUNT(*)
+                # elsewhere unless the page is the only one
+                self.assertEqual(len(captured), 2 if res.data["next"] is None else 3)
+
+    def test_list_next_page_reuses_count(self):
+        self.client.get("/api/movies/", {"genre": "Drama"})
+        # Validators + page: the count is cached with the first page
+        with self.assertNumQueries(2):
+            res = self.client.get("/api/movies/", {"genre": "Drama", "page": 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_cursor_list(self):
+        with self.assertNumQueries(2):
+            self.client.get("/api/movies/", {"pagination": "cursor", "genre": "Drama"})
+
+    def test_retrieve(self):
+        # updated_at for the validators + the row
+        with self.assertNumQueries(2):
+            res = self.client.get(f"/api/movies/{self.movie.pk}/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_create(self):
+        payload = {"title": "Budget", "release_date": "2001-01-01", "genre": "Drama", "rating": 3.0,
+                   "cast": [{"name": "Actor 1"}, {"name": "Actor 2"}], "director": "Director 1"}
+        # Existence check + insert + 4 for the credits + facet update in a savepoint
+        with self.assertNumQueries(10):
+            res = self.client.post("/api/movies/", payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.content)
+
+
+class SyntheticCatalogTests(MovieCacheTestMixin, TestCase):
+    def test_movies_are_deterministic_per_number(self):
+        movies = list(synthetic_movies(10, seed=3, start=BLOCK_SIZE - 5))
+        self.assertEqual(list(synthetic_movies(4, seed=3, start=BLOCK_SIZE - 2)), movies[3:7])
+        self.assertNotEqual(list(synthetic_movies(10, seed=4, start=BLOCK_SIZE - 5)), movies)
+        self.assertEqual(len({(movie["title"], movie["release_date"]) for movie in movies}), 10)
+
+    def test_distributions(self):
+        block = movie_block(0, seed=1)
+        genres = block["genres"]
+        self.assertGreater(genres.count("Drama"), genres.count("Animation") * 3)
+        self.assertTrue(all(0.0 <= rating <= 5.0 for rating in block["ratings"]))
+        appearances = Counter(rank for cast in block["casts"] for rank in cast)
+        # Zipf: the most popular actor is credited about 10x as often as the 10th
+        self.assertGreater(appearances[0], appearances[9] * 5)
+        self.assertTrue(all(len(cast) == len(set(cast)) for cast in block["casts"]))
+
+    def test_generate_catalog(self):
+        options = {"seed": 1, "actors": 50, "directors": 10, "workers": 1, "stdout": io.StringIO()}
+        call_command("generate_catalog", movies=25, users=5, password="secret123", **options)
+        self.assertEqual(Movie.objects.count(), 25)
+        self.assertEqual(
+            [(m.title, m.release_date, m.cast) for m in Movie.objects.order_by("id")],
+            [(m["title"], m["release_date"], m["cast"]) for m in synthetic_movies(25, seed=1, actors=50, directors=10)],
+        )
+        self.assertEqual(Person.objects.count(), 60)
+        self.assertEqual(Credit.objects.count(), sum(len(m.cast) + 1 for m in Movie.objects.all()))
+        self.assertEqual(sum(MovieFacet.objects.values_list("count", flat=True)), 25)
+        self.assertTrue(get_user_model().objects.get(username="user4").check_password("secret123"))
+        # The id sequence continues after the generated movies
+        Movie.objects.create(title="Next", release_date=date(2000, 1, 1), genre="Drama", rating=3.0)
+
+        with self.assertRaises(CommandError):
+            call_command("generate_catalog", movies=5, **options)
+        call_command("generate_catalog", movies=5, start=25, **options)
+        self.assertEqual(Movie.objects.count(), 31)
+
+    def test_seed_data_generates_through_generate_catalog(self):
+        out = io.StringIO()
+        call_command("seed_data", movies=5, seed=1, workers=1, no_credits=True, stdout=out)
+        self.assertIn("Generated 5 movies", out.getvalue())
+        self.assertEqual(Movie.objects.count(), 20)
+        self.assertEqual(
+            set(Movie.objects.filter(description__startswith="Synthetic").values_list("title", flat=True)),
+            {m["title"] for m in synthetic_movies(5, seed=1)},
+        )
+        self.assertFalse(Credit.objects.filter(movie__description__startswith="Synthetic").exists())
+
+
+class MovieCountPaginationTests(AuthenticatedMovieTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.list_url = reverse("movie-list")
+        Movie.objects.bulk_create([
+            Movie(title=f"Movie {i:02}", release_date=date(2000, 1, 1), genre="Drama" if i % 2 else "Comedy",
+                  rating=3.0)
+            for i in range(25)
+        ])
+
+    def _count_queries(self, captured):
+        return sum("COUNT(" in query["sql"] for query in captured.captured_queries)
+
+    def test_small_results_are_counted_exactly(self):
+        res = self.auth_client.get(self.list_url)
+        self.assertEqual(res.data["count"], 25)
+        self.assertFalse(res.data["count_estimated"])
+
+    def test_count_is_cached_per_filter_until_a_write(self):
+        self.auth_client.get(self.list_url, {"genre": "Drama"})
+        with CaptureQueriesContext(connection) as captured:
+            res = self.auth_client.get(self.list_url, {"genre": "Drama", "page": 2})
+        self.assertEqual(self._count_queries(captured), 0)
+        self.assertEqual((res.data["count"], res.data["count_estimated"]), (12, False))
+        self.assertIsNone(res.data["next"])
+
+        Movie.objects.create(title="Movie 99", release_date=date(2000, 1, 1), genre="Drama", rating=3.0)
+        res = self.auth_client.get(self.list_url, {"genre": "Drama", "page": 2})
+        self.assertEqual(res.data["count"], 13)
+
+    def test_cached_count_is_not_written_again(self):
+        self.auth_client.get(self.list_url, {"genre": "Drama", "page": 2})
+        cache = movie_response_cache.cache
+        with mock.patch.object(cache, "set", wraps=cache.set) as cache_set:
+            self.auth_client.get(self.list_url, {"genre": "Drama"})
+        count_writes = [call for call in cache_set.call_args_list if ":count:" in call.args[0]]
+        self.assertEqual(count_writes, [])
+
+    def test_short_page_counts_without_count_query(self):
+        with CaptureQueriesContext(connection) as captured:
+            res = self.auth_client.get(self.list_url, {"genre": "Comedy", "page": 2})
+        # The short page fixes the count: 10 rows before it + 3 on it
+        self.assertEqual(self._count_queries(captured), 0)
+        self.assertEqual((res.data["count"], res.data["count_estimated"]), (13, False))
+
+    @override_settings(MOVIES_EXACT_COUNT_THRESHOLD=0)
+    def test_count_query_param_forces_exact_count(self):
+        res = self.auth_client.get(self.list_url, {"count": "true"})
+        self.assertEqual((res.data["count"], res.data["count_estimated"]), (25, False))
+        # The exact count is cached for the next pages
+        with CaptureQueriesContext(connection) as captured:
+            res = self.auth_client.get(self.list_url, {"page": 2})
+        self.assertEqual(self._count_queries(captured), 0)
+        self.assertEqual((res.data["count"], res.data["count_estimated"]), (25, False))
+
+    @skipUnless(connection.vendor == "postgresql", "Counts are only estimated on PostgreSQL")
+    @override_settings(MOVIES_EXACT_COUNT_THRESHOLD=0)
+    def test_large_results_use_the_planner_estimate(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE movies_movie")
+        with CaptureQueriesContext(connection) as captured:
+            res = self.auth_client.get(self.list_url)
+        self.assertEqual(self._count_queries(captured), 0)
+        self.assertEqual((res.data["count"], res.data["count_estimated"]), (25, True))
+        self.assertIsNotNone(res.data["next"])
+
+    def test_paginator_corrects_a_wrong_count(self):
+        movies = list(range(25))
+        paginator = CountedPaginator(movies, 10, 5)
+        page = paginator.page(1)
+        self.assertTrue(page.has_next())
+        self.assertFalse(paginator.exact)
+        self.assertEqual(paginator.count, 11)
+
+        paginator = CountedPaginator(movies, 10, 1000)
+        page = paginator.page(3)
+        self.assertEqual(list(page), [20, 21, 22, 23, 24])
+        self.assertFalse(page.has_next())
+        self.assertEqual((paginator.count, paginator.exact), (25, True))
@@ -1,8 +1,15 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path
+from . import async_views
 from .views import MovieApiCreate
 
 router = DefaultRouter()
 router.register(r"movies", MovieApiCreate, basename="movie")
 
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = router.urls
+
+# Async (ASGI) read endpoints: /api/async/movies/
+async_urlpatterns = [
+    path("movies/", async_views.movie_list, name="async-movie-list"),
+    path("movies/<int:pk>/", async_views.movie_detail, name="async-movie-detail"),
+]
@@ -1,15 +1,38 @@
 from .models import Movie
-from .serializer import MovieSerializer
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.decorators import api_view, permission_classes
-from django.http import HttpResponse
-from django.db.models import Q
-
-class MovieApiCreate(viewsets.ModelViewSet):
+from backend.instrumentation import InstrumentedViewMixin
+from .filters import filter_movies
+from django.conf import settings
+from .serializer import MovieReadSerializer, MovieSerializer
+from .pagination import MovieCountPagination, MovieKeysetPagination
+from .autocomplete import suggest_movies
+from .cache import CachedResponseMixin, movie_response_cache
+from .conditional import ConditionalGetMixin
+from .bulk import bulk_delete, bulk_upsert, get_max_body_size, get_max_items
+from .export import EXPORT_FORMATS, accepts_gzip, export_movies
+from .facets import facet_summary
+from .analytics import GROUP_BY_FIELDS, catalog_analytics
+from .similar import FEATURE_FIELDS, similar_movie_index
+from .parsers import NDJSONParser
+from rest_framework import status, viewsets
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.response import Response
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+
+class MovieApiCreate(InstrumentedViewMixin, CachedResponseMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint to create, delete, and list movies.
-    Allows filtering movies by genre and rating.
+    Allows filtering movies by genre, rating, actor and director, and
+    full-text search with ?search=.
+    Title/director suggestions are served by the autocomplete action,
+    batches of movies are written through the bulk action and the whole
+    filtered catalog is streamed by the export action.
+    List and detail responses are served from the versioned response cache
+    and support conditional GETs (ETag / Last-Modified, 304 Not Modified).
+    List pages report a cached or estimated count (MovieCountPagination).
+    Reads fetch values() rows rendered by MovieReadSerializer.
     arguments:
     self -- instance of the view
     returns: queryset of movies
@@ -17,6 +40,42 @@ class MovieApiCreate(viewsets.ModelViewSet):
 
     serializer_class = MovieSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = MovieCountPagination
+
+    def get_parser_context(self, http_request):
+        # Lets the NDJSON parser of the bulk action stop past the item limit
+        context = super().get_parser_context(http_request)
+        context["max_items"] = get_max_items()
+        return context
+
+    @property
+    def paginator(self):
+        """
+        Selects the paginator for the current request.
+        Clients opt into keyset pagination with ?pagination=cursor (or by
+        following a cursor link), otherwise the view's pagination_class
+        (MovieCountPagination) is used.
+        """
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            if params.get("pagination") == "cursor" or MovieKeysetPagination.cursor_query_param in params:
+                self._paginator = MovieKeysetPagination()
+        return super().paginator
+
+    def use_fast_read(self):
+        """
+        Whether this request is a plain read served through MovieReadSerializer.
+        """
+        return (
+            self.action in ("list", "retrieve")
+            and self.request.method in ("GET", "HEAD")
+            and getattr(settings, "MOVIES_FAST_READ_SERIALIZER", True)
+        )
+
+    def get_serializer_class(self):
+        if self.use_fast_read():
+            return MovieReadSerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
         """
@@ -27,21 +86,187 @@ class MovieApiCreate(viewsets.ModelViewSet):
         returns: filtered queryset
         """
 
-        query = Q()  # Start with an empty query
+        queryset = filter_movies(self.request.query_params)
 
-        param_genre = self.request.query_params.get("genre", None)
-        if param_genre is not None:
-            query &= Q(genre=param_genre)
+        if self.use_fast_read():
+            queryset = queryset.values(*MovieReadSerializer.sources())
 
-        param_rating = self.request.query_params.get("rating", None)
-        if param_rating is not None:
-            try:
-                rating = float(param_rating)
-                query &= Q(rating__gte=rating)
-            except ValueError:
-                pass  # Ignore invalid rating filter
-
-        # Ensure global alphabetical ordering across pagination
-        queryset = Movie.objects.all().filter(query).order_by('title')
         return queryset
 
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        """
+        Typeahead suggestions. GET /api/movies/autocomplete/?q=<text>&limit=<n>
+        Skips the queryset filters, pagination and MovieSerializer and only
+        returns id, title and director.
+        arguments:
+        request -- HttpRequest object
+        returns: list of suggestions
+        """
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 25)
+        except ValueError:
+            limit = 10
+        return Response(suggest_movies(request.query_params.get("q", ""), limit))
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        """
+        Filter sidebar counts. GET /api/movies/facets/?genre=<genre>
+        Read from the precomputed MovieFacet summary table instead of a
+        GROUP BY over the movies.
+        arguments:
+        request -- HttpRequest object
+        returns: total, movies per genre and rating histogram (of the genre, if given)
+        """
+        return Response(facet_summary(request.query_params.get("genre") or None))
+
+    @action(detail=False, methods=["get"])
+    def analytics(self, request):
+        """
+        Catalog analytics. GET /api/movies/analytics/?group_by=genre|year|director
+        Returns count and average/min/max rating per group, or with ?top=<k>
+        the k best rated movies per group (overall with group_by=none).
+        Optional filters: genre, director, year_from, year_to, min_rating, max_rating.
+        Answered from the in-process columnar copy of the catalog.
+        arguments:
+        request -- HttpRequest object
+        returns: list of groups
+        """
+        params = request.query_params
+        group_by = params.get("group_by", "genre")
+        if group_by not in GROUP_BY_FIELDS + ("none",):
+            return Response({"error": f"group_by must be one of {', '.join(GROUP_BY_FIELDS)} or none"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {}
+        try:
+            for name, convert in (("year_from", int), ("year_to", int), ("min_rating", float), ("max_rating", float),
+                                  ("top", int)):
+                if params.get(name) not in (None, ""):
+                    filters[name] = convert(params[name])
+        except ValueError:
+            return Response({"error": f"Invalid value for {name}"}, status=status.HTTP_400_BAD_REQUEST)
+        for name in ("genre", "director"):
+            if params.get(name):
+                filters[name] = params[name]
+
+        top = filters.pop("top", None)
+        if top is not None:
+            top = min(max(top, 1), 100)
+            return Response(catalog_analytics.top_k(top, None if group_by == "none" else group_by, **filters))
+        if group_by == "none":
+            return Response({"error": "group_by=none requires top"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(catalog_analytics.group_by(group_by, **filters))
+
+    @action(detail=True, methods=["get"])
+    def similar(self, request, pk=None):
+        """
+        Content-based recommendations. GET /api/movies/{id}/similar/?limit=<n>
+        Nearest neighbours of the movie in the precomputed similarity index
+        (genre, director, cast, year, rating and description).
+        arguments:
+        request -- HttpRequest object
+        pk -- id of the movie
+        returns: list of movies with their similarity score, best first
+        """
+        if not similar_movie_index.available():
+            return Response({"error": "The similar movies index has not been built"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 50)
+        except ValueError:
+            limit = 10
+
+        movie = self.get_object()
+        row = {field: getattr(movie, field) for field in FEATURE_FIELDS}
+        # A few spare neighbours cover movies deleted since the index was built
+        neighbours = similar_movie_index.similar(row, limit + 5)
+        rows = Movie.objects.filter(id__in=[pk for pk, _ in neighbours]).values(*MovieReadSerializer.sources())
+        by_id = {row["id"]: row for row in rows}
+        results = []
+        for neighbour_id, score in neighbours:
+            if neighbour_id in by_id and len(results) < limit:
+                results.append({**MovieReadSerializer.to_representation(by_id[neighbour_id]), "similarity": round(score, 4)})
+        return Response(results)
+
+    @action(detail=False, methods=["get"], url_path="cache-stats", permission_classes=[IsAdminUser])
+    def cache_stats(self, request):
+        """
+        Response cache counters of this worker. GET /api/movies/cache-stats/
+        arguments:
+        request -- HttpRequest object
+        returns: hits, misses, hit ratio and current catalog version
+        """
+        return Response(movie_response_cache.stats())
+
+    @action(detail=False, methods=["post", "delete"], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """
+        Bulk writes. POST /api/movies/bulk/ upserts a JSON array (or NDJSON
+        stream) of movies keyed by (title, release_date); DELETE
+        /api/movies/bulk/ removes {"ids": [...]}. Everything runs in one
+        transaction and the response carries one result per item.
+        Bodies over MOVIES_BULK_MAX_BODY_SIZE are refused (413) before they
+        are parsed, and an NDJSON stream stops parsing past the item limit.
+        arguments:
+        request -- HttpRequest object
+        returns: summary counts and per-item results
+        """
+        max_items = get_max_items()
+        max_body_size = get_max_body_size()
+        try:
+            content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > max_body_size:
+            return Response({"error": f"Request body larger than {max_body_size} bytes"},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        if request.method == "DELETE":
+            ids = request.data.get("ids") if isinstance(request.data, dict) else None
+            if not isinstance(ids, list) or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+                return Response({"error": "A list of integer ids is required"}, status=status.HTTP_400_BAD_REQUEST)
+            if len(ids) > max_items:
+                return Response({"error": f"At most {max_items} ids per request"}, status=status.HTTP_400_BAD_REQUEST)
+            results = bulk_delete(ids)
+            deleted = sum(1 for result in results if result["status"] == "deleted")
+            return Response({"deleted": deleted, "not_found": len(results) - deleted, "results": results})
+
+        items = request.data
+        if not isinstance(items, list):
+            return Response({"error": "A list of movies is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > max_items:
+            return Response({"error": f"At most {max_items} movies per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = bulk_upsert(items)
+        summary = {"created": 0, "updated": 0, "superseded": 0, "invalid": 0}
+        for result in results:
+            summary[result["status"]] += 1
+        summary["results"] = results
+        return Response(summary, status=status.HTTP_207_MULTI_STATUS if summary["invalid"] else status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Streams the filtered catalog. GET /api/movies/export/?as=ndjson|csv
+        Takes the same genre/rating/search filters as the list, without
+        pagination; the body is gzip-encoded when the client accepts it.
+        arguments:
+        request -- HttpRequest object
+        returns: StreamingHttpResponse with one line per movie
+        """
+        fmt = request.query_params.get("as", "ndjson")
+        if fmt not in EXPORT_FORMATS:
+            return Response({"error": f"Unsupported export format '{fmt}'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        compress = accepts_gzip(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        response = StreamingHttpResponse(
+            export_movies(self.get_queryset(), fmt, gzip=compress),
+            content_type=f"{EXPORT_FORMATS[fmt]}; charset=utf-8",
+        )
+        response["Content-Disposition"] = f'attachment; filename="movies.{fmt}"'
+        if compress:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
@@ -0,0 +1,138 @@
+"""
+JWT authentication without a user query per request.
+
+JWTAuthentication loads the User row on every authenticated request.
+CachedJWTAuthentication resolves users through a short-TTL in-process LRU
+cache instead, evicted when a user is saved or deleted (which covers
+password and is_active changes). With USERS_AUTH_STATELESS_READS on, safe
+(read-only) requests do not look the user up at all: the signed token
+claims are trusted and request.user is a TokenUser.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserCache:
+    """
+    Thread-safe LRU cache of active users by id, entries expiring after
+    USERS_AUTH_CACHE_TTL seconds. The TTL bounds how long another process'
+    writes (which cannot evict this process' entries) stay unseen.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def ttl(self):
+        return getattr(settings, "USERS_AUTH_CACHE_TTL", 60)
+
+    @property
+    def max_size(self):
+        return getattr(settings, "USERS_AUTH_CACHE_SIZE", 10000)
+
+    def get(self, user_id):
+        """
+        Returns a copy of the cached user, or None when missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            user = entry[1]
+        # Each request gets its own instance: views may modify request.user
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, copy.copy(user))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id=None):
+        """
+        Evicts one user, or every user when user_id is None.
+        """
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication resolving users through user_cache, and through the
+    token claims alone for safe requests when USERS_AUTH_STATELESS_READS is on.
+    """
+
+    read_only = False
+
+    def authenticate(self, request):
+        self.read_only = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    @property
+    def stateless(self):
+        return self.read_only and getattr(settings, "USERS_AUTH_STATELESS_READS", False)
+
+    def get_user(self, validated_token):
+        """
+        Returns the user of the validated token, from the cache when possible.
+        arguments:
+        validated_token -- token returned by get_validated_token
+        returns: user instance (TokenUser for stateless reads)
+        """
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        if self.stateless:
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+
+        user = self.get_cached_user(validated_token)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(validated_token[api_settings.USER_ID_CLAIM], user)
+        return user
+
+    def get_cached_user(self, validated_token):
+        """
+        Returns the cached user of the token after the same checks as
+        JWTAuthentication.get_user, or None when it is not cached.
+        """
+        user = user_cache.get(validated_token[api_settings.USER_ID_CLAIM])
+        if user is None:
+            return None
+        # Inactive users are never cached; the revocation claim differs per token
+        if api_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+        ):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
@@ -0,0 +1,184 @@
+"""
+Refresh token blacklist.
+
+Blacklisted jtis live in the BlacklistedToken table (primary key lookup).
+Each process keeps a Bloom filter of them in front of the table: a token
+the filter has never seen is not blacklisted, so checking a legitimate
+refresh token costs no query, and only filter hits (blacklisted tokens or
+rare false positives) are confirmed in the table.
+
+The filter learns rows blacklisted by other processes every
+USERS_TOKEN_BLACKLIST_SYNC_INTERVAL seconds. That lag cannot let a rotated
+token be used twice: blacklisting is an INSERT on the primary key, and a
+refresh whose token is already there fails.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import BlacklistedToken
+
+# Rows blacklisted up to this long before the previous sync are read again,
+# covering transactions that committed after it
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class BloomFilter:
+    """
+    Bloom filter over strings with double hashing of a blake2b digest.
+    Sized for `capacity` items at a false positive rate of `error_rate`.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    @staticmethod
+    def _digest(item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+    def _positions(self, item):
+        h1, h2 = self._digest(item)
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, items):
+        """
+        Adds many items at once, setting the bits with vectorized operations.
+        """
+        digests = np.array([self._digest(item) for item in items], dtype=np.uint64).reshape(-1, 2)
+        if not len(digests):
+            return
+        steps = np.arange(self.hashes, dtype=np.uint64)
+        # Same positions as _positions(), with both terms reduced modulo the
+        # size first so the uint64 arithmetic cannot overflow
+        size = np.uint64(self.size)
+        h1, h2 = digests[:, :1] % size, digests[:, 1:] % size
+        positions = ((h1 + (steps * h2) % size) % size).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3), (1 << (positions & np.uint64(7))).astype(np.uint8))
+        self.count += len(digests)
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class TokenBlacklist:
+    """
+    Process-wide blacklist: the BlacklistedToken table behind a Bloom filter.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._watermark = None
+        self._synced_at = 0.0
+
+    @property
+    def capacity(self):
+        return getattr(settings, "USERS_TOKEN_BLACKLIST_BLOOM_CAPACITY", 1000000)
+
+    @property
+    def error_rate(self):
+        return getattr(settings, "USERS_TOKEN_BLACKLIST_BLOOM_ERROR_RATE", 0.001)
+
+    @property
+    def sync_interval(self):
+        return getattr(settings, "USERS_TOKEN_BLACKLIST_SYNC_INTERVAL", 5)
+
+    def invalidate(self):
+        """
+        Drops the filter; the next check loads it again from the table.
+        """
+        with self._lock:
+            self._filter = None
+
+    def _load(self):
+        now = timezone.now()
+        jtis = list(
+            BlacklistedToken.objects.filter(expires_at__gt=now).values_list("jti", flat=True).iterator(chunk_size=10000)
+        )
+        bloom = BloomFilter(max(self.capacity, 2 * len(jtis)), self.error_rate)
+        bloom.update(jtis)
+        self._filter, self._watermark, self._synced_at = bloom, now, time.monotonic()
+
+    def _sync(self):
+        since, now = self._watermark - SYNC_OVERLAP, timezone.now()
+        jtis = list(BlacklistedToken.objects.filter(blacklisted_at__gte=since).values_list("jti", flat=True))
+        self._filter.update(jti for jti in jtis if jti not in self._filter)
+        self._watermark, self._synced_at = now, time.monotonic()
+        if self._filter.count > self._filter.capacity:
+            # Past its capacity the false positive rate climbs: rebuild from
+            # the unexpired rows only (expired ones are never looked up)
+            self._load()
+
+    def bloom(self):
+        """
+        Returns the filter, loading or syncing it first when due.
+        """
+        with self._lock:
+            if self._filter is None:
+                self._load()
+            elif time.monotonic() - self._synced_at > self.sync_interval:
+                self._sync()
+            return self._filter
+
+    def contains(self, jti):
+        """
+        Whether the jti is blacklisted. Only filter hits query the table.
+        """
+        if jti not in self.bloom():
+            return False
+        return BlacklistedToken.objects.filter(pk=jti).exists()
+
+    def add(self, jti, expires_at):
+        """
+        Blacklists the jti.
+        returns: False when it was blacklisted already
+        """
+        try:
+            with transaction.atomic():
+                BlacklistedToken.objects.create(jti=jti, expires_at=expires_at)
+            created = True
+        except IntegrityError:
+            created = False
+        bloom = self.bloom()
+        if jti not in bloom:
+            bloom.add(jti)
+        return created
+
+    def compact(self, batch_size=5000, pause=0.0):
+        """
+        Deletes expired rows in batches, each its own short transaction, so
+        no lock is held for long on a large table.
+        returns: number of rows deleted
+        """
+        deleted = 0
+        now = timezone.now()
+        while True:
+            batch = list(BlacklistedToken.objects.filter(expires_at__lte=now).values_list("pk", flat=True)[:batch_size])
+            if not batch:
+                return deleted
+            deleted += BlacklistedToken.objects.filter(pk__in=batch).delete()[0]
+            if pause:
+                time.sleep(pause)
+
+
+token_blacklist = TokenBlacklist()
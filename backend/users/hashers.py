@@ -0,0 +1,32 @@
+"""
+Password hashers with work factors taken from settings.
+
+USERS_PASSWORD_HASHER_PARAMS maps a hasher algorithm to the attributes
+to override, e.g. {"argon2": {"time_cost": 2, "memory_cost": 65536}} or
+{"pbkdf2_sha256": {"iterations": 720000}}. Stored hashes made with other
+parameters are upgraded on the next successful login.
+"""
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class TunableHasherMixin:
+    def __init__(self):
+        params = getattr(settings, "USERS_PASSWORD_HASHER_PARAMS", {}).get(self.algorithm, {})
+        for name, value in params.items():
+            if not hasattr(self, name):
+                raise ValueError(f"{type(self).__name__} has no parameter '{name}'")
+            setattr(self, name, value)
+
+
+class PBKDF2PasswordHasher(TunableHasherMixin, hashers.PBKDF2PasswordHasher):
+    pass
+
+
+class ScryptPasswordHasher(TunableHasherMixin, hashers.ScryptPasswordHasher):
+    pass
+
+
+class Argon2PasswordHasher(TunableHasherMixin, hashers.Argon2PasswordHasher):
+    pass
@@ -0,0 +1,122 @@
+"""
+Password hashing off the request threads.
+
+Password hashes are deliberately slow. A login burst (e.g. every client
+logging in again after a deploy) would otherwise hash on every request
+thread at once, oversubscribing the CPUs and stalling all other requests.
+PooledModelBackend runs the hashing in a process-wide pool of
+USERS_PASSWORD_HASH_WORKERS threads: at most that many hashes run at once
+(hashlib and argon2 release the GIL while hashing), and logins beyond
+USERS_PASSWORD_HASH_MAX_PENDING waiting ones are refused right away with
+503 instead of queueing. Database access stays on the request thread.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class LoginBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("Too many logins in progress, try again shortly.")
+    default_code = "login_busy"
+
+
+class PasswordHashingPool:
+    """
+    Bounded thread pool for password hashing, created on first use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    @property
+    def workers(self):
+        workers = getattr(settings, "USERS_PASSWORD_HASH_WORKERS", None)
+        return (os.cpu_count() or 1) if workers is None else workers
+
+    @property
+    def max_pending(self):
+        max_pending = getattr(settings, "USERS_PASSWORD_HASH_MAX_PENDING", None)
+        return self.workers * 8 if max_pending is None else max_pending
+
+    def _start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="password-hashing")
+                self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+            return self._executor, self._slots
+
+    def run(self, func, *args):
+        """
+        Calls func(*args) on a pool thread and returns its result.
+        Runs inline when the pool is disabled (0 workers).
+        Raises LoginBusy when the pool and its queue are full.
+        """
+        if self.workers <= 0:
+            return func(*args)
+        executor, slots = self._start()
+        if not slots.acquire(blocking=False):
+            raise LoginBusy()
+        try:
+            return executor.submit(func, *args).result()
+        finally:
+            slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+            self._executor = self._slots = None
+
+
+password_hashing_pool = PasswordHashingPool()
+
+
+def _verify(password, encoded):
+    """
+    Checks the password; returns (is_correct, new encoded password or None
+    when the stored hash is already up to date with the preferred hasher).
+    """
+    upgraded = []
+    is_correct = check_password(password, encoded, lambda raw: upgraded.append(make_password(raw)))
+    return is_correct, upgraded[0] if upgraded else None
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend hashing in password_hashing_pool. Stored hashes made with
+    another hasher or work factor than the preferred (first) one in
+    PASSWORD_HASHERS are upgraded on a successful login.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash once anyway: nonexistent users take as long as wrong passwords
+            password_hashing_pool.run(make_password, password)
+            return None
+
+        is_correct, upgraded = password_hashing_pool.run(_verify, password, user.password)
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+        if upgraded is not None:
+            user.password = upgraded
+            user.save(update_fields=["password"])
+        return user
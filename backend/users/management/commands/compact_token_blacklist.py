@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from users.blacklist import token_blacklist
+
+
+class Command(BaseCommand):
+    help = "Delete blacklisted refresh tokens that have expired, in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows deleted per transaction")
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        deleted = token_blacklist.compact(options["batch_size"], options["pause"])
+        self.stdout.write(self.style.SUCCESS(f"Expired blacklisted tokens deleted: {deleted}."))
@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from users.provisioning import get_processes, provision_users
+
+
+class Command(BaseCommand):
+    help = "Create users in bulk from a CSV (with a header row) or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or NDJSON file with username, email, password[, first_name, last_name]")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="Input format; guessed from the extension by default")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Users validated, hashed and inserted together")
+        parser.add_argument("--processes", type=int, help="Password hashing processes (default: USERS_PROVISION_PROCESSES)")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("csv" if path.endswith(".csv") else "ndjson" if path.endswith((".ndjson", ".jsonl")) else None)
+        if fmt is None:
+            raise CommandError(f"Cannot guess the format of {path}; use --format.")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+        processes = options["processes"] if options["processes"] is not None else get_processes()
+
+        started = time.monotonic()
+        totals = {"created": 0, "exists": 0, "invalid": 0}
+        offset = 0
+        with io.open(path, "r", encoding="utf-8", newline="") as handle:
+            if fmt == "csv":
+                # Short rows give None for the missing columns: leave them out
+                records = ({k: v for k, v in row.items() if k and v is not None} for row in csv.DictReader(handle))
+            else:
+                records = (self._parse(line) for line in handle if line.strip())
+            chunk = []
+            for record in records:
+                chunk.append(record)
+                if len(chunk) == options["chunk_size"]:
+                    offset = self._provision(chunk, offset, processes, totals)
+                    chunk = []
+            if chunk:
+                self._provision(chunk, offset, processes, totals)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Provisioning done. Created: {totals['created']}, existing: {totals['exists']}, "
+            f"invalid: {totals['invalid']}, {elapsed:.1f}s ({totals['created'] / max(elapsed, 1e-9):.0f} users/s, "
+            f"{processes} processes)"
+        ))
+
+    def _parse(self, line):
+        # Unparseable lines are reported as invalid records
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError:
+            return None
+
+    def _provision(self, chunk, offset, processes, totals):
+        for result in provision_users(chunk, processes, len(chunk)):
+            totals[result["status"]] += 1
+            if result["status"] == "invalid":
+                self.stderr.write(f"Record {offset + result['index'] + 1}: {json.dumps(result['errors'])}")
+        return offset + len(chunk)
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.27 on 2026-10-18 17:01
+
+from django.db import IntegrityError, migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+import django.db.models.functions.text
+
+# Colliding emails listed in the error before it is cut short
+MAX_REPORTED_DUPLICATES = 20
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """
+    Stops the migration with the list of colliding accounts when existing
+    users share an email that differs only in case (e.g. A@x.com and
+    a@x.com, which the old case-sensitive check allowed): which account
+    keeps the address is for the operator to decide, not the migration.
+    """
+    User = apps.get_model("users", "User")
+    users = User.objects.using(schema_editor.connection.alias).exclude(email="").annotate(email_lower=Lower("email"))
+    duplicates = list(
+        users.values("email_lower").annotate(rows=Count("id")).filter(rows__gt=1)
+        .order_by("email_lower").values_list("email_lower", flat=True)
+    )
+    if not duplicates:
+        return
+    reported = duplicates[:MAX_REPORTED_DUPLICATES]
+    accounts = {}
+    for email_lower, username in (
+        users.filter(email_lower__in=reported).order_by("id").values_list("email_lower", "username")
+    ):
+        accounts.setdefault(email_lower, []).append(username)
+    lines = [f"  {email}: {', '.join(accounts[email])}" for email in reported]
+    if len(duplicates) > MAX_REPORTED_DUPLICATES:
+        lines.append(f"  ... and {len(duplicates) - MAX_REPORTED_DUPLICATES} more")
+    raise IntegrityError(
+        f"Cannot add users_user_email_ci_unique: {len(duplicates)} emails are used, ignoring case, by more "
+        "than one user. Change or clear the email of the extra accounts, then run the migration again.\n"
+        + "\n".join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_blacklistedtoken'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='users_user_email_ci_unique'),
+        ),
+    ]
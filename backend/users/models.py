@@ -1,4 +1,9 @@
 from django.contrib.auth.models import AbstractUser
+from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+EMAIL_UNIQUE_CONSTRAINT = "users_user_email_ci_unique"
 
 class User(AbstractUser):
     """
@@ -11,5 +16,29 @@ class User(AbstractUser):
         last_name (str): The last name of the user.
     """
 
+    class Meta(AbstractUser.Meta):
+        # Emails are unique regardless of case; users without one are not constrained
+        constraints = [
+            models.UniqueConstraint(Lower("email"), condition=~Q(email=""), name=EMAIL_UNIQUE_CONSTRAINT),
+        ]
+
+    def __str__(self):
+        return self.username
+
+class BlacklistedToken(models.Model):
+    """
+    Refresh token that can no longer be used, keyed by its jti claim.
+    Rows are only needed until the token expires; `manage.py
+    compact_token_blacklist` deletes expired ones.
+    Attributes:
+        jti (str): Unique id of the token.
+        expires_at (datetime): Expiry of the token.
+        blacklisted_at (datetime): When it was blacklisted.
+    """
+
+    jti = models.CharField(max_length=255, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+    blacklisted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return self.jti
@@ -0,0 +1,209 @@
+"""
+Bulk user provisioning.
+
+Items are validated without touching the database, conflicts with existing
+users are found with two queries per batch, passwords are hashed in a pool
+of worker processes (hashing is CPU bound, one core per process) and the
+users are written with bulk_create in chunks.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from rest_framework import serializers
+
+from .models import User
+
+
+class UserProvisionSerializer(serializers.Serializer):
+    """
+    One provisioned user. Uniqueness is checked per batch, not per item.
+    """
+
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField(max_length=254)
+    password = serializers.CharField(min_length=6, max_length=4096)
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default="")
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default="")
+
+
+def get_processes():
+    processes = getattr(settings, "USERS_PROVISION_PROCESSES", None)
+    return (os.cpu_count() or 1) if processes is None else processes
+
+
+class HashingProcessPool:
+    """
+    Lazily started, reused pool of spawned processes hashing passwords.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._processes = None
+
+    def map(self, passwords, processes):
+        with self._lock:
+            if self._executor is None or self._processes != processes:
+                self._shutdown()
+                # Spawned, as forking a threaded server is unsafe. The workers
+                # only import django and the hashers, so they set Django up
+                # before anything else is unpickled
+                self._executor = ProcessPoolExecutor(
+                    processes, mp_context=multiprocessing.get_context("spawn"), initializer=django.setup
+                )
+                self._processes = processes
+            executor = self._executor
+        chunksize = max(1, len(passwords) // (processes * 4))
+        try:
+            return list(executor.map(make_password, passwords, chunksize=chunksize))
+        except BrokenProcessPool:
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    def shutdown(self):
+        with self._lock:
+            self._shutdown()
+
+
+hashing_process_pool = HashingProcessPool()
+
+
+def hash_passwords(passwords, processes=None):
+    """
+    Hashes the passwords with the preferred hasher, in worker processes
+    when there is more than one password per process to hash.
+    returns: list of encoded passwords, in order
+    """
+    processes = get_processes() if processes is None else processes
+    if processes <= 1 or len(passwords) < 2 * processes:
+        return [make_password(password) for password in passwords]
+    return hashing_process_pool.map(passwords, processes)
+
+
+def validate_users(items):
+    """
+    Validates raw user dicts and flags usernames/emails repeated in the batch.
+    returns: (valid, results) where valid is a list of (index, validated_data)
+             and results holds the per-item error entries
+    """
+    child = UserProvisionSerializer()
+    valid, results = [], []
+    usernames, emails = set(), set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append({"index": index, "status": "invalid", "errors": {"non_field_errors": ["Expected an object."]}})
+            continue
+        try:
+            data = child.run_validation(item)
+        except serializers.ValidationError as exc:
+            results.append({"index": index, "status": "invalid", "errors": exc.detail})
+            continue
+        data["username"] = User.normalize_username(data["username"])
+        errors = {}
+        if data["username"] in usernames:
+            errors["username"] = ["Repeated in this batch."]
+        if data["email"].lower() in emails:
+            errors["email"] = ["Repeated in this batch."]
+        if errors:
+            results.append({"index": index, "status": "invalid", "errors": errors})
+            continue
+        usernames.add(data["username"])
+        emails.add(data["email"].lower())
+        valid.append((index, data))
+    return valid, results
+
+
+def _existing(validated):
+    """
+    Returns the usernames and lowercased emails of the batch already taken,
+    with one query each. The email lookup repeats the email <> '' predicate
+    of the partial LOWER(email) unique index so PostgreSQL can use it.
+    """
+    usernames = set(
+        User.objects.filter(username__in=[data["username"] for _, data in validated]).values_list("username", flat=True)
+    )
+    emails = set(
+        User.objects.exclude(email="")
+        .annotate(email_lower=Lower("email"))
+        .filter(email_lower__in=[data["email"].lower() for _, data in validated])
+        .values_list("email_lower", flat=True)
+    )
+    return usernames, emails
+
+
+def _insert(pending):
+    """
+    Inserts (index, user) pairs with one bulk_create. If a concurrent write
+    took a username or email in the meantime, falls back to one savepoint
+    per row to find out which.
+    returns: per-item results
+    """
+    try:
+        with transaction.atomic():
+            created = User.objects.bulk_create([user for _, user in pending])
+        return [{"index": index, "status": "created", "id": user.pk} for (index, _), user in zip(pending, created)]
+    except IntegrityError:
+        results = []
+        for index, user in pending:
+            try:
+                with transaction.atomic():
+                    user.save(force_insert=True)
+                results.append({"index": index, "status": "created", "id": user.pk})
+            except IntegrityError:
+                results.append({"index": index, "status": "exists"})
+        return results
+
+
+def provision_users(items, processes=None, chunk_size=1000):
+    """
+    Creates users in bulk. Users whose username or email is taken are
+    reported as existing and left untouched.
+    arguments:
+    items -- dicts with username, email, password and optional first/last name
+    processes -- password hashing processes (USERS_PROVISION_PROCESSES by default)
+    chunk_size -- users per INSERT
+    returns: per-item results ordered by index
+    """
+    validated, results = validate_users(items)
+    if not validated:
+        return sorted(results, key=lambda result: result["index"])
+
+    taken_usernames, taken_emails = _existing(validated)
+    pending = []
+    for index, data in validated:
+        if data["username"] in taken_usernames or data["email"].lower() in taken_emails:
+            results.append({"index": index, "status": "exists"})
+        else:
+            pending.append((index, data))
+
+    hashed = hash_passwords([data["password"] for _, data in pending], processes)
+    users = [
+        (index, User(
+            username=data["username"],
+            email=User.objects.normalize_email(data["email"]),
+            first_name=data["first_name"],
+            last_name=data["last_name"],
+            password=password,
+        ))
+        for (index, data), password in zip(pending, hashed)
+    ]
+    for start in range(0, len(users), chunk_size):
+        results += _insert(users[start:start + chunk_size])
+    return sorted(results, key=lambda result: result["index"])
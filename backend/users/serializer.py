@@ -1,9 +1,30 @@
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 from django.contrib.auth.hashers import make_password
-from .models import User
+from rest_framework_simplejwt import serializers as jwt_serializers
+from .models import EMAIL_UNIQUE_CONSTRAINT, User
+from .tokens import RefreshToken
 from django.utils.translation import gettext_lazy as _
 
+@contextmanager
+def unique_email():
+    """
+    Turns a violation of the email unique index inside the block into a
+    ValidationError on the email field. The block runs in a savepoint so
+    an enclosing transaction stays usable.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        if EMAIL_UNIQUE_CONSTRAINT not in str(exc):
+            raise
+        raise serializers.ValidationError({"email": [_("Este email ya está registrado.")]})
+
+
 class UserRegisterSerializer(ModelSerializer):
     """
     Serializer for registering a new user.
@@ -23,21 +44,11 @@ class UserRegisterSerializer(ModelSerializer):
             "date_joined": {"read_only": True}  # Read-only
         }
 
-    def validate_email(self, value):
-        """
-        Validates that the email is not already registered
-        arguments:
-        value -- email to validate
-        returns: email if valid
-        """
-        user_id = self.instance.id if self.instance else None
-        if User.objects.filter(email=value).exclude(id=user_id).exists():
-            raise serializers.ValidationError(_("Este email ya está registrado."))
-        return value
-
     def create(self, validated_data):
         """
-        Creates a new user with the hashed password
+        Creates a new user with the hashed password.
+        Email uniqueness is enforced by the case-insensitive unique index
+        rather than a lookup beforehand, so concurrent signups cannot race.
 
         arguments:
         validated_data -- validated data from the serializer
@@ -48,5 +59,25 @@ class UserRegisterSerializer(ModelSerializer):
         validated_data.pop('user_permissions', None)
         
         password = validated_data.pop('password')
-        user = User.objects.create_user(password=password, **validated_data)
-        return user
\ No newline at end of file
+        with unique_email():
+            user = User.objects.create_user(password=password, **validated_data)
+        return user
+
+    def update(self, instance, validated_data):
+        """
+        Updates the user; a taken email is reported like on registration.
+        arguments:
+        instance -- user being updated
+        validated_data -- validated data from the serializer
+        returns: instance of the updated user
+        """
+        with unique_email():
+            return super().update(instance, validated_data)
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """
+    Token refresh checking and rotating tokens through the users token blacklist.
+    """
+
+    token_class = RefreshToken
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """
+    Evicts a saved (e.g. password or is_active changed) or deleted user
+    from the authentication cache.
+    """
+    user_cache.invalidate(instance.pk)
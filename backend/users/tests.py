@@ -1,7 +1,30 @@
+import io
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from backend.instrumentation import metrics
+from users.authentication import user_cache
+from users.blacklist import BloomFilter, token_blacklist
+from users.hashing import LoginBusy, PasswordHashingPool, PooledModelBackend
+from users.provisioning import hash_passwords, hashing_process_pool
+from users.throttling import login_throttle_cache
+
+from users.models import BlacklistedToken
 
 User = get_user_model()
 
@@ -118,4 +141,349 @@ class UsersAPITests(APITestCase):
             # sin password
         }, format="json")
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn("password", res.data)
\ No newline at end of file
+        self.assertIn("password", res.data)
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        user_cache.invalidate()
+        self.user = User.objects.create_user(username="tester", password="secret123", email="tester@example.com")
+        res = self.client.post("/api/auth/login/", {"username": "tester", "password": "secret123"}, format="json")
+        self.auth = APIClient()
+        self.auth.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        self.url = reverse("movie-list")
+
+    def _user_queries(self, method="get", url=None, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            res = getattr(self.auth, method)(url or self.url, **kwargs)
+        return res, [q["sql"] for q in queries if '"users_user"' in q["sql"]]
+
+    def test_user_loaded_once_then_cached(self):
+        res, queries = self._user_queries()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        res, queries = self._user_queries()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+
+    def test_save_evicts_user(self):
+        self._user_queries()
+        self.user.is_active = False
+        self.user.save()
+        res, queries = self._user_queries()
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(len(queries), 1)
+
+    def test_password_change_evicts_user(self):
+        self._user_queries()
+        self.user.set_password("another456")
+        self.user.save()
+        _, queries = self._user_queries()
+        self.assertEqual(len(queries), 1)
+
+    def test_delete_evicts_user(self):
+        self._user_queries()
+        self.user.delete()
+        res, _ = self._user_queries()
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(USERS_AUTH_CACHE_TTL=0)
+    def test_zero_ttl_disables_cache(self):
+        self._user_queries()
+        _, queries = self._user_queries()
+        self.assertEqual(len(queries), 1)
+
+    @override_settings(USERS_AUTH_STATELESS_READS=True)
+    def test_stateless_reads_skip_user_lookup(self):
+        res, queries = self._user_queries()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+        # Writes still load (and check) the user
+        res, queries = self._user_queries("post", format="json", data={})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(queries), 1)
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK=dict(
+        settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=dict(settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"], **rates)
+    ))
+
+
+class LoginHardeningTests(APITestCase):
+    login_url = "/api/auth/login/"
+
+    def setUp(self):
+        login_throttle_cache().clear()
+        self.addCleanup(login_throttle_cache().clear)
+        self.user = User.objects.create_user(username="tester", password="secret123")
+
+    def _login(self, password="secret123", username="tester", url=None, **extra):
+        return self.client.post(url or self.login_url, {"username": username, "password": password}, format="json",
+                                **extra)
+
+    @override_settings(PASSWORD_HASHERS=["users.hashers.Argon2PasswordHasher", "users.hashers.PBKDF2PasswordHasher"])
+    def test_login_rehashes_with_preferred_hasher(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password("secret123", hasher="pbkdf2_sha256"))
+        res = self._login()
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("argon2$"))
+        self.assertEqual(self._login().status_code, status.HTTP_200_OK)
+
+    @override_settings(
+        PASSWORD_HASHERS=["users.hashers.PBKDF2PasswordHasher"],
+        USERS_PASSWORD_HASHER_PARAMS={"pbkdf2_sha256": {"iterations": 1000}},
+    )
+    def test_login_rehashes_with_tuned_work_factor(self):
+        encoded = hashers.PBKDF2PasswordHasher().encode("secret123", "somesalt", iterations=2000)
+        User.objects.filter(pk=self.user.pk).update(password=encoded)
+        self.assertEqual(self._login().status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+
+    def test_wrong_password_rejected(self):
+        self.assertEqual(self._login("wrong").status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._login(username="nobody").status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @throttle_rates(login="3/min")
+    def test_ip_throttle_rejects_before_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self._login().status_code, status.HTTP_200_OK)
+        with mock.patch.object(PooledModelBackend, "authenticate") as authenticate:
+            res = self._login()
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", res)
+        authenticate.assert_not_called()
+
+    @throttle_rates(login_failures="2/min")
+    def test_failure_throttle_per_username(self):
+        User.objects.create_user(username="other", password="secret123")
+        for url in (self.login_url, "/api/auth/users/login/"):
+            self.assertEqual(self._login(url=url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self._login("wrong").status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._login("wrong", url="/api/auth/users/login/").status_code, status.HTTP_401_UNAUTHORIZED)
+        # That client waits now, even with the right password; other users
+        # and other clients of the same user are not affected
+        self.assertEqual(self._login().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self._login(username="TESTER", url="/api/auth/users/login/").status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self._login(username="other").status_code, status.HTTP_200_OK)
+        self.assertEqual(self._login(REMOTE_ADDR="10.0.0.2").status_code, status.HTTP_200_OK)
+
+    @override_settings(USERS_PASSWORD_HASH_WORKERS=1, USERS_PASSWORD_HASH_MAX_PENDING=0)
+    def test_hashing_pool_refuses_when_full(self):
+        pool = PasswordHashingPool()
+        self.addCleanup(pool.shutdown)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_hash():
+            started.set()
+            release.wait(5)
+            return "done"
+
+        results = []
+        worker = threading.Thread(target=lambda: results.append(pool.run(slow_hash)))
+        worker.start()
+        started.wait(5)
+        with self.assertRaises(LoginBusy):
+            pool.run(make_password, "secret123")
+        release.set()
+        worker.join(5)
+        self.assertEqual(results, ["done"])
+        self.assertTrue(pool.run(make_password, "secret123").startswith("pbkdf2_sha256$"))
+
+
+class TokenBlacklistTests(APITestCase):
+    refresh_url = "/api/auth/token/refresh/"
+
+    def setUp(self):
+        token_blacklist.invalidate()
+        self.user = User.objects.create_user(username="tester", password="secret123")
+        self.refresh = str(RefreshToken.for_user(self.user))
+
+    def _refresh(self, token):
+        return self.client.post(self.refresh_url, {"refresh": token}, format="json")
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(2000, 0.01)
+        members = [f"member-{i}" for i in range(1000)]
+        bloom.update(members[:500])
+        for member in members[500:]:
+            bloom.add(member)
+        self.assertTrue(all(member in bloom for member in members))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_rotated_token_cannot_be_reused(self):
+        res = self._refresh(self.refresh)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+        self.assertEqual(self._refresh(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._refresh(res.data["refresh"]).status_code, status.HTTP_200_OK)
+        self.assertEqual(BlacklistedToken.objects.count(), 2)
+
+    def test_fresh_token_checked_without_select(self):
+        token_blacklist.bloom()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._refresh(self.refresh).status_code, status.HTTP_200_OK)
+        blacklist_queries = [q["sql"] for q in queries if '"users_blacklistedtoken"' in q["sql"]]
+        self.assertEqual(len(blacklist_queries), 1)
+        self.assertTrue(blacklist_queries[0].startswith("INSERT"))
+
+    def test_token_blacklisted_by_another_process(self):
+        token_blacklist.bloom()
+        # Not in this process' filter yet: the insert still refuses the reuse
+        token = RefreshToken(self.refresh)
+        BlacklistedToken.objects.create(jti=token["jti"], expires_at=timezone.now() + timedelta(days=1))
+        self.assertEqual(self._refresh(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+        # Once synced, the check refuses it without writing
+        token_blacklist.invalidate()
+        self.assertTrue(token_blacklist.contains(token["jti"]))
+
+    def test_compaction_deletes_expired_rows_only(self):
+        now = timezone.now()
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(jti=f"expired-{i}", expires_at=now - timedelta(minutes=i + 1)) for i in range(5)]
+            + [BlacklistedToken(jti=f"live-{i}", expires_at=now + timedelta(days=1)) for i in range(3)]
+        )
+        out = io.StringIO()
+        call_command("compact_token_blacklist", "--batch-size", "2", stdout=out)
+        self.assertIn("5", out.getvalue())
+        self.assertEqual(sorted(BlacklistedToken.objects.values_list("jti", flat=True)), ["live-0", "live-1", "live-2"])
+
+
+class EmailUniquenessTests(APITestCase):
+    def setUp(self):
+        self.register_url = reverse("user-list")
+        self.user = User.objects.create_user(username="tester", password="secret123", email="Tester@Example.com")
+
+    def _register(self, username, email):
+        payload = {"username": username, "email": email, "password": "secret123"}
+        return self.client.post(self.register_url, payload, format="json")
+
+    def test_duplicate_email_rejected_by_index_without_lookup(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self._register("other", "tester@EXAMPLE.com")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("email", res.data)
+        lookups = [q["sql"] for q in queries if q["sql"].startswith("SELECT") and "email" in q["sql"].split("WHERE")[-1]]
+        self.assertEqual(lookups, [])
+        self.assertFalse(User.objects.filter(username="other").exists())
+
+    def test_update_to_taken_email(self):
+        other = User.objects.create_user(username="other", password="secret123", email="other@example.com")
+        client = APIClient()
+        client.force_authenticate(other)
+        res = client.patch(reverse("user-detail", args=[other.pk]), {"email": "TESTER@example.com"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("email", res.data)
+        res = client.patch(reverse("user-detail", args=[other.pk]), {"email": "Other@Example.com"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+
+    def test_users_without_email_are_not_constrained(self):
+        User.objects.create_user(username="first", password="secret123")
+        User.objects.create_user(username="second", password="secret123")
+        self.assertEqual(User.objects.filter(email="").count(), 2)
+
+
+class UserProvisioningTests(APITestCase):
+    def setUp(self):
+        self.url = "/api/auth/users/bulk/"
+        User.objects.create_user(username="taken", password="secret123", email="taken@example.com")
+        self.admin = User.objects.create_user(username="admin", password="secret123", is_staff=True)
+        self.client.force_authenticate(self.admin)
+
+    def test_requires_admin(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username="taken"))
+        self.assertEqual(client.post(self.url, [], format="json").status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+    def test_bulk_provisioning(self):
+        items = [
+            {"username": "new1", "email": "new1@example.com", "password": "secret123", "first_name": "New"},
+            {"username": "new2", "email": "NEW2@example.com", "password": "secret456"},
+            {"username": "taken", "email": "free@example.com", "password": "secret123"},
+            {"username": "free", "email": "TAKEN@example.com", "password": "secret123"},
+            {"username": "new3", "email": "new1@EXAMPLE.com", "password": "secret123"},
+            {"username": "bad name!", "email": "nope", "password": "x"},
+            "not an object",
+        ]
+        res = self.client.post(self.url, items, format="json")
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS, res.content)
+        self.assertEqual((res.data["created"], res.data["exists"], res.data["invalid"]), (2, 2, 3))
+        self.assertEqual([r["status"] for r in res.data["results"]],
+                         ["created", "created", "exists", "exists", "invalid", "invalid", "invalid"])
+        self.assertEqual(set(res.data["results"][5]["errors"]), {"username", "email", "password"})
+        user = User.objects.get(username="new1")
+        self.assertEqual((user.pk, user.first_name), (res.data["results"][0]["id"], "New"))
+        self.assertTrue(user.check_password("secret123"))
+        self.assertTrue(User.objects.get(username="new2").check_password("secret456"))
+
+    def test_hash_passwords_in_processes(self):
+        self.addCleanup(hashing_process_pool.shutdown)
+        passwords = [f"password-{i}" for i in range(4)]
+        hashed = hash_passwords(passwords, processes=2)
+        self.assertEqual(len(set(hashed)), 4)
+        self.assertTrue(all(hashers.check_password(p, h) for p, h in zip(passwords, hashed)))
+
+    @override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+    def test_provision_users_command(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "users.csv")
+        with open(path, "w", newline="") as handle:
+            handle.write("username,email,password,first_name\n")
+            handle.write("csv1,csv1@example.com,secret123,Ana\n")
+            handle.write("csv2,csv2@example.com,secret123\n")
+            handle.write("taken,x@example.com,secret123,\n")
+        out, err = io.StringIO(), io.StringIO()
+        call_command("provision_users", path, "--chunk-size", "2", "--processes", "1", stdout=out, stderr=err)
+        self.assertIn("Created: 2, existing: 1, invalid: 0", out.getvalue())
+        self.assertEqual(User.objects.get(username="csv1").first_name, "Ana")
+
+
+class LoginInstrumentationTests(APITestCase):
+    def setUp(self):
+        metrics.clear()
+        User.objects.create_user(username="tester", password="secret123")
+
+    def test_login_recorded_as_user_login(self):
+        res = self.client.post("/api/auth/users/login/", {"username": "tester", "password": "secret123"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("total;dur=", res["Server-Timing"])
+        res = self.client.post("/api/auth/users/login/", {"username": "tester", "password": "wrong"}, format="json")
+        body = metrics.render()
+        self.assertIn('http_requests_total{endpoint="user-login",method="POST",status="200"} 1', body)
+        self.assertIn(f'http_requests_total{{endpoint="user-login",method="POST",status="{res.status_code}"}} 1', body)
+
+
+class UserQueryBudgetTests(APITestCase):
+    def setUp(self):
+        login_throttle_cache().clear()
+        self.addCleanup(login_throttle_cache().clear)
+        token_blacklist.invalidate()
+        self.user = User.objects.create_user(username="tester", password="secret123")
+
+    def test_login(self):
+        for url in ("/api/auth/login/", "/api/auth/users/login/"):
+            with self.subTest(url=url):
+                # The user row; last_login is not updated
+                with self.assertNumQueries(1):
+                    res = self.client.post(url, {"username": "tester", "password": "secret123"}, format="json")
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_token_refresh(self):
+        token_blacklist.bloom()
+        # Blacklist insert of the rotated token, in a savepoint
+        with self.assertNumQueries(3):
+            res = self.client.post("/api/auth/token/refresh/", {"refresh": str(RefreshToken.for_user(self.user))},
+                                   format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_register(self):
+        payload = {"username": "newuser", "email": "newuser@example.com", "password": "StrongPass123"}
+        # Username check + insert in a savepoint (the email index reports duplicates)
+        with self.assertNumQueries(4):
+            res = self.client.post(reverse("user-list"), payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.content)
@@ -0,0 +1,83 @@
+"""
+Login throttles, checked by DRF before the view runs (and so before any
+password is hashed).
+Their history lives in the LOGIN_THROTTLE_CACHE_ALIAS cache. With a
+per-process backend (local memory) every gunicorn worker counts on its
+own, so the limits only hold across workers with a shared cache (Redis,
+Memcached or the database cache).
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from .models import User
+
+
+def login_throttle_cache():
+    return caches[getattr(settings, "LOGIN_THROTTLE_CACHE_ALIAS", "default")]
+
+
+class LoginRateThrottle(SimpleRateThrottle):
+    """
+    Login attempts per client IP, successful or not.
+    """
+
+    scope = "login"
+
+    @property
+    def cache(self):
+        return login_throttle_cache()
+
+    def get_rate(self):
+        # Read on every request so rate changes (and tests) take effect
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
+
+
+class LoginFailureRateThrottle(LoginRateThrottle):
+    """
+    Failed login attempts per (username, client IP). Keying on the pair
+    means failures from one client cannot lock the account out for its
+    owner logging in from elsewhere. Only failures recorded by the view
+    with record_failure() count, so users who log in successfully are
+    never throttled by this one.
+    """
+
+    scope = "login_failures"
+
+    def get_cache_key(self, request, view):
+        username = request.data.get(User.USERNAME_FIELD) if hasattr(request.data, "get") else None
+        if not isinstance(username, str) or not username:
+            return None
+        ident = f"{username.lower()}:{self.get_ident(request)}"
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def throttle_success(self):
+        # Checking does not count as an attempt
+        return True
+
+    def record_failure(self, request, view=None):
+        if self.rate is None:
+            return
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return
+        self.history = [t for t in self.cache.get(self.key, []) if t > self.timer() - self.duration]
+        self.history.insert(0, self.timer())
+        self.cache.set(self.key, self.history, self.duration)
+
+
+class LoginThrottleMixin:
+    """
+    For views throttled with LoginFailureRateThrottle: login_failed()
+    records a failed attempt.
+    """
+
+    def login_failed(self, request):
+        for throttle in self.get_throttles():
+            if isinstance(throttle, LoginFailureRateThrottle):
+                throttle.record_failure(request, self)
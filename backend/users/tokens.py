@@ -0,0 +1,32 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .blacklist import token_blacklist
+
+
+class RefreshToken(tokens.RefreshToken):
+    """
+    Refresh token checked against (and added to) users.blacklist.token_blacklist.
+    """
+
+    def verify(self):
+        super().verify()
+        self.check_blacklist()
+
+    def check_blacklist(self):
+        """
+        Raises TokenError if the token is blacklisted.
+        """
+        if token_blacklist.contains(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        """
+        Blacklists the token. Raises TokenError if it already was, e.g. when
+        the same token is rotated twice concurrently.
+        """
+        if not token_blacklist.add(self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self.payload["exp"])):
+            raise TokenError(_("Token is blacklisted"))
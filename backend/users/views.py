@@ -1,13 +1,19 @@
 from rest_framework import viewsets, status
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.conf import settings
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
+from backend.instrumentation import InstrumentedViewMixin
 from .models import User
+from .provisioning import provision_users
 from .serializer import UserRegisterSerializer
+from .throttling import LoginThrottleMixin, LoginRateThrottle, LoginFailureRateThrottle
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(InstrumentedViewMixin, LoginThrottleMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing User instances.
     Provides endpoints for user registration, login, and retrieving user info.
@@ -28,11 +34,14 @@ class UserViewSet(viewsets.ModelViewSet):
         """
         if self.action in ["create", "login"]:
             self.permission_classes = [AllowAny]
+        elif self.action == "bulk":
+            self.permission_classes = [IsAdminUser]
         else:
             self.permission_classes = [IsAuthenticated]
         return super().get_permissions()
 
-    @action(detail=False, methods=["post"], permission_classes=[AllowAny])
+    @action(detail=False, methods=["post"], permission_classes=[AllowAny],
+            throttle_classes=[LoginRateThrottle, LoginFailureRateThrottle])
     def login(self, request):
         """
         Personalized endpoint for user login. POST /api/users/login/
@@ -65,4 +74,50 @@ class UserViewSet(viewsets.ModelViewSet):
                 }
             )
         else:
-            return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+            self.login_failed(request)
+            return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Bulk user provisioning (admins only). POST /api/auth/users/bulk/
+        with a JSON array of users; passwords are hashed in worker processes
+        and users whose username or email is taken are skipped.
+        arguments:
+        request -- HttpRequest object
+        returns: summary counts and per-item results
+        """
+        items = request.data
+        max_items = getattr(settings, "USERS_PROVISION_MAX_ITEMS", 1000)
+        if not isinstance(items, list):
+            return Response({"error": "A list of users is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > max_items:
+            return Response({"error": f"At most {max_items} users per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = provision_users(items)
+        summary = {"created": 0, "exists": 0, "invalid": 0}
+        for result in results:
+            summary[result["status"]] += 1
+        summary["results"] = results
+        return Response(summary, status=status.HTTP_200_OK if summary["created"] == len(results) else status.HTTP_207_MULTI_STATUS)
+
+
+class LoginView(InstrumentedViewMixin, LoginThrottleMixin, TokenObtainPairView):
+    """
+    SimpleJWT token login (POST /api/auth/login/) behind the login throttles.
+    """
+
+    throttle_classes = [LoginRateThrottle, LoginFailureRateThrottle]
+
+    def post(self, request, *args, **kwargs):
+        """
+        Obtains an access/refresh token pair. POST /api/auth/login/
+        arguments:
+        request -- HttpRequest object
+        returns: access and refresh tokens
+        """
+        try:
+            return super().post(request, *args, **kwargs)
+        except AuthenticationFailed:
+            self.login_failed(request)
+            raise
\ No newline at end of file